@@ -1,68 +1,129 @@
 import speech_recognition as sr
 import google.generativeai as genai
-from gtts import gTTS
 import os
-import playsound
-from langdetect import detect, LangDetectException
-import re
+import threading
+import time
 import dotenv
+from streaming import iter_sentences, speak_stream
+from text_normalizer import clean_for_speech
+from reports import ReportWorker
+from history import HistoryManager
+from pipeline import Pipeline
+from tts import synthesize, get_playback_backend, dump_audio
+from tts_cache import TTSCache
+from language import LanguageRouter
+from stt import get_stt_backend, MicrophoneInput, WavFileInput
 
 dotenv.load_dotenv()
 
 genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
 gemini_model = genai.GenerativeModel('gemini-1.5-flash')
 
-def remove_emojis(text):
-    emoji_pattern = re.compile(
-        "["
-        "\U0001F600-\U0001F64F"
-        "\U0001F300-\U0001F5FF"
-        "\U0001F680-\U0001F6FF"
-        "\U0001F1E0-\U0001F1FF"
-        "\U00002702-\U000027B0"
-        "\U000024C2-\U0001F251"
-        "]+",
-        flags=re.UNICODE,
+# Speak replies sentence by sentence as Gemini generates them. Set to "false" to wait for the full reply.
+STREAM_RESPONSES = os.getenv("STREAM_RESPONSES", "true").lower() != "false"
+# Generate a performance report every N turns in the background. 0 means only once, at the end of the session.
+REPORT_EVERY_N_TURNS = int(os.getenv("REPORT_EVERY_N_TURNS", "1"))
+# Run listening, recognition, Gemini and speech as overlapping pipeline stages. Set to "false" for the serial loop.
+PIPELINED_AUDIO_LOOP = os.getenv("PIPELINED_AUDIO_LOOP", "true").lower() != "false"
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "4"))
+# Print per-stage latency and queue depth after every turn, not just when the session ends.
+PIPELINE_STATS = os.getenv("PIPELINE_STATS", "false").lower() == "true"
+# Long sessions keep the last HISTORY_KEEP_TURNS turns verbatim and fold older ones into a running summary.
+HISTORY_KEEP_TURNS = int(os.getenv("HISTORY_KEEP_TURNS", "6"))
+HISTORY_MAX_TOKENS = int(os.getenv("HISTORY_MAX_TOKENS", "2000"))
+HISTORY_SUMMARY_TOKENS = int(os.getenv("HISTORY_SUMMARY_TOKENS", "200"))
+# Picks the speech language from the script of the text or the user's language this turn, falling back to langdetect.
+language_router = LanguageRouter()
+language_router.warm_up()
+# Where synthesized speech is played: "pygame" (speakers), "null" or "recording" (for tests).
+playback = get_playback_backend(os.getenv("TTS_PLAYBACK_BACKEND", "pygame"))
+# Speech is kept in memory. Set a directory here to also save every clip to disk for debugging.
+TTS_DEBUG_DUMP_DIR = os.getenv("TTS_DEBUG_DUMP_DIR")
+# gTTS voice parameters. They are part of the cache key, so changing them never replays stale audio.
+TTS_VOICE = {
+    'tld': os.getenv("TTS_VOICE_TLD", "com"),
+    'slow': os.getenv("TTS_VOICE_SLOW", "false").lower() == "true",
+}
+# Repeated phrases are served from a cache of synthesized audio. TTS_CACHE_DIR adds a persistent on-disk tier.
+tts_cache = TTSCache(
+    memory_bytes=int(os.getenv("TTS_CACHE_MEMORY_MB", "8")) * 1024 * 1024,
+    directory=os.getenv("TTS_CACHE_DIR"),
+    disk_bytes=int(os.getenv("TTS_CACHE_DISK_MB", "64")) * 1024 * 1024,
+)
+
+# Speech recognition backend: "google" (online), "vosk" or "sphinx" (offline, CPU), or "transcript" (for tests).
+stt_backend = get_stt_backend(os.getenv("STT_BACKEND", "google"))
+# Comma-separated WAV files or directories to play instead of the microphone, one per turn.
+STT_INPUT_WAVS = os.getenv("STT_INPUT_WAVS")
+# The mic is opened once per session and calibrated once per run; a voice activity detector ("energy" or "webrtc")
+# ends each utterance after VAD_END_SILENCE_MS of silence.
+if STT_INPUT_WAVS:
+    audio_input = WavFileInput(STT_INPUT_WAVS.split(","))
+else:
+    audio_input = MicrophoneInput(
+        vad=os.getenv("VAD_BACKEND", "energy"),
+        end_silence_ms=int(os.getenv("VAD_END_SILENCE_MS", "500")),
     )
-    return emoji_pattern.sub(r'', text)
+# One recognizer for the whole session
+recognizer = sr.Recognizer()
+
+# Marks the end of one tutor reply in the pipeline's speech queue
+END_OF_TURN = object()
+# Marks that the audio input has run out; the session ends once it reaches the last stage
+END_OF_INPUT = object()
 
 # Function to listen to the user's voice and convert it to text
 def listen():
-    r = sr.Recognizer()
-    with sr.Microphone() as source:
-        print("Listening...")
-        r.adjust_for_ambient_noise(source)
-        audio = r.listen(source)
+    audio = audio_input.capture(recognizer)
+    return recognize(recognizer, audio)
+
+# Function to turn captured audio into text
+def recognize(r, audio):
     try:
-        text = r.recognize_google(audio)
+        text = stt_backend.transcribe(r, audio)
         print(f"You said: {text}")
+        end_of_speech = getattr(audio, 'end_of_speech', None)
+        if end_of_speech is not None:
+            latency = time.perf_counter() - end_of_speech
+            print(f"  [stt] end of speech -> transcript: {latency + audio.end_silence_s:.2f}s "
+                  f"(endpointing {audio.end_silence_s:.2f}s, recognition {latency:.2f}s)")
         return text
     except sr.UnknownValueError:
         print("Sorry, I could not understand what you said.")
         return None
     except sr.RequestError as e:
-        print(f"Could not request results from Google Speech Recognition service; {e}")
+        print(f"Could not request results from the speech recognition service; {e}")
         return None
 
-# Function to convert text to speech with language detection
-def speak(text):
-    text_to_speak = remove_emojis(text)
+# Function to convert text to speech audio with language detection
+def prepare_speech(text):
+    text_to_speak = clean_for_speech(text)
     if not text_to_speak.strip():
-        return
+        return None
 
-    try:
-        lang_code = detect(text_to_speak)
-    except LangDetectException:
-        lang_code = 'en'
+    lang_code = language_router.route(text_to_speak)
 
     try:
-        tts = gTTS(text=text_to_speak, lang=lang_code)
-        filename = "response.mp3"
-        tts.save(filename)
-        playsound.playsound(filename)
-        os.remove(filename)
+        audio = tts_cache.get_or_synthesize(text_to_speak, lang_code, synthesize, **TTS_VOICE)
     except Exception as e:
         print(f"Error during text-to-speech: {e}")
+        return None
+    if TTS_DEBUG_DUMP_DIR:
+        dump_audio(audio, TTS_DEBUG_DUMP_DIR)
+    return audio
+
+# Function to play synthesized speech
+def play_speech(audio):
+    if audio is None:
+        return
+    try:
+        playback.play(audio)
+    except Exception as e:
+        print(f"Error during audio playback: {e}")
+
+# Function to convert text to speech and play it
+def speak(text):
+    play_speech(prepare_speech(text))
 
 
 def get_ai_response(chat_session, prompt):
@@ -73,6 +134,35 @@ def get_ai_response(chat_session, prompt):
         print(f"Error getting response from Gemini: {e}")
         return "Sorry, I'm having trouble responding right now."
 
+def stream_ai_response(chat_session, prompt):
+    """
+    Yields the reply text chunk by chunk while Gemini is still generating it.
+    The chat history is updated once the stream has been fully consumed.
+    """
+    try:
+        for chunk in chat_session.send_message(prompt, stream=True):
+            yield chunk.text
+    except Exception as e:
+        print(f"Error getting response from Gemini: {e}")
+        yield "Sorry, I'm having trouble responding right now."
+
+# Function to get the tutor's reply and speak it, streaming sentence by sentence when enabled
+def respond(chat_session, prompt):
+    if not STREAM_RESPONSES:
+        ai_response = get_ai_response(chat_session, prompt)
+        print(f"AI Tutor: {ai_response}")
+        speak(ai_response)
+        return ai_response
+
+    print("AI Tutor:", end=" ", flush=True)
+    ai_response = speak_stream(
+        stream_ai_response(chat_session, prompt),
+        speak,
+        on_sentence=lambda sentence: print(sentence, end=" ", flush=True),
+    )
+    print()
+    return ai_response
+
 # Function to generate a report on the user's performance 
 def generate_report(conversation_history):
     report_model = genai.GenerativeModel('gemini-1.5-flash')
@@ -88,6 +178,132 @@ def generate_report(conversation_history):
     except Exception as e:
         print(f"Could not generate report: {e}")
 
+# Function to fold older turns into the running summary of a long conversation
+def summarize_history(summary, transcript):
+    summary_model = genai.GenerativeModel('gemini-1.5-flash')
+    summary_prompt = (
+        f"Here is a summary of a tutoring conversation with a child so far:\n{summary or '(nothing yet)'}\n\n"
+        f"Here are the next exchanges:\n{transcript}\n\n"
+        f"Rewrite the summary so it also covers these exchanges, in at most {HISTORY_SUMMARY_TOKENS * 3 // 4} words. "
+        "Keep the topics discussed, the language the child speaks and any mistakes they keep making."
+    )
+    return summary_model.generate_content(summary_prompt).text
+
+# Runs the conversation for a chat session until the user says 'quit'
+def converse(chat):
+    language_router.reset()
+    reports = ReportWorker(generate_report, every_n_turns=REPORT_EVERY_N_TURNS)
+    history = HistoryManager(chat, summarize_history, keep_turns=HISTORY_KEEP_TURNS, max_tokens=HISTORY_MAX_TOKENS)
+    if PIPELINED_AUDIO_LOOP:
+        run_pipelined_loop(chat, history, reports)
+    else:
+        run_serial_loop(chat, history, reports)
+    audio_input.close()
+    history.close()
+    reports.close(chat.history)
+    print(tts_cache.summary())
+
+def run_serial_loop(chat, history, reports):
+    while True:
+        try:
+            user_input = listen()
+        except EOFError:
+            break
+        if user_input:
+            if 'quit' in user_input.lower():
+                break
+            language_router.observe_user_input(user_input)
+            respond(chat, user_input)
+            history.turn_completed()
+            reports.turn_completed(chat.history)
+
+def run_pipelined_loop(chat, history, reports):
+    """
+    Runs listen -> recognize -> respond -> synthesize -> play as separate threads joined by bounded queues.
+
+    The audio input stays armed (opened and calibrated) for the whole session while
+    recognition, generation and synthesis of the reply run. Listening itself only starts
+    once the tutor has finished speaking (the floor is open again), and anything heard
+    before that is discarded, so the tutor's own voice is never transcribed.
+    """
+    pipeline = Pipeline(queue_size=PIPELINE_QUEUE_SIZE)
+    floor_open = threading.Event()
+    floor_open.set()
+
+    def capture(_, emit):
+        try:
+            audio = audio_input.capture(
+                recognizer,
+                ready=lambda: floor_open.wait(timeout=0.1),
+                stopped=lambda: pipeline.stopped,
+            )
+        except EOFError:
+            emit(END_OF_INPUT)
+            raise StopIteration
+        if audio is None:
+            return
+        floor_open.clear()
+        emit(audio)
+
+    def transcribe(audio, emit):
+        if audio is END_OF_INPUT:
+            emit(END_OF_INPUT)
+            return
+        user_input = recognize(recognizer, audio)
+        if not user_input:
+            floor_open.set()
+            return
+        if 'quit' in user_input.lower():
+            pipeline.stop()
+            return
+        language_router.observe_user_input(user_input)
+        emit(user_input)
+
+    def generate(user_input, emit):
+        if user_input is END_OF_INPUT:
+            emit(END_OF_INPUT)
+            return
+        if STREAM_RESPONSES:
+            chunks = stream_ai_response(chat, user_input)
+        else:
+            chunks = [get_ai_response(chat, user_input)]
+        for sentence in iter_sentences(chunks):
+            emit(sentence)
+        history.turn_completed()
+        reports.turn_completed(chat.history)
+        emit(END_OF_TURN)
+
+    def synthesize_sentence(sentence, emit):
+        if sentence is END_OF_TURN or sentence is END_OF_INPUT:
+            emit(sentence)
+            return
+        emit((sentence, prepare_speech(sentence)))
+
+    def play(item, emit):
+        if item is END_OF_INPUT:
+            pipeline.stop()
+            return
+        if item is END_OF_TURN:
+            if PIPELINE_STATS:
+                print(pipeline.report())
+            floor_open.set()
+            return
+        sentence, audio = item
+        print(f"AI Tutor: {sentence}")
+        play_speech(audio)
+
+    pipeline.add_stage("listen", capture)
+    pipeline.add_stage("recognize", transcribe)
+    pipeline.add_stage("respond", generate)
+    pipeline.add_stage("synthesize", synthesize_sentence)
+    pipeline.add_stage("play", play)
+    pipeline.start()
+    try:
+        pipeline.wait()
+    except KeyboardInterrupt:
+        pipeline.stop()
+    print(pipeline.report())
+
 # Personal Chatbot mode
 def personal_chatbot():
     print("Welcome to the Personal Chatbot!")
@@ -99,16 +315,7 @@ def personal_chatbot():
     )
     
     chat = gemini_model.start_chat(history=[{'role': 'user', 'parts': [system_prompt]}, {'role': 'model', 'parts': ["Of course! I'm ready to help."]}])
-    
-    while True:
-        user_input = listen()
-        if user_input:
-            if 'quit' in user_input.lower():
-                break
-            ai_response = get_ai_response(chat, user_input)
-            print(f"AI Tutor: {ai_response}")
-            speak(ai_response)
-            generate_report(chat.history)
+    converse(chat)
 
 # Function to handle roleplay scenarios
 def roleplay():
@@ -137,16 +344,7 @@ def roleplay():
         initial_response = chat.history[-1].parts[0].text
         print(f"AI Tutor: {initial_response}")
         speak(initial_response)
-
-        while True:
-            user_input = listen()
-            if user_input:
-                if 'quit' in user_input.lower():
-                    break
-                ai_response = get_ai_response(chat, user_input)
-                print(f"AI Tutor: {ai_response}")
-                speak(ai_response)
-                generate_report(chat.history)
+        converse(chat)
     else:
         print("Invalid choice. Please try again.")
 
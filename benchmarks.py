@@ -0,0 +1,185 @@
+"""
+Latency benchmarks for the voice tutor that run without a microphone, speakers or API keys.
+
+Run with: python benchmarks.py
+"""
+import re
+import time
+
+from langdetect import detect, LangDetectException
+
+from language import LanguageRouter
+from streaming import iter_sentences, speak_stream
+from text_normalizer import clean_for_speech, split_sentences
+
+SAMPLE_REPLY = (
+    "Great job! You used the past tense correctly in that sentence. "
+    "Now let's try something a little harder. Can you tell me what you did last weekend? "
+    "Try to use at least two different verbs. Remember, it's okay to make mistakes. "
+    "That's how we learn!"
+)
+
+
+class FakeStreamingModel:
+    """
+    Stands in for a Gemini chat session, emitting a canned reply word by word
+    with a fixed delay between chunks to mimic token generation.
+    """
+
+    def __init__(self, reply=SAMPLE_REPLY, seconds_per_chunk=0.03):
+        self.reply = reply
+        self.seconds_per_chunk = seconds_per_chunk
+
+    def send_message(self, prompt, stream=False):
+        if stream:
+            return self._stream()
+        for _ in self._stream():
+            pass
+        return self.reply
+
+    def _stream(self):
+        for word in self.reply.split(" "):
+            time.sleep(self.seconds_per_chunk)
+            yield word + " "
+
+
+class FakeSpeaker:
+    """
+    Records when the first audio would start playing. Synthesis cost is modelled
+    as a fixed round trip plus a per-character cost, playback as a per-character cost.
+    """
+
+    def __init__(self, synth_base=0.15, synth_per_char=0.0005, play_per_char=0.002):
+        self.synth_base = synth_base
+        self.synth_per_char = synth_per_char
+        self.play_per_char = play_per_char
+        self.first_audio_at = None
+
+    def __call__(self, text):
+        time.sleep(self.synth_base + self.synth_per_char * len(text))
+        if self.first_audio_at is None:
+            self.first_audio_at = time.perf_counter()
+        time.sleep(self.play_per_char * len(text))
+
+
+def benchmark_time_to_first_audio(rounds=3):
+    """
+    Compares time-to-first-audio for the blocking reply path against sentence-level streaming.
+    """
+    print("--- Time to first audio (fake model, fake TTS) ---")
+    model = FakeStreamingModel()
+    results = {}
+    for mode in ("blocking", "streaming"):
+        samples = []
+        for _ in range(rounds):
+            speaker = FakeSpeaker()
+            start = time.perf_counter()
+            if mode == "blocking":
+                speaker(model.send_message("hello"))
+            else:
+                speak_stream(model.send_message("hello", stream=True), speaker)
+            samples.append(speaker.first_audio_at - start)
+        results[mode] = min(samples)
+        print(f"  {mode:<10} {results[mode] * 1000:8.1f} ms")
+    print(f"  speedup    {results['blocking'] / results['streaming']:8.1f}x")
+    return results
+
+
+LANGUAGE_SAMPLES = [
+    "Great job! You used the past tense correctly.",
+    "Can you tell me what you did last weekend?",
+    "नमस्ते! आज आप कैसे हैं?",
+    "बहुत अच्छा, चलिए एक और वाक्य बोलते हैं।",
+    "¡Muy bien! ¿Qué hiciste ayer?",
+    "Sounds fun! Let's begin.",
+    "こんにちは、元気ですか？",
+    "Sorry, I'm having trouble responding right now.",
+]
+
+
+def benchmark_language_detection(rounds=200):
+    """
+    Compares calling langdetect on every utterance (the old speak() path) against the
+    LanguageRouter, both cold (fresh session every round) and warm (memoised session).
+    """
+    print("--- Language detection per utterance ---")
+
+    def detect_each(text):
+        try:
+            return detect(text)
+        except LangDetectException:
+            return 'en'
+
+    detect_each(LANGUAGE_SAMPLES[0])  # load langdetect's profiles outside the timed loop
+    warm_router = LanguageRouter()
+    timings = {
+        "langdetect": lambda text: detect_each(text),
+        "router (cold)": lambda text: LanguageRouter().route(text),
+        "router (warm)": lambda text: warm_router.route(text),
+    }
+    results = {}
+    for name, route in timings.items():
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for text in LANGUAGE_SAMPLES:
+                route(text)
+        results[name] = (time.perf_counter() - start) / (rounds * len(LANGUAGE_SAMPLES))
+        print(f"  {name:<14} {results[name] * 1e6:10.1f} us/utterance")
+    return results
+
+
+MARKDOWN_REPLY = (
+    "## Great job today! 🎉\n\n"
+    "Here are **three** things to practise, and *remember* to smile 😊:\n"
+    "1. Say `hello` to a friend.\n"
+    "2. Count to 10. Then count back down!\n"
+    "- Read [a short story](https://example.com/story) out loud\n"
+    "> Practice makes progress, not perfection. 🌟\n\n"
+)
+
+
+def legacy_remove_emojis(text):
+    """The cleanup step speak() used before text_normalizer: recompiles the pattern on every call."""
+    emoji_pattern = re.compile(
+        "["
+        "\U0001F600-\U0001F64F"
+        "\U0001F300-\U0001F5FF"
+        "\U0001F680-\U0001F6FF"
+        "\U0001F1E0-\U0001F1FF"
+        "\U00002702-\U000027B0"
+        "\U000024C2-\U0001F251"
+        "]+",
+        flags=re.UNICODE,
+    )
+    return emoji_pattern.sub(r'', text)
+
+
+def benchmark_text_normalization(size_bytes=2 * 1024 * 1024, chunk_bytes=4096):
+    """
+    Throughput of text cleanup: the old remove_emojis() per sentence, the new sanitizer
+    per sentence and over the whole text at once, and the streaming splitter fed large chunks.
+    """
+    print("--- Text normalization throughput ---")
+    text = MARKDOWN_REPLY * (size_bytes // len(MARKDOWN_REPLY.encode("utf-8")))
+    megabytes = len(text.encode("utf-8")) / (1024 * 1024)
+    sentences = split_sentences(text)
+    chunks = [text[i:i + chunk_bytes] for i in range(0, len(text), chunk_bytes)]
+    runs = {
+        "remove_emojis per sentence": lambda: [legacy_remove_emojis(s) for s in sentences],
+        "clean_for_speech per sentence": lambda: [clean_for_speech(s) for s in sentences],
+        "split_sentences whole text": lambda: split_sentences(text),
+        f"iter_sentences {chunk_bytes}B chunks": lambda: list(iter_sentences(chunks)),
+    }
+    results = {}
+    for name, run in runs.items():
+        start = time.perf_counter()
+        run()
+        results[name] = megabytes / (time.perf_counter() - start)
+        print(f"  {name:<32} {results[name]:8.1f} MB/s")
+    return results
+
+
+if __name__ == "__main__":
+    benchmark_time_to_first_audio()
+    benchmark_language_detection()
+    benchmark_text_normalization()
@@ -0,0 +1,115 @@
+from concurrent.futures import ThreadPoolExecutor
+
+
+def estimate_tokens(text):
+    """Cheap token estimate (about four characters per token), good enough for budgeting."""
+    return len(text) // 4 + 1
+
+
+def content_text(content):
+    """Joins the text parts of a history entry, whether it is a Content object or a plain dict."""
+    parts = content['parts'] if isinstance(content, dict) else content.parts
+    return "".join(part if isinstance(part, str) else part.text for part in parts)
+
+
+def content_role(content):
+    return content['role'] if isinstance(content, dict) else content.role
+
+
+class HistoryManager:
+    """
+    Keeps a Gemini chat session's history bounded for long sessions.
+
+    The history is kept as: the system prompt exchange, an optional running summary
+    exchange, then the most recent turns verbatim. Once there are more than
+    `keep_turns` turns, or the verbatim turns exceed `max_tokens`, the oldest ones
+    are folded into the summary by `summarize_fn(summary, transcript)` on a
+    background thread. The new summary is swapped in on the next call to
+    `turn_completed`, which runs on the conversation thread, so the history is
+    never rewritten while a message is being sent.
+
+    Args:
+        chat: The Gemini chat session to manage.
+        summarize_fn (callable): Returns an updated summary given the current summary and a transcript to fold in.
+        keep_turns (int): Number of most recent turns always kept verbatim.
+        max_tokens (int): Token budget for the verbatim turns. At least one turn is always kept.
+        prefix_length (int): Number of leading entries (the system prompt exchange) that are never folded.
+    """
+
+    def __init__(self, chat, summarize_fn, keep_turns=6, max_tokens=2000, prefix_length=2):
+        self.chat = chat
+        self.summarize_fn = summarize_fn
+        self.keep_turns = keep_turns
+        self.max_tokens = max_tokens
+        self.prefix = list(chat.history[:prefix_length])
+        self.summary = ""
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="history-summary")
+        self._pending = None
+        self._folding = 0
+
+    def _summary_entries(self):
+        if not self.summary:
+            return []
+        return [
+            {'role': 'user', 'parts': [f"Here is a summary of our conversation so far: {self.summary}"]},
+            {'role': 'model', 'parts': ["Thanks, I'll keep that in mind."]},
+        ]
+
+    def _turns(self):
+        """Splits everything after the prefix and summary into (user, model) pairs."""
+        recent = list(self.chat.history[len(self.prefix) + len(self._summary_entries()):])
+        return [recent[i:i + 2] for i in range(0, len(recent), 2)]
+
+    def _overflow(self, turns):
+        """Number of oldest turns that have to be folded to respect both budgets."""
+        overflow = max(0, len(turns) - self.keep_turns)
+        tokens = sum(estimate_tokens(content_text(c)) for turn in turns[overflow:] for c in turn)
+        while tokens > self.max_tokens and overflow < len(turns) - 1:
+            tokens -= sum(estimate_tokens(content_text(c)) for c in turns[overflow])
+            overflow += 1
+        return overflow
+
+    def _apply_summary(self):
+        if self._pending is None or not self._pending.done():
+            return
+        pending, self._pending = self._pending, None
+        try:
+            new_summary = pending.result()
+        except Exception as e:
+            print(f"Could not summarize conversation history: {e}")
+            return
+        new_summary = (new_summary or "").strip()
+        if not new_summary:
+            # Swapping it in would drop the folded turns and the previous summary with them;
+            # keep both, and fold again after the next turn.
+            print("Could not summarize conversation history: the summary came back empty")
+            return
+        turns = self._turns()
+        self.summary = new_summary
+        recent = [c for turn in turns[self._folding:] for c in turn]
+        self.chat.history = self.prefix + self._summary_entries() + recent
+
+    def turn_completed(self):
+        """
+        Call after every reply. Swaps in a finished summary, starts folding overflowing
+        turns in the background if needed and prints the current history size.
+        """
+        self._apply_summary()
+        turns = self._turns()
+        overflow = self._overflow(turns)
+        if overflow and self._pending is None:
+            transcript = "\n".join(
+                f"{content_role(c)}: {content_text(c)}" for turn in turns[:overflow] for c in turn
+            )
+            self._folding = overflow
+            self._pending = self._executor.submit(self.summarize_fn, self.summary, transcript)
+        print(self.report())
+
+    def report(self):
+        history = self.chat.history
+        tokens = sum(estimate_tokens(content_text(c)) for c in history)
+        summary_tokens = estimate_tokens(self.summary) if self.summary else 0
+        return f"  [history] {len(history)} messages, ~{tokens} tokens (summary ~{summary_tokens} tokens)"
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,128 @@
+import re
+import threading
+from collections import OrderedDict
+from langdetect import DetectorFactory, detect, LangDetectException
+
+# langdetect is randomised by default, which makes short strings flip between languages.
+DetectorFactory.seed = 0
+
+# Kana only appears in Japanese, so it is checked before the Han ideographs Japanese shares with Chinese.
+_KANA = re.compile(r'[\u3040-\u30FF]')
+# Scripts that map to exactly one gTTS language. The first character found decides.
+_SCRIPTS = re.compile(
+    r'(?P<hi>[\u0900-\u097F])'
+    r'|(?P<bn>[\u0980-\u09FF])'
+    r'|(?P<pa>[\u0A00-\u0A7F])'
+    r'|(?P<gu>[\u0A80-\u0AFF])'
+    r'|(?P<ta>[\u0B80-\u0BFF])'
+    r'|(?P<te>[\u0C00-\u0C7F])'
+    r'|(?P<kn>[\u0C80-\u0CFF])'
+    r'|(?P<ml>[\u0D00-\u0D7F])'
+    r'|(?P<th>[\u0E00-\u0E7F])'
+    r'|(?P<ko>[\uAC00-\uD7AF\u1100-\u11FF])'
+    r'|(?P<zh>[\u4E00-\u9FFF])'
+    r'|(?P<el>[\u0370-\u03FF])'
+    r'|(?P<iw>[\u0590-\u05FF])'
+    r'|(?P<ar>[\u0600-\u06FF])'
+)
+_SCRIPT_LANGUAGES = {'zh': 'zh-CN'}
+# Languages whose text is (mostly) Latin script, so an all-ASCII sentence may still belong to them.
+_LATIN_LANGUAGES = {'en', 'es', 'fr', 'de', 'it', 'pt', 'nl', 'id', 'ms', 'sw', 'tl', 'af', 'da', 'no', 'sv', 'fi', 'pl', 'ro'}
+
+
+def script_language(text):
+    """
+    Returns the language implied by the writing system of `text`, or None when the
+    script alone doesn't decide it (Latin, Cyrillic, digits, punctuation).
+    """
+    if _KANA.search(text):
+        return 'ja'
+    match = _SCRIPTS.search(text)
+    if match is None:
+        return None
+    return _SCRIPT_LANGUAGES.get(match.lastgroup, match.lastgroup)
+
+
+class LanguageRouter:
+    """
+    Chooses the TTS language for each utterance without calling langdetect when it can.
+
+    In order: the per-session memo, the Unicode script of the text, the language of
+    the user's input this turn (for all-ASCII or ambiguous Latin text), and only then
+    langdetect.
+
+    Args:
+        default (str): Language used when nothing else decides.
+        max_cache (int): Number of routed utterances memoised per session.
+    """
+
+    def __init__(self, default='en', max_cache=1024):
+        self.default = default
+        self.max_cache = max_cache
+        self.turn_language = None
+        self._memo = OrderedDict()
+        self._lock = threading.Lock()
+
+    def warm_up(self):
+        """Loads langdetect's profiles on a background thread so the first real call doesn't pay for it."""
+        threading.Thread(target=self._detect, args=("warm up the language profiles",), daemon=True).start()
+
+    def reset(self):
+        """Starts a new session: forgets memoised results and the turn language."""
+        with self._lock:
+            self._memo.clear()
+            self.turn_language = None
+
+    def observe_user_input(self, text):
+        """
+        Records the language of what the user just said; the tutor replies in it.
+
+        Speech recognition usually returns plain ASCII even for Spanish or French, so the
+        input is always detected (script first, then langdetect once per turn). When
+        neither decides, the turn language stays unknown and non-ASCII replies are detected
+        instead.
+        """
+        lang_code = script_language(text)
+        if lang_code is None:
+            try:
+                lang_code = detect(text)
+            except LangDetectException:
+                lang_code = None
+            # Short Latin-script input is sometimes read as an unrelated language (Somali,
+            # Tagalog...); only trust the ones a reply could then be spoken in.
+            if lang_code not in _LATIN_LANGUAGES:
+                lang_code = None
+        self.turn_language = lang_code
+        return lang_code
+
+    def route(self, text):
+        """Returns the gTTS language code to speak `text` with."""
+        # ASCII and Latin text is routed by the turn language, so that is part of the memo key.
+        turn_language = self.turn_language
+        key = (text, turn_language)
+        with self._lock:
+            cached = self._memo.get(key)
+            if cached is not None:
+                self._memo.move_to_end(key)
+                return cached
+
+        lang_code = script_language(text)
+        if lang_code is None:
+            if text.isascii():
+                lang_code = turn_language if turn_language in _LATIN_LANGUAGES else self.default
+            elif turn_language is not None:
+                lang_code = turn_language
+            else:
+                lang_code = self._detect(text)
+
+        with self._lock:
+            self._memo[key] = lang_code
+            if len(self._memo) > self.max_cache:
+                self._memo.popitem(last=False)
+        return lang_code
+
+    def _detect(self, text):
+        try:
+            return detect(text)
+        except LangDetectException:
+            return self.default
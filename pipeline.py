@@ -0,0 +1,135 @@
+import queue
+import threading
+import time
+
+
+class StageStats:
+    """
+    Running latency and queue-depth figures for one pipeline stage.
+    Latency excludes time spent blocked on a full downstream queue, so a slow
+    consumer shows up as its own latency rather than inflating its producer's.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.total_seconds = 0.0
+        self.last_seconds = 0.0
+        self.max_seconds = 0.0
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+
+    def record(self, seconds, queue_depth):
+        self.count += 1
+        self.total_seconds += seconds
+        self.last_seconds = seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.queue_depth = queue_depth
+        self.max_queue_depth = max(self.max_queue_depth, queue_depth)
+
+    @property
+    def average_seconds(self):
+        return self.total_seconds / self.count if self.count else 0.0
+
+    def summary(self):
+        return (
+            f"{self.name}: last {self.last_seconds:.2f}s avg {self.average_seconds:.2f}s "
+            f"max {self.max_seconds:.2f}s n={self.count} queue={self.queue_depth} (max {self.max_queue_depth})"
+        )
+
+
+class Stage(threading.Thread):
+    """
+    A worker thread that takes items from its inbox, hands them to `handler(item, emit)`
+    and forwards whatever the handler emits to the next stage's inbox.
+
+    A stage without an inbox is a source: its handler is called repeatedly with `None`
+    until the pipeline stops, or until the handler raises StopIteration to say it is exhausted.
+    """
+
+    def __init__(self, name, handler, inbox, outbox, stop_event):
+        super().__init__(name=f"stage-{name}", daemon=True)
+        self.handler = handler
+        self.inbox = inbox
+        self.outbox = outbox
+        self.stop_event = stop_event
+        self.stats = StageStats(name)
+        self._blocked_seconds = 0.0
+
+    def emit(self, item):
+        if self.outbox is None:
+            return
+        start = time.perf_counter()
+        while not self.stop_event.is_set():
+            try:
+                self.outbox.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        self._blocked_seconds += time.perf_counter() - start
+
+    def run(self):
+        while not self.stop_event.is_set():
+            if self.inbox is None:
+                item = None
+            else:
+                try:
+                    item = self.inbox.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+            depth = self.inbox.qsize() if self.inbox is not None else 0
+            self._blocked_seconds = 0.0
+            start = time.perf_counter()
+            try:
+                self.handler(item, self.emit)
+            except StopIteration:
+                if self.inbox is None:
+                    break
+            except Exception as e:
+                print(f"Error in pipeline stage '{self.stats.name}': {e}")
+            self.stats.record(time.perf_counter() - start - self._blocked_seconds, depth)
+
+
+class Pipeline:
+    """
+    A chain of stages connected by bounded queues. Each stage runs on its own thread,
+    so a slow stage applies backpressure upstream instead of letting work pile up.
+
+    Args:
+        queue_size (int): Capacity of each queue between two stages.
+    """
+
+    def __init__(self, queue_size=4):
+        self.queue_size = queue_size
+        self.stages = []
+        self._stop_event = threading.Event()
+
+    def add_stage(self, name, handler):
+        """Appends a stage. The first stage added is the source and has no inbox."""
+        inbox = None
+        if self.stages:
+            inbox = queue.Queue(maxsize=self.queue_size)
+            self.stages[-1].outbox = inbox
+        self.stages.append(Stage(name, handler, inbox, None, self._stop_event))
+        return self
+
+    @property
+    def stopped(self):
+        return self._stop_event.is_set()
+
+    def start(self):
+        for stage in self.stages:
+            stage.start()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def wait(self):
+        """Blocks until every stage has exited after `stop()`."""
+        for stage in self.stages:
+            while stage.is_alive():
+                stage.join(timeout=0.5)
+
+    def report(self):
+        """Returns one line per stage, for spotting the bottleneck."""
+        return "\n".join(f"  [pipeline] {stage.stats.summary()}" for stage in self.stages)
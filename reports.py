@@ -0,0 +1,64 @@
+import threading
+
+
+class ReportWorker:
+    """
+    Generates performance reports on a background thread so the listen loop never waits on one.
+
+    Submissions are coalesced: while a report is being generated, newer turns overwrite
+    each other in a single pending slot, so only the latest history gets reported next.
+
+    Args:
+        generate_fn (callable): Called with a snapshot of the conversation history.
+        every_n_turns (int): Report after every N completed turns. 0 means only at session end.
+    """
+
+    def __init__(self, generate_fn, every_n_turns=1):
+        self.generate_fn = generate_fn
+        self.every_n_turns = every_n_turns
+        self._cond = threading.Condition()
+        self._pending = None
+        self._closed = False
+        self._turns = 0
+        self._reported_turn = 0
+        self._thread = threading.Thread(target=self._run, name="report-worker", daemon=True)
+        self._thread.start()
+
+    def turn_completed(self, history):
+        """Records a finished turn and schedules a report if the cadence calls for one."""
+        self._turns += 1
+        if self.every_n_turns > 0 and self._turns % self.every_n_turns == 0:
+            self._submit(history)
+
+    def close(self, history=None, wait=True):
+        """
+        Ends the session. Turns that have not been reported yet get one final report
+        on `history`, and with `wait=True` this blocks until it has been printed.
+        """
+        if history is not None and self._turns > self._reported_turn:
+            self._submit(history)
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if wait:
+            self._thread.join()
+
+    def _submit(self, history):
+        with self._cond:
+            # Snapshot the history so later turns can't mutate what is being reported on.
+            self._pending = list(history)
+            self._reported_turn = self._turns
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    self._cond.wait()
+                if self._pending is None:
+                    return
+                history, self._pending = self._pending, None
+            try:
+                self.generate_fn(history)
+            except Exception as e:
+                print(f"Could not generate report: {e}")
@@ -0,0 +1,80 @@
+import queue
+import threading
+from text_normalizer import SENTENCE_BOUNDARY, clean_for_speech
+
+_END_OF_STREAM = object()
+
+
+def iter_sentences(chunks):
+    """
+    Re-chunks a stream of text fragments into complete, speakable sentences.
+    Only the unfinished tail is kept between chunks, so each character is scanned
+    a bounded number of times however large the chunks are.
+
+    Args:
+        chunks (iterable): Text fragments in the order the model produced them.
+
+    Yields:
+        str: Each sentence, cleaned for speech, as soon as its boundary has arrived.
+        Whatever is left in the buffer when the stream ends is yielded last.
+    """
+    buffer = ""
+    for chunk in chunks:
+        if not chunk:
+            continue
+        # Boundaries can only appear in the new text, plus a few characters of
+        # look-behind into the old tail.
+        scan_from = max(0, len(buffer) - 4)
+        buffer += chunk
+        start = 0
+        for boundary in SENTENCE_BOUNDARY.finditer(buffer, scan_from):
+            sentence = clean_for_speech(buffer[start:boundary.start()])
+            start = boundary.end()
+            if sentence:
+                yield sentence
+        buffer = buffer[start:]
+    sentence = clean_for_speech(buffer)
+    if sentence:
+        yield sentence
+
+
+def speak_stream(chunks, speak_fn, on_sentence=None):
+    """
+    Speaks a streamed reply sentence by sentence while the rest is still generating.
+
+    The model stream is drained on a background thread into a queue, so generation
+    keeps going while `speak_fn` synthesizes and plays earlier sentences on the
+    calling thread.
+
+    Args:
+        chunks (iterable): Text fragments from the model.
+        speak_fn (callable): Called with each complete sentence, in order.
+        on_sentence (callable): Optional hook called with each sentence before it is spoken.
+
+    Returns:
+        str: The full reply text.
+    """
+    sentences = queue.Queue()
+
+    def produce():
+        try:
+            for sentence in iter_sentences(chunks):
+                sentences.put(sentence)
+        finally:
+            sentences.put(_END_OF_STREAM)
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+
+    spoken = []
+    while True:
+        sentence = sentences.get()
+        if sentence is _END_OF_STREAM:
+            break
+        spoken.append(sentence)
+        if on_sentence:
+            on_sentence(sentence)
+        speak_fn(sentence)
+
+    producer.join()
+    return " ".join(spoken)
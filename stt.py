@@ -0,0 +1,289 @@
+import collections
+import glob
+import json
+import os
+import time
+import numpy as np
+import speech_recognition as sr
+
+
+class GoogleSpeechBackend:
+    """The free Google Web Speech API. Needs network access for every utterance."""
+
+    def __init__(self, language="en-US"):
+        self.language = language
+
+    def transcribe(self, recognizer, audio):
+        return recognizer.recognize_google(audio, language=self.language)
+
+
+class VoskBackend:
+    """
+    Offline recognition on the CPU with Vosk (pip install vosk). The model is loaded
+    once, when the backend is built, instead of on the first utterance.
+    """
+
+    def __init__(self, model_path="model"):
+        from vosk import Model, SetLogLevel
+        SetLogLevel(-1)
+        self.model = Model(model_path)
+
+    def transcribe(self, recognizer, audio):
+        from vosk import KaldiRecognizer
+        kaldi = KaldiRecognizer(self.model, 16000)
+        kaldi.AcceptWaveform(audio.get_raw_data(convert_rate=16000, convert_width=2))
+        text = json.loads(kaldi.FinalResult()).get("text", "")
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+
+
+class SphinxBackend:
+    """Offline recognition on the CPU with CMU PocketSphinx (pip install pocketsphinx)."""
+
+    def __init__(self, language="en-US"):
+        self.language = language
+
+    def transcribe(self, recognizer, audio):
+        return recognizer.recognize_sphinx(audio, language=self.language)
+
+
+class TranscriptBackend:
+    """
+    Reads the expected transcript from a `.txt` file next to each WAV played by
+    `WavFileInput`. Together they run the whole loop deterministically, with no
+    microphone, model or network.
+    """
+
+    def transcribe(self, recognizer, audio):
+        path = getattr(audio, "source_path", None)
+        if path is None:
+            raise sr.UnknownValueError()
+        transcript_path = os.path.splitext(path)[0] + ".txt"
+        try:
+            with open(transcript_path, "r", encoding="utf-8") as f:
+                text = f.read().strip()
+        except OSError:
+            raise sr.UnknownValueError()
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+
+
+STT_BACKENDS = {
+    "google": lambda: GoogleSpeechBackend(language=os.getenv("STT_LANGUAGE", "en-US")),
+    "vosk": lambda: VoskBackend(model_path=os.getenv("VOSK_MODEL_PATH", "model")),
+    "sphinx": lambda: SphinxBackend(language=os.getenv("STT_LANGUAGE", "en-US")),
+    "transcript": TranscriptBackend,
+}
+
+
+def get_stt_backend(name):
+    """Builds the speech-to-text backend registered under `name`."""
+    try:
+        return STT_BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown speech recognition backend '{name}'. Choose one of: {', '.join(STT_BACKENDS)}")
+
+
+# numpy sample type of each sample width, in bytes, of signed PCM audio
+SAMPLE_TYPES = {1: np.int8, 2: np.int16, 4: np.int32}
+
+
+def rms(frame, sample_width=2):
+    """RMS energy of a frame of signed PCM samples, as audioop.rms computed it."""
+    samples = np.frombuffer(frame, SAMPLE_TYPES[sample_width]).astype(np.float64)
+    return float(np.sqrt(np.mean(samples ** 2))) if len(samples) else 0.0
+
+
+class EnergyVAD:
+    """
+    Energy-based voice activity detection. A frame is speech when its RMS energy is
+    well above the running noise floor. The floor is seeded by a one-off calibration
+    and then follows the ambient level through every frame judged to be silence.
+
+    Args:
+        sample_width (int): Bytes per sample.
+        threshold_ratio (float): How far above the noise floor a frame must be to count as speech.
+        min_energy (int): Absolute energy below which a frame is never speech.
+        noise_adaptation (float): Weight of each silent frame in the running noise floor.
+    """
+
+    def __init__(self, sample_width, threshold_ratio=3.0, min_energy=150, noise_adaptation=0.05):
+        self.sample_width = sample_width
+        self.threshold_ratio = threshold_ratio
+        self.min_energy = min_energy
+        self.noise_adaptation = noise_adaptation
+        self.noise_floor = None
+
+    def calibrate(self, frames):
+        energies = [rms(frame, self.sample_width) for frame in frames]
+        self.noise_floor = sum(energies) / len(energies) if energies else 0.0
+
+    def is_speech(self, frame):
+        energy = rms(frame, self.sample_width)
+        if self.noise_floor is None:
+            self.noise_floor = energy
+        speech = energy > max(self.noise_floor * self.threshold_ratio, self.min_energy)
+        if not speech:
+            self.noise_floor += self.noise_adaptation * (energy - self.noise_floor)
+        return speech
+
+
+class WebRTCVAD:
+    """
+    Voice activity detection with Google's WebRTC VAD (pip install webrtcvad). It needs
+    16-bit mono frames of 10, 20 or 30 ms, which is how MicrophoneInput reads them.
+
+    Args:
+        sample_rate (int): 8000, 16000, 32000 or 48000.
+        aggressiveness (int): 0 (least) to 3 (most aggressive about filtering out non-speech).
+    """
+
+    def __init__(self, sample_rate, aggressiveness=2):
+        import webrtcvad
+        self.sample_rate = sample_rate
+        self.vad = webrtcvad.Vad(aggressiveness)
+
+    def calibrate(self, frames):
+        pass
+
+    def is_speech(self, frame):
+        return self.vad.is_speech(frame, self.sample_rate)
+
+
+class MicrophoneInput:
+    """
+    Captures utterances from the default microphone, cutting each one as soon as a
+    voice activity detector hears the user stop.
+
+    The mic is opened once per session and calibrated once, on first use; after that
+    the energy VAD keeps its noise floor up to date from the silence between words.
+    The calibrated VAD outlives close(), so a later session reopens the mic without
+    calibrating again.
+
+    Args:
+        vad (str): "energy" or "webrtc".
+        sample_rate (int): Capture rate in Hz.
+        frame_ms (int): Length of each analysed frame.
+        start_ms (int): Continuous speech needed before an utterance starts.
+        end_silence_ms (int): Continuous silence that ends an utterance.
+        pre_roll_ms (int): Audio kept from before the start, so the first syllable isn't clipped.
+        max_utterance_s (float): Hard cap on the length of one utterance.
+        calibration_ms (int): Ambient audio used for the one-off calibration.
+    """
+
+    def __init__(self, vad="energy", sample_rate=16000, frame_ms=30, start_ms=90, end_silence_ms=500,
+                 pre_roll_ms=300, max_utterance_s=30, calibration_ms=500):
+        self.vad_name = vad
+        self.sample_rate = sample_rate
+        self.frame_samples = sample_rate * frame_ms // 1000
+        self.start_frames = max(1, start_ms // frame_ms)
+        self.end_frames = max(1, end_silence_ms // frame_ms)
+        self.frame_s = frame_ms / 1000
+        self.pre_roll_frames = max(1, pre_roll_ms // frame_ms)
+        self.max_frames = int(max_utterance_s * 1000 // frame_ms)
+        self.calibration_frames = max(1, calibration_ms // frame_ms)
+        self._microphone = None
+        self._source = None
+        self._vad = None
+
+    def _open(self):
+        if self._source is not None:
+            return
+        self._microphone = sr.Microphone(sample_rate=self.sample_rate, chunk_size=self.frame_samples)
+        self._source = self._microphone.__enter__()
+        if self._vad is not None:
+            return
+        if self.vad_name == "webrtc":
+            self._vad = WebRTCVAD(self.sample_rate)
+        else:
+            self._vad = EnergyVAD(self._source.SAMPLE_WIDTH)
+        print("Calibrating for background noise...")
+        self._vad.calibrate([self._read() for _ in range(self.calibration_frames)])
+
+    def _read(self):
+        return self._source.stream.read(self.frame_samples)
+
+    def _discard_buffered(self):
+        """Drops audio that queued up while we weren't listening, e.g. the tutor's own voice."""
+        stream = self._source.stream.pyaudio_stream
+        while stream.get_read_available() >= self.frame_samples:
+            self._read()
+
+    def close(self):
+        if self._microphone is not None:
+            self._microphone.__exit__(None, None, None)
+            self._microphone = self._source = None
+
+    def capture(self, recognizer, ready=None, stopped=None):
+        """
+        Waits until `ready()` is true, then returns the next utterance. The returned
+        AudioData carries `end_of_speech`, the perf_counter time the endpoint was
+        detected, and `end_silence_s`, how long the user had already been silent by
+        then. Returns None if `stopped()` became true first.
+        """
+        self._open()
+        while ready is not None and not ready():
+            self._discard_buffered()
+            if stopped is not None and stopped():
+                return None
+        self._discard_buffered()
+
+        print("Listening...")
+        pre_roll = collections.deque(maxlen=self.pre_roll_frames)
+        voiced_run = 0
+        while voiced_run < self.start_frames:
+            frame = self._read()
+            pre_roll.append(frame)
+            voiced_run = voiced_run + 1 if self._vad.is_speech(frame) else 0
+            if stopped is not None and stopped():
+                return None
+
+        frames = list(pre_roll)
+        silent_run = 0
+        while silent_run < self.end_frames and len(frames) < self.max_frames:
+            frame = self._read()
+            frames.append(frame)
+            silent_run = 0 if self._vad.is_speech(frame) else silent_run + 1
+
+        audio = sr.AudioData(b"".join(frames), self._source.SAMPLE_RATE, self._source.SAMPLE_WIDTH)
+        audio.end_of_speech = time.perf_counter()
+        audio.end_silence_s = silent_run * self.frame_s
+        return audio
+
+
+class WavFileInput:
+    """
+    Feeds pre-recorded WAV files in place of the microphone, one per turn, in sorted
+    order. Raises EOFError once every file has been played.
+
+    Args:
+        paths (list): WAV files, or directories whose `*.wav` files are used.
+    """
+
+    def __init__(self, paths):
+        self.paths = []
+        for path in paths:
+            if os.path.isdir(path):
+                self.paths.extend(sorted(glob.glob(os.path.join(path, "*.wav"))))
+            else:
+                self.paths.append(path)
+        self._next = 0
+
+    def capture(self, recognizer, ready=None, stopped=None):
+        while ready is not None and not ready():
+            if stopped is not None and stopped():
+                return None
+        if self._next >= len(self.paths):
+            raise EOFError("No more WAV input")
+        path = self.paths[self._next]
+        self._next += 1
+        print(f"Listening... (from {path})")
+        with sr.AudioFile(path) as source:
+            audio = recognizer.record(source)
+        audio.source_path = path
+        return audio
+
+    def close(self):
+        pass
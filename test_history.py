@@ -0,0 +1,80 @@
+import pytest
+
+from history import HistoryManager, content_text
+
+PREFIX = [{'role': 'user', 'parts': ["You are a tutor."]}, {'role': 'model', 'parts': ["Ready."]}]
+
+
+class FakeChat:
+    def __init__(self):
+        self.history = list(PREFIX)
+
+    def say(self, n):
+        self.history += [{'role': 'user', 'parts': [f"question {n}"]}, {'role': 'model', 'parts': [f"answer {n}"]}]
+
+
+def run_turns(chat, history, numbers):
+    for n in numbers:
+        chat.say(n)
+        history.turn_completed()
+        if history._pending is not None:
+            history._pending.result()
+
+
+def texts(chat):
+    return [content_text(c) for c in chat.history]
+
+
+@pytest.fixture
+def chat():
+    return FakeChat()
+
+
+def test_oldest_turns_are_folded_into_the_summary(chat):
+    folded = []
+
+    def summarize(summary, transcript):
+        folded.append(transcript)
+        return f"{summary} [{transcript.count('question')} turns]".strip()
+
+    history = HistoryManager(chat, summarize, keep_turns=2, max_tokens=10_000)
+    run_turns(chat, history, range(1, 5))
+    history.turn_completed()
+
+    assert folded[0] == "user: question 1\nmodel: answer 1"
+    assert chat.history[:2] == PREFIX
+    assert "summary of our conversation so far: [1 turns]" in texts(chat)[2]
+    assert texts(chat)[-4:] == ["question 3", "answer 3", "question 4", "answer 4"]
+    history.close()
+
+
+def test_token_budget_folds_even_within_keep_turns(chat):
+    history = HistoryManager(chat, lambda summary, transcript: "short", keep_turns=10, max_tokens=5)
+    run_turns(chat, history, range(1, 4))
+    history.turn_completed()
+    # At least the latest turn is always kept verbatim.
+    assert texts(chat)[-2:] == ["question 3", "answer 3"]
+    assert history.summary == "short"
+    history.close()
+
+
+@pytest.mark.parametrize("empty", ["", "   \n", None])
+def test_an_empty_summary_keeps_the_turns_and_the_previous_summary(chat, empty):
+    calls = []
+
+    def summarize(summary, transcript):
+        calls.append(transcript)
+        return "first summary" if len(calls) == 1 else empty
+
+    history = HistoryManager(chat, summarize, keep_turns=1, max_tokens=10_000)
+    run_turns(chat, history, range(1, 3))
+    run_turns(chat, history, [3])
+    assert history.summary == "first summary"
+
+    # The second fold comes back empty: nothing is dropped, and the fold is tried again.
+    run_turns(chat, history, [4])
+    assert history.summary == "first summary"
+    assert "first summary" in texts(chat)[2]
+    assert texts(chat)[4:] == ["question 2", "answer 2", "question 3", "answer 3", "question 4", "answer 4"]
+    assert len(calls) == 3 and calls[2].startswith("user: question 2")
+    history.close()
@@ -0,0 +1,66 @@
+import threading
+import time
+
+from pipeline import Pipeline
+
+QUEUE_SIZE = 2
+
+
+def test_a_slow_stage_holds_back_the_source():
+    produced, consumed, lead = [], [], []
+    done = threading.Event()
+
+    def source(_, emit):
+        if len(produced) == 20:
+            raise StopIteration
+        produced.append(len(produced))
+        emit(produced[-1])
+
+    def slow_sink(item, emit):
+        time.sleep(0.02)
+        lead.append(len(produced) - len(consumed))
+        consumed.append(item)
+        if len(consumed) == 20:
+            done.set()
+
+    pipeline = Pipeline(queue_size=QUEUE_SIZE).add_stage("source", source).add_stage("sink", slow_sink)
+    pipeline.start()
+    assert done.wait(timeout=5)
+    pipeline.stop()
+    pipeline.wait()
+
+    assert consumed == list(range(20))
+    # The queue, the item being handled and the one the source is blocked on.
+    assert max(lead) <= QUEUE_SIZE + 2
+    source_stats = pipeline.stages[0].stats
+    # Time blocked on the full queue is not counted as the source's own latency.
+    assert source_stats.max_seconds < 0.01
+    assert pipeline.stages[1].stats.max_queue_depth <= QUEUE_SIZE
+
+
+def test_items_pass_through_every_stage_in_order_and_errors_are_skipped(capsys):
+    results = []
+    items = iter(range(5))
+
+    def source(_, emit):
+        emit(next(items))
+
+    def double(item, emit):
+        if item == 3:
+            raise ValueError("bad item")
+        emit(item * 2)
+
+    def sink(item, emit):
+        results.append(item)
+
+    pipeline = Pipeline().add_stage("source", source).add_stage("double", double).add_stage("sink", sink)
+    pipeline.start()
+    deadline = time.monotonic() + 5
+    while len(results) < 4 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    pipeline.stop()
+    pipeline.wait()
+
+    assert results == [0, 2, 4, 8]
+    assert "Error in pipeline stage 'double': bad item" in capsys.readouterr().out
+    assert "[pipeline] sink:" in pipeline.report()
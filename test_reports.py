@@ -0,0 +1,86 @@
+import threading
+
+from reports import ReportWorker
+
+
+class BlockingGenerator:
+    """Records each report's history; the first report blocks until `release` is set."""
+
+    def __init__(self):
+        self.reports = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self, history):
+        self.started.set()
+        self.release.wait(timeout=5)
+        self.reports.append(history)
+
+
+def test_turns_finished_during_a_report_are_coalesced_into_one():
+    generate = BlockingGenerator()
+    worker = ReportWorker(generate, every_n_turns=1)
+    history = ["turn 1"]
+    worker.turn_completed(history)
+    assert generate.started.wait(timeout=5)
+    for n in range(2, 5):
+        history.append(f"turn {n}")
+        worker.turn_completed(history)
+    generate.release.set()
+    worker.close()
+    assert generate.reports == [["turn 1"], ["turn 1", "turn 2", "turn 3", "turn 4"]]
+
+
+def test_report_snapshots_the_history():
+    generate = BlockingGenerator()
+    worker = ReportWorker(generate, every_n_turns=1)
+    history = ["turn 1"]
+    worker.turn_completed(history)
+    assert generate.started.wait(timeout=5)
+    history.append("turn 2")
+    generate.release.set()
+    worker.close()
+    assert generate.reports[0] == ["turn 1"]
+
+
+def test_cadence_and_the_final_report_at_close():
+    generate = BlockingGenerator()
+    generate.release.set()
+    worker = ReportWorker(generate, every_n_turns=2)
+    history = ["turn 1"]
+    worker.turn_completed(history)
+    assert not generate.started.is_set()
+    history.append("turn 2")
+    worker.turn_completed(history)
+    assert generate.started.wait(timeout=5)
+    history.append("turn 3")
+    worker.turn_completed(history)
+    worker.close(history)
+    assert generate.reports == [["turn 1", "turn 2"], ["turn 1", "turn 2", "turn 3"]]
+
+
+def test_no_final_report_when_every_turn_was_reported():
+    reports = []
+    worker = ReportWorker(reports.append, every_n_turns=1)
+    worker.turn_completed(["turn 1"])
+    worker.close(["turn 1"])
+    assert reports == [["turn 1"]]
+
+
+def test_a_failing_report_does_not_stop_the_worker(capsys):
+    calls = []
+    first_done = threading.Event()
+
+    def generate(history):
+        calls.append(history)
+        if len(calls) == 1:
+            first_done.set()
+            raise RuntimeError("quota")
+
+    worker = ReportWorker(generate, every_n_turns=1)
+    worker.turn_completed(["a"])
+    assert first_done.wait(timeout=5)
+    worker.turn_completed(["a", "b"])
+    worker.close()
+    assert calls == [["a"], ["a", "b"]]
+    assert "Could not generate report: quota" in capsys.readouterr().out
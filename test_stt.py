@@ -0,0 +1,58 @@
+import math
+import struct
+
+import pytest
+
+import stt
+from stt import EnergyVAD, MicrophoneInput, rms
+
+
+def frame(*samples):
+    return struct.pack(f"<{len(samples)}h", *samples)
+
+
+def test_rms_of_16_bit_samples():
+    assert rms(frame(3, -4, 3, -4)) == pytest.approx(math.sqrt(12.5))
+    assert rms(frame(-32768, 32767)) == pytest.approx(32767.5, rel=1e-4)
+    assert rms(b"") == 0.0
+
+
+def test_energy_vad_hears_speech_above_the_noise_floor():
+    vad = EnergyVAD(2)
+    vad.calibrate([frame(100, -100)] * 5)
+    assert vad.noise_floor == pytest.approx(100)
+    assert not vad.is_speech(frame(120, -120))
+    assert vad.is_speech(frame(2000, -2000))
+
+
+class FakeMicrophone:
+    SAMPLE_WIDTH = 2
+    SAMPLE_RATE = 16000
+    opened = 0
+
+    def __init__(self, sample_rate, chunk_size):
+        self.stream = self
+        self.chunk_size = chunk_size
+
+    def __enter__(self):
+        FakeMicrophone.opened += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def read(self, size):
+        return frame(*[50] * size)
+
+
+def test_microphone_input_calibrates_once_across_sessions(monkeypatch):
+    monkeypatch.setattr(stt.sr, "Microphone", FakeMicrophone)
+    calibrations = []
+    monkeypatch.setattr(EnergyVAD, "calibrate", lambda self, frames: calibrations.append(len(frames)))
+
+    audio_input = MicrophoneInput()
+    for _ in range(3):
+        audio_input._open()
+        audio_input.close()
+    assert FakeMicrophone.opened == 3
+    assert calibrations == [audio_input.calibration_frames]
@@ -0,0 +1,112 @@
+import pytest
+
+from streaming import iter_sentences
+from text_normalizer import clean_for_speech, split_sentences
+
+MARKDOWN_REPLY = (
+    "## Great job today! 🎉\n\n"
+    "Here are **three** things to practise, and remember to *smile* 😊:\n"
+    "1. Say hello to a friend.\n"
+    "2. Count to 3.5. Then count back down!\n"
+    "- Read [a short story](https://example.com/story) out loud\n"
+    "> Practice makes progress, not perfection. 🌟\n"
+)
+
+
+def chunked(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Well done! 🎉👏", "Well done!"),
+    ("Family 👨‍👩‍👧 time", "Family time"),
+    ("Nice 👍work", "Nice work"),
+    ("Smile 😊, then wave 👋.", "Smile, then wave."),
+    ("你好，世界。こんにちは 안녕하세요", "你好，世界。こんにちは 안녕하세요"),
+    ("Read [the guide](https://example.com/guide) first", "Read the guide first"),
+    ("See https://example.com/a?b=c or www.example.com now", "See or now"),
+    ("# Title", "Title"),
+    ("### Smaller title", "Smaller title"),
+    ("- one\n* two\n+ three\n• four", "one\ntwo\nthree\nfour"),
+    ("1. first\n2) second", "first\nsecond"),
+    ("> quoted", "quoted"),
+    ("---", ""),
+    ("```python\nprint(1)\n```", "print(1)"),
+    ("<b>bold</b> text<br/>", "bold text"),
+    ("**bold**, *italic* and __strong__ ~~gone~~", "bold, italic and strong gone"),
+    ("Use `code` here", "Use code here"),
+    ("| a | b |", "a b"),
+])
+def test_clean_for_speech_removes_unspeakable_markup(text, expected):
+    assert clean_for_speech(text) == expected
+
+
+@pytest.mark.parametrize("text", [
+    "2*3=6",
+    "a * b",
+    "snake_case_name",
+    "Version 3.5 of n8n.io",
+    "Is 5 < 6? Yes.",
+])
+def test_clean_for_speech_keeps_ordinary_text(text):
+    assert clean_for_speech(text) == text
+
+
+def test_split_sentences_cleans_and_splits():
+    assert split_sentences(MARKDOWN_REPLY) == [
+        "Great job today!",
+        "Here are three things to practise, and remember to smile:",
+        "Say hello to a friend.",
+        "Count to 3.5.",
+        "Then count back down!",
+        "Read a short story out loud",
+        "Practice makes progress, not perfection.",
+    ]
+
+
+def test_split_sentences_keeps_decimals_and_domains_whole():
+    assert split_sentences("Pi is 3.14 and the site is n8n.io today. Bye!") == [
+        "Pi is 3.14 and the site is n8n.io today.",
+        "Bye!",
+    ]
+
+
+def test_split_sentences_on_cjk_and_devanagari_punctuation():
+    assert split_sentences("你好。 再见！ नमस्ते। ठीक है?") == ["你好。", "再见！", "नमस्ते।", "ठीक है?"]
+
+
+def test_split_sentences_drops_empty_pieces():
+    assert split_sentences("🎉\n- \n\nHello.\n\n") == ["Hello."]
+
+
+def test_iter_sentences_yields_each_sentence_once_its_boundary_arrives():
+    sentences = iter_sentences(["Hello the", "re. How a", "re you? I am"])
+    assert next(sentences) == "Hello there."
+    assert next(sentences) == "How are you?"
+    # The unfinished tail is only yielded when the stream ends.
+    assert list(sentences) == ["I am"]
+
+
+@pytest.mark.parametrize("chunks", [
+    ["Say **he", "llo** now. Done."],                         # inside a bold marker's text
+    ["Say *", "*hello** now. Done."],                         # between the two *s of a marker
+    ["Say [he", "llo](https://exa", "mple.com) now. Done."],  # inside a link and its url
+    ["Say hello now", ".", " Done."],                         # between the period and the space
+    ["Say hello now.", " ", "Done."],
+])
+def test_iter_sentences_handles_chunks_split_mid_sentence_and_mid_token(chunks):
+    assert list(iter_sentences(chunks)) == ["Say hello now.", "Done."]
+
+
+def test_iter_sentences_removes_an_emoji_run_split_across_chunks():
+    assert list(iter_sentences(["Say hello 🎉", "🎉 now. Done."])) == ["Say hello now.", "Done."]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 16, 64, 4096])
+def test_iter_sentences_matches_split_sentences_for_any_chunking(size):
+    assert list(iter_sentences(chunked(MARKDOWN_REPLY, size))) == split_sentences(MARKDOWN_REPLY)
+
+
+def test_iter_sentences_skips_empty_chunks():
+    assert list(iter_sentences(["", "Hi.", "", " Bye"])) == ["Hi.", "Bye"]
+    assert list(iter_sentences([])) == []
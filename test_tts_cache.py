@@ -0,0 +1,73 @@
+import os
+
+import tts_cache
+from tts_cache import DiskTier, MemoryTier, TTSCache, cache_key
+
+
+def synthesizer(calls):
+    def synthesize(text, lang_code, **voice):
+        calls.append(text)
+        return f"{lang_code}:{text}".encode("utf-8")
+    return synthesize
+
+
+def test_cache_key_ignores_whitespace_but_not_language_or_voice():
+    assert cache_key("Hello  there\n", "en") == cache_key("Hello there", "en")
+    assert cache_key("Hello there", "en") != cache_key("Hello there", "hi")
+    assert cache_key("Hello there", "en", tld="co.uk") != cache_key("Hello there", "en")
+
+
+def test_memory_tier_evicts_the_least_recently_used_clips_over_budget():
+    memory = MemoryTier(max_bytes=10)
+    memory.put("a", b"aaaa")
+    memory.put("b", b"bbbb")
+    memory.get("a")
+    memory.put("c", b"cccc")
+    assert memory.get("b") is None
+    assert memory.get("a") == b"aaaa" and memory.get("c") == b"cccc"
+    assert memory.size == 8
+    memory.put("huge", b"x" * 11)
+    assert memory.get("huge") is None
+
+
+def test_disk_tier_survives_a_restart_and_evicts_by_recency(tmp_path):
+    disk = DiskTier(str(tmp_path), max_bytes=10)
+    disk.put("a", b"aaaa")
+    disk.put("b", b"bbbb")
+    os.utime(tmp_path / "a.mp3", (1, 1))
+    os.utime(tmp_path / "b.mp3", (2, 2))
+
+    reopened = DiskTier(str(tmp_path), max_bytes=10)
+    assert reopened.size == 8
+    reopened.put("c", b"cccc")
+    assert not (tmp_path / "a.mp3").exists()
+    assert reopened.get("a") is None
+    assert reopened.get("b") == b"bbbb"
+
+
+def test_tts_cache_checks_memory_then_disk_before_synthesizing(tmp_path):
+    calls = []
+    cache = TTSCache(memory_bytes=1024, directory=str(tmp_path))
+    assert cache.get_or_synthesize("Hi", "en", synthesizer(calls)) == b"en:Hi"
+    assert cache.get_or_synthesize("Hi", "en", synthesizer(calls)) == b"en:Hi"
+
+    restarted = TTSCache(memory_bytes=1024, directory=str(tmp_path))
+    assert restarted.get_or_synthesize("Hi", "en", synthesizer(calls)) == b"en:Hi"
+    assert calls == ["Hi"]
+    assert (cache.memory_hits, cache.misses, restarted.disk_hits) == (1, 1, 1)
+
+
+def test_a_failed_disk_write_is_logged_and_skipped(tmp_path, monkeypatch, capsys):
+    calls = []
+    cache = TTSCache(memory_bytes=1024, directory=str(tmp_path))
+
+    def disk_full(*args):
+        raise OSError(28, "No space left on device")
+    monkeypatch.setattr(tts_cache.os, "replace", disk_full)
+
+    assert cache.get_or_synthesize("Hi", "en", synthesizer(calls)) == b"en:Hi"
+    assert "could not write" in capsys.readouterr().out
+    assert cache.disk.size == 0
+    assert os.listdir(tmp_path) == []
+    assert cache.get_or_synthesize("Hi", "en", synthesizer(calls)) == b"en:Hi"
+    assert calls == ["Hi"]
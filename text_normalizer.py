@@ -0,0 +1,80 @@
+import re
+
+# Emoji and pictographs only. The old class ran from U+24C2 all the way to U+1F251,
+# which also swallowed every CJK, kana and Hangul character.
+_EMOJI = (
+    "\U0001F000-\U0001FAFF"  # emoticons, pictographs, transport, flags, supplemental symbols
+    "\U00002600-\U000027BF"  # misc symbols and dingbats
+    "\U00002300-\U000023FF"  # misc technical (watch, hourglass, ...)
+    "\U00002B00-\U00002BFF"  # arrows and stars
+    "\U0000FE00-\U0000FE0F"  # variation selectors
+    "\U0000200D\U000020E3"   # zero-width joiner, keycap
+    "\U000E0020-\U000E007F"  # tag characters used by subdivision flags
+    "\U000024C2\U00003030\U0000303D\U00003297\U00003299"
+)
+
+# Everything TTS should not read aloud, as one alternation so a single pass handles it all.
+# The leading guard lets the engine skip ordinary characters without trying every branch:
+# a match can only start at a line start or at one of these characters.
+_UNSPEAKABLE = re.compile(
+    rf'(?:^|(?=[\[hw`*_~|<{_EMOJI}]))(?:'
+    r'\[([^\]\n]*)\]\([^)\n]*\)'                  # [text](url) -> text
+    # Bare URLs, emoji runs and table pipes (see _replace for the spaces before them).
+    rf'|(?P<gap>https?://\S+|www\.\S+|[{_EMOJI}]+|\|)'
+    r'|```[^\n]*'                                  # code fences, with their language tag
+    r'|^[ \t]*(?:'
+    r'#{1,6}[ \t]+'                                # # Heading
+    r'|(?:[-*_][ \t]*){3,}$'                       # --- horizontal rules
+    r'|(?:[-*+•]|\d{1,2}[.)])[ \t]+'               # list markers
+    r'|>[ \t]?'                                    # > blockquotes
+    r')'
+    r'|</?[a-zA-Z][^>\n]*>'                        # inline HTML tags
+    r'|(?<!\w)\*+(?=\w)|(?<=\w)\*+(?!\w)'          # *emphasis* runs, but not the * in 2*3
+    r'|_{2,}|~~|`+'                                # bold/strike/code markers
+    r')',
+    re.MULTILINE,
+)
+
+# A sentence ends at terminal punctuation (Latin, CJK or Devanagari) followed by whitespace,
+# or at a line break (list items and headings rarely end in punctuation). Requiring the
+# whitespace means "3.5" or "n8n.io" is never cut, and list numbers like "1." at the start
+# of a line are not treated as sentences of their own.
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?。！？।])(?<!^\d\.)(?<!^\d\d\.)\s+|[ \t]*\n\s*', re.MULTILINE)
+
+
+# Left by _replace where the spaces before a removed token should go too.
+_TRIM = "\x00"
+
+
+def _replace(match):
+    if match.group('gap') is None:
+        return match.group(1) or ""
+    # A URL, emoji run or pipe before a space, punctuation or the end takes the spaces
+    # before it along, so "smile 😊:" reads "smile:" and "Family 👨‍👩‍👧 time" "Family time".
+    return "" if match.string[match.end():match.end() + 1].isalnum() else _TRIM
+
+
+def _strip(text):
+    """Removes every _UNSPEAKABLE match, then the spaces before each _TRIM left behind."""
+    text = _UNSPEAKABLE.sub(_replace, text)
+    if _TRIM not in text:
+        return text
+    *pieces, last = text.split(_TRIM)
+    return "".join(piece.rstrip(" \t") for piece in pieces) + last
+
+
+def clean_for_speech(text):
+    """
+    Strips emoji, markdown syntax, URLs and HTML from `text` in one regex pass,
+    leaving only what should be read aloud.
+    """
+    return _strip(text).strip()
+
+
+def split_sentences(text):
+    """
+    Cleans `text` and splits it into speakable sentences. Pieces that are left empty
+    after cleaning (a bare bullet, an emoji on its own line) are dropped.
+    """
+    pieces = SENTENCE_BOUNDARY.split(_strip(text))
+    return [sentence for sentence in (piece.strip() for piece in pieces) if sentence]
@@ -0,0 +1,85 @@
+import io
+import os
+import threading
+import time
+from gtts import gTTS
+
+
+def synthesize(text, lang_code, **voice):
+    """
+    Synthesizes speech for `text` straight into memory.
+    Extra keyword arguments are gTTS voice parameters such as `tld` or `slow`.
+
+    Returns:
+        bytes: MP3-encoded audio.
+    """
+    buffer = io.BytesIO()
+    gTTS(text=text, lang=lang_code, **voice).write_to_fp(buffer)
+    return buffer.getvalue()
+
+
+class PygamePlayback:
+    """
+    Plays MP3 bytes from memory through pygame's mixer. The mixer is initialised
+    lazily on first use, and playback is serialised because pygame has one music channel.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._mixer = None
+
+    def play(self, audio):
+        with self._lock:
+            if self._mixer is None:
+                import pygame
+                pygame.mixer.init()
+                self._mixer = pygame.mixer
+            self._mixer.music.load(io.BytesIO(audio), "mp3")
+            self._mixer.music.play()
+            while self._mixer.music.get_busy():
+                time.sleep(0.05)
+            self._mixer.music.unload()
+
+
+class NullPlayback:
+    """Discards audio. Useful for running the tutor without speakers."""
+
+    def play(self, audio):
+        pass
+
+
+class RecordingPlayback:
+    """Keeps every clip it is asked to play, in order, instead of playing it."""
+
+    def __init__(self):
+        self.clips = []
+
+    def play(self, audio):
+        self.clips.append(audio)
+
+
+PLAYBACK_BACKENDS = {
+    "pygame": PygamePlayback,
+    "null": NullPlayback,
+    "recording": RecordingPlayback,
+}
+
+
+def get_playback_backend(name):
+    """Builds the playback backend registered under `name`."""
+    try:
+        return PLAYBACK_BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown playback backend '{name}'. Choose one of: {', '.join(PLAYBACK_BACKENDS)}")
+
+
+def dump_audio(audio, directory):
+    """
+    Writes a clip to `directory` for debugging. Every clip gets its own file name,
+    so concurrent sessions never overwrite each other.
+    """
+    os.makedirs(directory, exist_ok=True)
+    filename = os.path.join(directory, f"tts-{time.time_ns()}-{threading.get_ident()}.mp3")
+    with open(filename, "wb") as f:
+        f.write(audio)
+    return filename
@@ -0,0 +1,182 @@
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def cache_key(text, lang_code, **voice):
+    """
+    Content address for a clip: the normalised text, the language and any voice parameters.
+    Whitespace differences don't change the audio, so they don't change the key either.
+    """
+    normalized = _WHITESPACE.sub(" ", text).strip()
+    voice_part = ",".join(f"{name}={voice[name]}" for name in sorted(voice))
+    return hashlib.sha256(f"{lang_code}\0{voice_part}\0{normalized}".encode("utf-8")).hexdigest()
+
+
+class MemoryTier:
+    """An LRU of clips bounded by their total size in bytes."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._clips = OrderedDict()
+
+    def get(self, key):
+        audio = self._clips.get(key)
+        if audio is not None:
+            self._clips.move_to_end(key)
+        return audio
+
+    def put(self, key, audio):
+        if len(audio) > self.max_bytes:
+            return
+        if key in self._clips:
+            self.size -= len(self._clips.pop(key))
+        self._clips[key] = audio
+        self.size += len(audio)
+        while self.size > self.max_bytes:
+            _, evicted = self._clips.popitem(last=False)
+            self.size -= len(evicted)
+
+
+class DiskTier:
+    """
+    An LRU of clips stored as `<key>.mp3` files in `directory`, bounded by total size.
+    Recency survives restarts because hits touch the file's mtime.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._sizes = OrderedDict()
+        os.makedirs(directory, exist_ok=True)
+        entries = []
+        for name in os.listdir(directory):
+            if name.endswith(".mp3"):
+                stat = os.stat(os.path.join(directory, name))
+                entries.append((stat.st_mtime, name[:-4], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._sizes[key] = size
+            self.size += size
+        self._evict()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.mp3")
+
+    def get(self, key):
+        if key not in self._sizes:
+            return None
+        try:
+            with open(self._path(key), "rb") as f:
+                audio = f.read()
+            os.utime(self._path(key))
+        except OSError:
+            self.size -= self._sizes.pop(key)
+            return None
+        self._sizes.move_to_end(key)
+        return audio
+
+    def write(self, key, audio):
+        """
+        Writes a clip's file without touching the tier's bookkeeping, so it can run outside
+        the cache's lock; `add()` records it afterwards. A failed write (disk full, directory
+        gone) is logged and skipped: the clip just isn't cached on disk.
+
+        Returns:
+            bool: Whether the clip was written.
+        """
+        if len(audio) > self.max_bytes:
+            return False
+        # Write then rename, so another session never reads a half-written clip.
+        tmp_path = f"{self._path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(audio)
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            print(f"TTS cache: could not write {self._path(key)}: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return False
+        return True
+
+    def add(self, key, size):
+        """Records a clip written by `write()`, evicting the least recently used ones over budget."""
+        if key in self._sizes:
+            self.size -= self._sizes.pop(key)
+        self._sizes[key] = size
+        self.size += size
+        self._evict()
+
+    def put(self, key, audio):
+        if self.write(key, audio):
+            self.add(key, len(audio))
+
+    def _evict(self):
+        while self.size > self.max_bytes and self._sizes:
+            key, size = self._sizes.popitem(last=False)
+            self.size -= size
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+
+class TTSCache:
+    """
+    Two-tier cache of synthesized speech. Memory is checked first, then disk (if a
+    directory is configured); a hit in either skips the network TTS call entirely.
+
+    Args:
+        memory_bytes (int): Size budget of the in-memory tier.
+        directory (str): Directory for the on-disk tier, or None to keep everything in memory.
+        disk_bytes (int): Size budget of the on-disk tier.
+    """
+
+    def __init__(self, memory_bytes=8 * 1024 * 1024, directory=None, disk_bytes=64 * 1024 * 1024):
+        self._lock = threading.Lock()
+        self.memory = MemoryTier(memory_bytes)
+        self.disk = DiskTier(directory, disk_bytes) if directory else None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get_or_synthesize(self, text, lang_code, synthesize_fn, **voice):
+        """Returns cached audio for the clip, calling `synthesize_fn(text, lang_code, **voice)` on a miss."""
+        key = cache_key(text, lang_code, **voice)
+        with self._lock:
+            audio = self.memory.get(key)
+            if audio is not None:
+                self.memory_hits += 1
+                return audio
+            if self.disk is not None:
+                audio = self.disk.get(key)
+                if audio is not None:
+                    self.disk_hits += 1
+                    self.memory.put(key, audio)
+                    return audio
+            self.misses += 1
+
+        audio = synthesize_fn(text, lang_code, **voice)
+        with self._lock:
+            self.memory.put(key, audio)
+        # The file is written outside the lock, so a slow disk never holds up other lookups.
+        if self.disk is not None and self.disk.write(key, audio):
+            with self._lock:
+                self.disk.add(key, len(audio))
+        return audio
+
+    def summary(self):
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        hit_rate = (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0
+        return (
+            f"TTS cache: {self.memory_hits} memory hits, {self.disk_hits} disk hits, "
+            f"{self.misses} misses ({hit_rate:.0%} hit rate)"
+        )
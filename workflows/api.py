@@ -1,9 +1,22 @@
-import json
-import sys
-import subprocess
-from fastapi import FastAPI, HTTPException, BackgroundTasks
-from fastapi.responses import JSONResponse
+import gzip
+import hashlib
+import os
+import threading
+import time
+import zlib
+from collections import namedtuple
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from dataset_files import dataset_path, read_columns
+from jobs import RefreshJob
+from metrics import CONTENT_TYPE, Registry
+from query_index import DEFAULT_PAGE_SIZE, QueryIndex
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
 app = FastAPI(
     title="n8n Workflow Popularity API",
@@ -17,41 +30,301 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"], 
     allow_headers=["*"], 
+    expose_headers=["X-Total-Count", "X-Next-Cursor"],
 )
 
-DATA_FILE = 'final_dataset.json'
+# The pipeline runs in, and writes its dataset to, the directory of this file, wherever
+# the server was started from.
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_FILE = dataset_path(BASE_DIR)
+# How often, at most, the dataset file is stat()ed for changes.
+DATASET_CHECK_INTERVAL_S = 1.0
+# Preferred order when the client accepts several encodings equally.
+ENCODING_PREFERENCE = ['br', 'gzip', 'identity']
+# Buckets for collector task durations, which run for seconds to minutes.
+TASK_DURATION_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1800)
+
+# Served at GET /metrics. API metrics are recorded as requests are served; pipeline metrics
+# from the refresh job's progress events as they arrive (see record_pipeline_event).
+metrics = Registry()
+request_duration = metrics.histogram(
+    'api_request_duration_seconds', 'Time until the response starts, by route.', ('method', 'route', 'status'))
+dataset_requests = metrics.counter(
+    'api_dataset_requests_total',
+    'Full-dataset requests by result: not_modified (the client\'s ETag matched) or sent.', ('result',))
+dataset_records = metrics.gauge('dataset_records', 'Workflows in the loaded dataset.')
+dataset_body_bytes = metrics.gauge('dataset_body_bytes', 'Size of the pre-encoded dataset body.', ('encoding',))
+dataset_age = metrics.gauge('dataset_age_seconds', 'Seconds since the loaded dataset file was written.')
+refresh_running = metrics.gauge('refresh_running', '1 while a refresh is running.')
+refresh_last_success_age = metrics.gauge(
+    'refresh_last_success_age_seconds', 'Seconds since the last successful refresh finished.')
+stage_duration = metrics.gauge(
+    'pipeline_stage_duration_seconds', 'Duration of each stage in the latest refresh.', ('stage',))
+collector_task_duration = metrics.histogram(
+    'pipeline_collector_task_duration_seconds', 'Duration of collector tasks.', ('source',), TASK_DURATION_BUCKETS)
+collector_records = metrics.counter('pipeline_collector_records_total', 'Records emitted by collectors.', ('source',))
+collector_errors = metrics.counter('pipeline_collector_errors_total', 'Collector tasks that failed.', ('source',))
+# Per-host counters of concurrency.HOST_STATS.
+host_counters = {
+    'requests': metrics.counter('pipeline_http_requests_total', 'Requests sent by the collectors.', ('host',)),
+    'retries': metrics.counter('pipeline_http_retries_total', 'Requests retried after an error.', ('host',)),
+    'cache_hits': metrics.counter(
+        'pipeline_http_cache_hits_total', 'Responses revalidated from the HTTP cache (304).', ('host',)),
+    'bytes': metrics.counter('pipeline_http_response_bytes_total', 'Response body bytes received.', ('host',)),
+    'rate_limit_wait_s': metrics.counter(
+        'pipeline_rate_limit_wait_seconds_total', 'Time spent waiting for the host rate limit, including retry backoff.', ('host',)),
+}
+
+# One loaded version of the dataset: the number of records, the compact JSON body, the body
+# pre-compressed per encoding, the ETag of each encoding, the file stamp it came from,
+# and the query indexes for filtered pages.
+Dataset = namedtuple('Dataset', ['count', 'bodies', 'etags', 'stamp', 'index'])
+
+
+def file_stamp(path):
+    stat = os.stat(path)
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
 
-def run_pipeline_script():
+
+def load_dataset(path):
     """
-    Executes the main.py script as a subprocess to re-collect and process all data.
-    This is a robust way to run the script without blocking the API.
+    Reads the dataset file once (memory-mapped, for the Arrow file), encodes it for every
+    supported Content-Encoding and builds its query indexes. The body is the records'
+    pre-serialized JSON joined together; no record is parsed from the Arrow file.
     """
-    print("Starting data pipeline execution...")
-    try:
-        python_executable = sys.executable
-        process = subprocess.run(
-            [python_executable, "main.py"],
-            capture_output=True,
-            text=True,
-            check=True
-        )
-        print("Pipeline script finished successfully.")
-        print(process.stdout)
-    except subprocess.CalledProcessError as e:
-        print("--- ERROR: Pipeline script failed ---")
-        print(e.stderr)
-    except Exception as e:
-        print(f"An unexpected error occurred while running the pipeline: {e}")
+    stamp = file_stamp(path)
+    columns = read_columns(path)
+    body = b'[' + b','.join(columns.records) + b']'
+    bodies = {'identity': body, 'gzip': gzip.compress(body, compresslevel=6)}
+    if brotli is not None:
+        bodies['br'] = brotli.compress(body, quality=5)
+    digest = hashlib.sha256(body).hexdigest()[:32]
+    # Strong ETags must differ between encodings of the same content.
+    etags = {
+        encoding: f'"{digest}"' if encoding == 'identity' else f'"{digest}-{encoding}"'
+        for encoding in bodies
+    }
+    return Dataset(len(columns.records), bodies, etags, stamp, QueryIndex(columns, digest[:12]))
+
+
+class DatasetCache:
+    """
+    Keeps the dataset in memory, already serialized and compressed, so a request costs a
+    dictionary lookup instead of reading, parsing and re-encoding megabytes of JSON.
+
+    The file is stat()ed at most once per `check_interval`. When its inode, mtime or size
+    changes it is reloaded on a background thread while requests keep being served from
+    the previous version; the new version is swapped in once it is ready. A file that
+    fails to parse (e.g. caught mid-write) is skipped and retried on the next check.
+
+    Args:
+        path (str): The dataset file.
+        check_interval (float): Seconds between checks for a new file.
+    """
+
+    def __init__(self, path=DATA_FILE, check_interval=DATASET_CHECK_INTERVAL_S):
+        self.path = path
+        self.check_interval = check_interval
+        self._dataset = None
+        self._checked_at = 0.0
+        self._reloading = False
+        self._lock = threading.Lock()
+
+    def _reload(self):
+        try:
+            self.reload()
+        finally:
+            self._reloading = False
+
+    def reload(self):
+        """Loads the file now and swaps it in; requests keep the old version until then."""
+        try:
+            dataset = load_dataset(self.path)
+            self._dataset = dataset
+            self._checked_at = time.monotonic()
+            print(f"Loaded {dataset.count} workflows from {self.path}")
+        except (OSError, ValueError) as e:
+            print(f"Could not reload {self.path}: {e}")
+
+    def get(self):
+        """
+        Returns the current Dataset. Only the very first load blocks.
+        Raises FileNotFoundError if the dataset has never existed.
+        """
+        dataset = self._dataset
+        if dataset is None:
+            with self._lock:
+                if self._dataset is None:
+                    self._dataset = load_dataset(self.path)
+                    self._checked_at = time.monotonic()
+                return self._dataset
+
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval or self._reloading:
+            return dataset
+        with self._lock:
+            if self._reloading or now - self._checked_at < self.check_interval:
+                return self._dataset
+            self._checked_at = now
+            try:
+                changed = file_stamp(self.path) != dataset.stamp
+            except OSError:
+                changed = False
+            if changed:
+                self._reloading = True
+                threading.Thread(target=self._reload, name="dataset-reload", daemon=True).start()
+        return dataset
+
+
+def negotiate_encoding(accept_encoding, available):
+    """
+    Picks the Content-Encoding for an Accept-Encoding header, honouring q-values.
+    Falls back to identity when nothing better is acceptable.
+    """
+    weights = {}
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        weights[name] = quality
+
+    def weight(encoding):
+        if encoding in weights:
+            return weights[encoding]
+        if encoding == 'identity':
+            # Always acceptable unless refused outright, but only as a last resort.
+            return weights.get('*') or 0.001
+        return weights.get('*', 0.0)
+
+    candidates = [encoding for encoding in ENCODING_PREFERENCE if encoding in available and weight(encoding) > 0]
+    if not candidates:
+        return 'identity'
+    return max(candidates, key=lambda encoding: (weight(encoding), -ENCODING_PREFERENCE.index(encoding)))
+
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    return etag in (tag.strip().removeprefix('W/') for tag in if_none_match.split(','))
+
+
+def cached_response(request, dataset):
+    """The pre-encoded dataset body, or a 304 when the client already has this version."""
+    encoding = negotiate_encoding(request.headers.get('accept-encoding', ''), dataset.bodies)
+    etag = dataset.etags[encoding]
+    headers = {'ETag': etag, 'Vary': 'Accept-Encoding', 'Cache-Control': 'no-cache'}
+    if etag_matches(request.headers.get('if-none-match'), etag):
+        dataset_requests.inc(result='not_modified')
+        return Response(status_code=304, headers=headers)
+    dataset_requests.inc(result='sent')
+    if encoding != 'identity':
+        headers['Content-Encoding'] = encoding
+    return Response(content=dataset.bodies[encoding], media_type='application/json', headers=headers)
+
+
+def gzip_stream(chunks):
+    """
+    Gzips a stream chunk by chunk. Each chunk is flushed, so the client can decode and use
+    what it has received so far.
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+class PipelineEvents:
+    """
+    Turns the pipeline's progress events into metrics while a refresh runs.
+
+    The pipeline reports its per-host counters as totals since its process started, so
+    only the increase since the previous event is added to the counters.
+    """
+
+    def __init__(self):
+        self._host_totals = {}
+        self._stage_started = {}
+
+    def __call__(self, event):
+        stage, status, at = event.get('stage'), event.get('status'), event.get('time')
+        if status == 'started':
+            if stage == 'collect':
+                # The first stage of a new pipeline process, whose counters start at zero.
+                self._host_totals.clear()
+            self._stage_started[stage] = at
+        elif status in ('done', 'failed') and stage in self._stage_started and at:
+            stage_duration.set(round(at - self._stage_started[stage], 3), stage=stage)
+
+        if stage == 'collect' and status == 'progress':
+            source = event.get('source')
+            collector_task_duration.observe(event.get('duration_s') or 0.0, source=source)
+            collector_records.inc(event.get('records') or 0, source=source)
+            if event.get('error'):
+                collector_errors.inc(source=source)
+
+        for host, totals in (event.get('hosts') or {}).items():
+            previous = self._host_totals.get(host, {})
+            for name, counter in host_counters.items():
+                increase = totals.get(name, 0) - previous.get(name, 0)
+                if increase > 0:
+                    counter.inc(increase, host=host)
+            self._host_totals[host] = totals
+
+
+dataset_cache = DatasetCache()
+refresh_job = RefreshJob(os.path.join(BASE_DIR, 'main.py'), cwd=BASE_DIR, on_success=dataset_cache.reload,
+                         on_event=PipelineEvents())
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    # The route's path template, so /workflows?platform=... is one series, not one per query.
+    route = request.scope.get('route')
+    request_duration.observe(time.perf_counter() - start, method=request.method,
+                             route=getattr(route, 'path', 'unmatched'), status=response.status_code)
+    return response
 
 @app.get("/workflows", tags=["Workflows"])
-def get_workflows():
+def get_workflows(request: Request, platform: str = None, country: str = None, min_score: float = None,
+                  sort: str = None, limit: int = None, cursor: str = None):
     """
     Retrieve the consolidated and ranked list of popular n8n workflows.
+
+    Without query parameters, returns the whole list, served from memory with an ETag;
+    send it back in If-None-Match to get a 304 when nothing changed. gzip (and brotli,
+    if installed) are used when the client accepts them.
+
+    With any of `platform`, `country`, `min_score`, `sort` (score or a metric such as
+    views or stars), `limit` or `cursor`, returns one page as
+    `{"items": [...], "total": n, "next_cursor": ...}`; pass `next_cursor` back as
+    `cursor` for the next page.
     """
     try:
-        with open(DATA_FILE, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        return JSONResponse(content=data)
+        dataset = dataset_cache.get()
+        if all(value is None for value in (platform, country, min_score, sort, limit, cursor)):
+            return cached_response(request, dataset)
+        try:
+            body = dataset.index.page(
+                sort=sort or 'score', platform=platform, country=country, min_score=min_score,
+                cursor=cursor, limit=DEFAULT_PAGE_SIZE if limit is None else limit
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return Response(content=body, media_type='application/json', headers={'Cache-Control': 'no-cache'})
+    except HTTPException:
+        raise
     except FileNotFoundError:
         raise HTTPException(
             status_code=404, 
@@ -63,14 +336,89 @@ def get_workflows():
             detail=f"An internal server error occurred: {e}"
         )
 
-@app.post("/refresh", tags=["Actions"])
-def trigger_refresh(background_tasks: BackgroundTasks):
+@app.get("/workflows/stream", tags=["Workflows"])
+def stream_workflows(request: Request, platform: str = None, country: str = None, min_score: float = None,
+                     sort: str = None, limit: int = None, cursor: str = None):
+    """
+    Streams the matching workflows as NDJSON (`application/x-ndjson`, one workflow per line),
+    best first, so clients can use the first records before the last ones are sent.
+
+    Takes the same parameters as GET /workflows. Without `limit` every match is sent;
+    with it, one page, and `X-Next-Cursor` (absent on the last page) is the `cursor` of
+    the next. `X-Total-Count` is the number of matching workflows.
+    Records are sent from the in-memory dataset in chunks of about 64 KB, each one only
+    after the previous one was handed to the connection, and gzip-compressed per chunk
+    when the client accepts it.
+    """
+    try:
+        dataset = dataset_cache.get()
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=404,
+            detail="Dataset not found. Please run the main.py script first to generate it."
+        )
+    try:
+        total, next_cursor, chunks = dataset.index.stream(
+            sort=sort or 'score', platform=platform, country=country, min_score=min_score,
+            cursor=cursor, limit=limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    headers = {'X-Total-Count': str(total), 'Cache-Control': 'no-cache', 'Vary': 'Accept-Encoding'}
+    if next_cursor:
+        headers['X-Next-Cursor'] = next_cursor
+    if negotiate_encoding(request.headers.get('accept-encoding', ''), ('gzip', 'identity')) == 'gzip':
+        headers['Content-Encoding'] = 'gzip'
+        chunks = gzip_stream(chunks)
+    return StreamingResponse(chunks, media_type='application/x-ndjson', headers=headers)
+
+
+@app.post("/refresh", tags=["Actions"], status_code=202)
+def trigger_refresh():
+    """
+    Starts the data collection and processing pipeline in a background process.
+
+    Only one refresh runs at a time: a request made while one is running joins it.
+    Follow its progress at GET /refresh/status. The new dataset is published atomically
+    and picked up by GET /workflows without interrupting it.
     """
-    Triggers a background task to re-run the entire data collection and processing pipeline.
-    This allows the API to respond immediately while the work happens in the background.
+    started = refresh_job.start()
+    message = ("Data refresh process started in the background. It may take a few minutes to complete."
+               if started else "A data refresh is already running; this request joined it.")
+    return JSONResponse(status_code=202, content={"message": message, "started": started, "job": refresh_job.status()})
+
+
+@app.get("/refresh/status", tags=["Actions"])
+def refresh_status():
+    """
+    State of the current or most recent refresh (idle, running, succeeded or failed),
+    with the progress of each pipeline stage.
     """
-    background_tasks.add_task(run_pipeline_script)
-    return JSONResponse(content={"message": "Data refresh process started in the background. It may take a few minutes to complete."})
+    return JSONResponse(content=refresh_job.status())
+
+
+@app.get("/metrics", tags=["Health Check"])
+def get_metrics():
+    """
+    Metrics in the Prometheus text format: request latency per route, the loaded dataset's
+    size and age, full-dataset ETag hits, time since the last successful refresh, and per
+    collector and API host the task durations, records, requests, retries, cache hits,
+    bytes and rate-limit waits reported by the pipeline.
+    """
+    try:
+        dataset = dataset_cache.get()
+        dataset_records.set(dataset.count)
+        for encoding, body in dataset.bodies.items():
+            dataset_body_bytes.set(len(body), encoding=encoding)
+        dataset_age.set(round(time.time() - dataset.stamp[1] / 1e9, 3))
+    except FileNotFoundError:
+        pass
+    job = refresh_job.status()
+    refresh_running.set(1 if job['state'] == 'running' else 0)
+    if refresh_job.last_success_at is not None:
+        refresh_last_success_age.set(round(time.time() - refresh_job.last_success_at, 3))
+    return Response(content=metrics.render(), media_type=CONTENT_TYPE)
 
 
 @app.get("/", tags=["Health Check"])
@@ -0,0 +1,213 @@
+"""
+Benchmarks for the workflow popularity pipeline that run without API keys or network.
+
+Run with: python benchmarks.py
+"""
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import dataset_files
+from dedup import deduplicate
+from scoring import load_weights, pack_log_values, platform_scores, unpack_log_values
+from store import RecordStore
+
+PLATFORM_METRICS = {
+    'Forum': ['views', 'replies', 'likes'],
+    'YouTube': ['views', 'likes', 'comments', 'like_to_view_ratio', 'comment_to_view_ratio'],
+    'GitHub': ['stars', 'forks', 'watchers'],
+    'Twitter': ['retweets', 'likes', 'replies'],
+    'Google Trends': ['average_search_interest'],
+}
+
+
+def synthetic_dataset(rows, seed=0):
+    """A frame shaped like combine_and_clean_data's, with heavy-tailed random metrics."""
+    rng = np.random.default_rng(seed)
+    platforms = rng.choice(list(PLATFORM_METRICS), size=rows, p=[0.3, 0.3, 0.3, 0.05, 0.05])
+    values = rng.lognormal(mean=5, sigma=2.5, size=(rows, 5)).astype(int)
+    metrics = []
+    for platform, row in zip(platforms, values.tolist()):
+        names = PLATFORM_METRICS[platform]
+        record = dict(zip(names, row))
+        if platform == 'YouTube':
+            record['like_to_view_ratio'] = round(record['likes'] / (record['views'] or 1), 5)
+            record['comment_to_view_ratio'] = round(record['comments'] / (record['views'] or 1), 5)
+        metrics.append(record)
+    return pd.DataFrame({
+        'workflow': [f"workflow {i}" for i in range(rows)],
+        'platform': platforms,
+        'link': [f"https://example.com/{i}" for i in range(rows)],
+        'popularity_metrics': metrics,
+        'country': 'N/A',
+    })
+
+
+def legacy_calculate_popularity_score(df):
+    """calculate_popularity_score before scoring.py: a row-wise apply per hard-coded platform."""
+    df['score'] = 0.0
+
+    def normalize_log_scale(series):
+        series = pd.to_numeric(series, errors='coerce').fillna(0)
+        log_scaled = np.log1p(series)
+        min_val, max_val = log_scaled.min(), log_scaled.max()
+        if max_val > min_val:
+            return ((log_scaled - min_val) / (max_val - min_val)) * 100
+        return pd.Series(0, index=series.index)
+
+    for platform, metric in [('Forum', 'views'), ('YouTube', 'views'), ('GitHub', 'stars')]:
+        mask = df['platform'] == platform
+        if not df.loc[mask].empty:
+            values = df.loc[mask, 'popularity_metrics'].apply(lambda x: x.get(metric, 0))
+            df.loc[mask, 'score'] = normalize_log_scale(values)
+    return df
+
+
+def packed_scores(df, weights):
+    """
+    Scores rows the way RecordStore.rescore does, from metrics packed once per row (as
+    upsert does) and the platform's min and max of each log-scaled metric.
+    """
+    scores = np.zeros(len(df))
+    platforms = df['platform'].to_numpy()
+    for platform, platform_weights in weights.items():
+        rows = np.flatnonzero(platforms == platform)
+        if not len(rows):
+            continue
+        names = sorted(platform_weights)
+        packed = [pack_log_values(metrics, names) for metrics in df['popularity_metrics'].to_numpy()[rows]]
+        start = time.perf_counter()
+        logged = unpack_log_values(packed, len(names))
+        scores[rows] = platform_scores(logged, logged.min(axis=0), logged.max(axis=0),
+                                       [platform_weights[name] for name in names])
+        packed_scores.scoring_s += time.perf_counter() - start
+    return scores
+
+
+def benchmark_scoring(rows=1_000_000, store_rows=200_000):
+    """
+    Scores a synthetic dataset with the old apply-based code, which read every row's
+    metrics dict on every run, and with scoring.py from metrics packed once per row, as
+    RecordStore keeps them. Packing happens when a record's metrics change, not on every
+    rescore, so it is timed separately. With the old single-metric weights the scores are
+    checked against the old ones.
+
+    A full RecordStore.rescore() of `store_rows` rows is timed too; most of it is SQLite
+    reading the rows and writing the new scores.
+    """
+    print(f"\n--- Popularity scoring, {rows:,} rows ---")
+    df = synthetic_dataset(rows)
+
+    start = time.perf_counter()
+    legacy = legacy_calculate_popularity_score(df.copy())
+    legacy_s = time.perf_counter() - start
+    print(f"  legacy apply, 3 platforms x 1 metric:        {legacy_s:6.2f}s")
+
+    single_metric = {'Forum': {'views': 1}, 'YouTube': {'views': 1}, 'GitHub': {'stars': 1}}
+    for label, weights in [('3 platforms x 1 metric', single_metric),
+                           ('5 platforms x weighted metrics', load_weights())]:
+        packed_scores.scoring_s = 0.0
+        start = time.perf_counter()
+        scores = packed_scores(df, weights)
+        total_s = time.perf_counter() - start
+        scoring_s = packed_scores.scoring_s
+        print(f"  scoring.py, {label + ':':31s} {scoring_s:6.2f}s ({legacy_s / scoring_s:.1f}x legacy speed),"
+              f" packing once {total_s - scoring_s:.2f}s")
+        if weights is single_metric:
+            difference = np.abs(scores - legacy['score'].to_numpy()).max()
+            print(f"  max score difference from legacy:            {difference:.2e}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = RecordStore(os.path.join(directory, 'store.sqlite'))
+        records = df.head(store_rows).to_dict('records')
+        start = time.perf_counter()
+        store.upsert(records)
+        upsert_s = time.perf_counter() - start
+        start = time.perf_counter()
+        store.rescore()
+        print(f"  RecordStore, {store_rows:,} rows: upsert {upsert_s:.2f}s,"
+              f" full rescore {time.perf_counter() - start:.2f}s")
+        store.close()
+
+
+def benchmark_dedup(rows=100_000, duplicate_every=50, seed=0):
+    """
+    Deduplicates synthetic records where every `duplicate_every`-th workflow is posted
+    again on another platform with a slightly edited title and a different link form.
+    """
+    print(f"\n--- Deduplication, {rows:,} rows ---")
+    rng = np.random.default_rng(seed)
+    vocabulary = np.array([f"word{i}" for i in range(5000)])
+    titles = [' '.join(words) for words in rng.choice(vocabulary, size=(rows, 7)).tolist()]
+    platforms = rng.choice(['Forum', 'YouTube', 'GitHub'], size=rows).tolist()
+    records = [
+        {'workflow': title, 'platform': platform, 'link': f"https://www.youtube.com/watch?v=v{i}",
+         'popularity_metrics': {'views': i}, 'country': 'N/A', 'score': 0.0}
+        for i, (title, platform) in enumerate(zip(titles, platforms))
+    ]
+    expected = 0
+    for i in range(0, rows, duplicate_every):
+        other = 'GitHub' if platforms[i] != 'GitHub' else 'Forum'
+        records.append(dict(records[i], workflow=titles[i] + ' n8n', platform=other, link=f"https://example.com/{i}"))
+        records.append(dict(records[i], link=f"https://youtu.be/v{i}?si=share"))
+        expected += 2
+
+    start = time.perf_counter()
+    merged = deduplicate(records)
+    elapsed = time.perf_counter() - start
+    print(f"  {len(records):,} records -> {len(merged):,} in {elapsed:.2f}s"
+          f" ({len(records) / elapsed / 1e3:.0f}k records/s)")
+    print(f"  duplicates merged: {len(records) - len(merged):,} of {expected:,} planted")
+
+
+def benchmark_dataset_files(rows=200_000):
+    """
+    Writes a synthetic ranked dataset the way main.py does and compares loading it from
+    the Arrow file, the NDJSON export and the indented JSON file they replace. The API
+    reads columns rather than records (dataset_files.read_columns), which for the Arrow
+    file means nothing is parsed.
+    """
+    print(f"\n--- Dataset files, {rows:,} rows ---")
+    df = synthetic_dataset(rows)
+    df['score'] = np.linspace(100, 0, rows)
+    df['metadata'] = [{} for _ in range(rows)]
+    records = df.to_dict('records')
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        with dataset_files.DatasetWriter(directory) as writer:
+            for offset in range(0, rows, dataset_files.CHUNK_SIZE):
+                writer.write(records[offset:offset + dataset_files.CHUNK_SIZE])
+        print(f"  write arrow + ndjson in chunks: {time.perf_counter() - start:6.2f}s")
+        legacy_path = os.path.join(directory, 'final_dataset.json')
+        with open(legacy_path, 'w', encoding='utf-8') as f:
+            json.dump(records, f, indent=4, ensure_ascii=False, default=int)
+
+        def load_json(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+
+        for name, load, path in [
+            ('json.load, indented JSON', load_json, legacy_path),
+            ('NDJSON export', dataset_files.read_ndjson, os.path.join(directory, dataset_files.NDJSON_FILE)),
+            ('memory-mapped Arrow', dataset_files.read_records, os.path.join(directory, dataset_files.ARROW_FILE)),
+            ('Arrow, API columns', lambda path: dataset_files.read_columns(path).records,
+             os.path.join(directory, dataset_files.ARROW_FILE)),
+        ]:
+            if not os.path.exists(path):
+                print(f"  {name:26s} skipped (pip install pyarrow)")
+                continue
+            start = time.perf_counter()
+            loaded = load(path)
+            elapsed = time.perf_counter() - start
+            print(f"  {name:26s} {os.path.getsize(path) / 1e6:6.1f} MB on disk, loaded in {elapsed:5.2f}s"
+                  f" ({len(loaded):,} records)")
+
+
+if __name__ == "__main__":
+    benchmark_scoring()
+    benchmark_dedup()
+    benchmark_dataset_files()
@@ -0,0 +1,185 @@
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+# Politeness limits per API host (host:port when not the default port): how many requests
+# may be in flight at once, and a token bucket of `rate` requests per second with bursts of up to `burst`.
+# A "host/segment" key limits the paths under that first segment separately from the rest
+# of the host (see HostLimiters.for_url).
+HOST_LIMITS = {
+    'community.n8n.io': {'concurrency': 4, 'rate': 4.0, 'burst': 4},
+    'www.googleapis.com': {'concurrency': 6, 'rate': 10.0, 'burst': 10},
+    # The search API allows 30 requests/minute with a token (10 without one)...
+    'api.github.com/search': {'concurrency': 2, 'rate': 0.5, 'burst': 4},
+    # ...while the core API (/repos/...) allows 5000/hour, about 1.4/s.
+    'api.github.com': {'concurrency': 4, 'rate': 1.3, 'burst': 50},
+    'api.twitter.com': {'concurrency': 2, 'rate': 1.0, 'burst': 2},
+}
+DEFAULT_HOST_LIMIT = {'concurrency': 2, 'rate': 1.0, 'burst': 2}
+
+# One unit of collection work: `fn(*args, **kwargs)` returns a list of records for `source`.
+# With a `host`, the whole task runs under that host's limiter. Use None when the collector's
+# requests go through the shared HTTP client, which already limits every request.
+CollectorTask = namedtuple('CollectorTask', ['source', 'host', 'fn', 'args', 'kwargs'])
+
+
+class PartialResults(Exception):
+    """
+    Raised by a collector that found some records but could not finish, e.g. one of
+    several searches failed. The records are kept, but the task still counts as failed.
+    """
+
+    def __init__(self, message, records):
+        super().__init__(message)
+        self.records = records
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. `acquire()` blocks until a token is available and
+    returns how long it had to wait.
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+# Counters kept per host: requests sent, retries, responses revalidated from the HTTP cache,
+# response bytes and seconds spent waiting for the rate limit: the token bucket, backoff and
+# Retry-After sleeps before a retry, and GitHub's search budget.
+HOST_STATS = ['requests', 'retries', 'cache_hits', 'bytes', 'rate_limit_wait_s']
+
+
+class HostLimiter:
+    """Caps concurrency and request rate for a single host, and counts what went through it."""
+
+    def __init__(self, concurrency, rate, burst):
+        self._slots = threading.BoundedSemaphore(concurrency)
+        self.bucket = TokenBucket(rate, burst)
+        self._stats = dict.fromkeys(HOST_STATS, 0)
+        self._stats_lock = threading.Lock()
+
+    @contextmanager
+    def slot(self):
+        with self._slots:
+            waited = self.bucket.acquire()
+            self.record(requests=1, rate_limit_wait_s=waited)
+            yield
+
+    def record(self, **amounts):
+        """Adds to this host's counters, e.g. `record(retries=1)`."""
+        with self._stats_lock:
+            for name, amount in amounts.items():
+                self._stats[name] += amount
+
+    def stats(self):
+        with self._stats_lock:
+            return dict(self._stats, rate_limit_wait_s=round(self._stats['rate_limit_wait_s'], 3))
+
+
+class HostLimiters:
+    """Hands out one shared HostLimiter per host, created on first use."""
+
+    def __init__(self, limits=None, default=None):
+        self.limits = HOST_LIMITS if limits is None else limits
+        self.default = DEFAULT_HOST_LIMIT if default is None else default
+        self._limiters = {}
+        self._lock = threading.Lock()
+
+    def for_host(self, host):
+        with self._lock:
+            if host not in self._limiters:
+                self._limiters[host] = HostLimiter(**self.limits.get(host, self.default))
+            return self._limiters[host]
+
+    def for_url(self, url):
+        """
+        The limiter of a URL: its "host/segment" entry when the host limits the paths under
+        that first path segment separately (e.g. GitHub's search API), else its host's.
+        """
+        parts = urlsplit(url)
+        segment = parts.path.lstrip('/').split('/', 1)[0]
+        key = f"{parts.netloc}/{segment}"
+        return self.for_host(key if segment and key in self.limits else parts.netloc)
+
+    def stats(self):
+        """Counters of every host used so far (see HOST_STATS), by host."""
+        with self._lock:
+            limiters = dict(self._limiters)
+        return {host: limiter.stats() for host, limiter in limiters.items()}
+
+
+def run_collector_tasks(tasks, limiters=None, max_workers=16, on_result=None):
+    """
+    Runs collector tasks concurrently on a thread pool, each under its host's limiter.
+
+    A failing task is logged and skipped; it never takes down the rest of its source
+    or any other source. A task that raises PartialResults keeps the records it found.
+
+    Args:
+        tasks (list): CollectorTask entries.
+        limiters (HostLimiters): Shared per-host limits. A fresh set is used if omitted.
+        max_workers (int): Size of the thread pool.
+        on_result (callable): Optional `on_result(task, records, error, duration_s)`, called as
+            each task finishes.
+
+    Returns:
+        dict: Source name -> records, in the order the tasks were given.
+    """
+    limiters = limiters or HostLimiters()
+
+    durations = [0.0] * len(tasks)
+
+    def run(index, task):
+        start = time.perf_counter()
+        try:
+            if task.host is None:
+                return task.fn(*task.args, **task.kwargs)
+            with limiters.for_host(task.host).slot():
+                return task.fn(*task.args, **task.kwargs)
+        finally:
+            durations[index] = time.perf_counter() - start
+
+    results = [None] * len(tasks)
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="collector") as executor:
+        futures = {executor.submit(run, index, task): index for index, task in enumerate(tasks)}
+        for future in as_completed(futures):
+            index = futures[future]
+            task = tasks[index]
+            error = None
+            try:
+                results[index] = future.result() or []
+            except PartialResults as e:
+                print(f"  -> WARNING: {task.source} task {task.fn.__name__}{task.args} only partly succeeded: {e}")
+                results[index], error = e.records or [], e
+            except Exception as e:
+                print(f"  -> WARNING: {task.source} task {task.fn.__name__}{task.args} failed: {e}")
+                results[index], error = [], e
+            if on_result is not None:
+                on_result(task, results[index], error, durations[index])
+
+    by_source = {}
+    for task, records in zip(tasks, results):
+        by_source.setdefault(task.source, []).extend(records)
+    return by_source
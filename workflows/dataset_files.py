@@ -0,0 +1,219 @@
+import json
+import os
+import tempfile
+from collections import namedtuple
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+    print("Warning: pyarrow is not installed (pip install -r requirements.txt); only the NDJSON"
+          " dataset is written, and the API parses it on every load.")
+
+# The ranked dataset is written as an Arrow IPC file, which the API memory-maps instead of
+# parsing JSON, and as compact NDJSON (one record per line) for anything that wants plain text.
+# Without pyarrow only the NDJSON file is written and read.
+ARROW_FILE = 'final_dataset.arrow'
+NDJSON_FILE = 'final_dataset.ndjson'
+# Records per Arrow record batch, and per chunk read from the store.
+CHUNK_SIZE = 5000
+
+# Flat columns are stored as-is, for tools that query the file. Each record is also stored
+# pre-serialized, exactly as the API sends it, and its numeric metrics as a map column, so
+# the API can serve and index the dataset without building a Python dict per record.
+SCALAR_COLUMNS = ['workflow', 'platform', 'link', 'country', 'score']
+
+# What the API needs of a dataset: each record's compact JSON bytes, the columns it filters
+# and sorts on, and one float64 array per numeric metric (0 where a record lacks it).
+DatasetColumns = namedtuple('DatasetColumns', ['records', 'platforms', 'countries', 'scores', 'metrics'])
+
+
+def record_json(record):
+    """A record's compact JSON, as stored in the Arrow file and sent by the API."""
+    return json.dumps(record, ensure_ascii=False, separators=(',', ':'))
+
+
+def numeric_metrics(record):
+    return {
+        name: float(value) for name, value in (record.get('popularity_metrics') or {}).items()
+        if isinstance(value, (int, float))
+    }
+
+
+def arrow_schema():
+    return pa.schema([
+        ('workflow', pa.string()),
+        ('platform', pa.string()),
+        ('link', pa.string()),
+        ('country', pa.string()),
+        ('score', pa.float64()),
+        ('record', pa.string()),
+        ('metric_values', pa.map_(pa.string(), pa.float64())),
+    ])
+
+
+def dataset_path(directory):
+    """The file the API should load: the Arrow file when pyarrow is installed, else NDJSON."""
+    return os.path.join(directory, ARROW_FILE if pa is not None else NDJSON_FILE)
+
+
+class DatasetWriter:
+    """
+    Writes the ranked dataset chunk by chunk, so only one chunk of records is in memory.
+
+    Both files are written to temporary files next to their final names and renamed into
+    place on a clean exit, so readers (the API) only ever see the old files or the
+    complete new ones. On an exception the temporary files are removed.
+
+    Args:
+        directory (str): Where the dataset files go.
+    """
+
+    def __init__(self, directory='.'):
+        self.directory = os.path.abspath(directory)
+        self.records = 0
+        self._temp_paths = {}
+        self._ndjson = None
+        self._arrow_sink = None
+        self._arrow = None
+
+    def _temp_file(self, name, mode):
+        fd, path = tempfile.mkstemp(prefix='.' + name, suffix='.tmp', dir=self.directory)
+        self._temp_paths[name] = path
+        if mode == 'wb':
+            return os.fdopen(fd, 'wb')
+        return os.fdopen(fd, mode, encoding='utf-8')
+
+    def __enter__(self):
+        self._ndjson = self._temp_file(NDJSON_FILE, 'w')
+        if pa is not None:
+            self._arrow_sink = self._temp_file(ARROW_FILE, 'wb')
+            # Uncompressed, so the API's memory map reads the buffers in place.
+            self._arrow = pa.ipc.new_file(self._arrow_sink, arrow_schema())
+        return self
+
+    def write(self, records):
+        """Appends a chunk of records (in the final dataset's format) to both files."""
+        if not records:
+            return
+        serialized = [record_json(record) for record in records]
+        for line in serialized:
+            self._ndjson.write(line)
+            self._ndjson.write('\n')
+        if self._arrow is not None:
+            columns = {name: [record.get(name) for record in records] for name in SCALAR_COLUMNS}
+            columns['record'] = serialized
+            columns['metric_values'] = [list(numeric_metrics(record).items()) for record in records]
+            self._arrow.write_batch(pa.record_batch(columns, schema=arrow_schema()))
+        self.records += len(records)
+
+    def __exit__(self, exc_type, exc, traceback):
+        try:
+            if self._arrow is not None:
+                self._arrow.close()
+                self._arrow_sink.close()
+            self._ndjson.close()
+            if exc_type is None:
+                # NDJSON first: the API follows the Arrow file when it can read it.
+                for name in (NDJSON_FILE, ARROW_FILE):
+                    if name in self._temp_paths:
+                        os.replace(self._temp_paths.pop(name), os.path.join(self.directory, name))
+        finally:
+            for path in self._temp_paths.values():
+                if os.path.exists(path):
+                    os.remove(path)
+        return False
+
+
+def _string_values(array):
+    """The values of an Arrow string array as bytes, sliced from its data buffer."""
+    offsets = np.frombuffer(array.buffers()[1], dtype=np.int32)[array.offset:array.offset + len(array) + 1].tolist()
+    data = array.buffers()[2].to_pybytes() if len(array) else b''
+    return [data[start:end] for start, end in zip(offsets, offsets[1:])]
+
+
+def _map_columns(chunks, rows):
+    """One float64 array per key of an Arrow map<string, float64> column, 0 where absent."""
+    columns, row_start = {}, 0
+    for chunk in chunks:
+        offsets = chunk.offsets.to_numpy()
+        entry_rows = row_start + np.repeat(np.arange(len(chunk)), np.diff(offsets))
+        keys = chunk.keys.dictionary_encode()
+        codes = keys.indices.to_numpy()
+        values = chunk.items.to_numpy(zero_copy_only=False)
+        for code, name in enumerate(keys.dictionary.to_pylist()):
+            selected = codes == code
+            column = columns.setdefault(name, np.zeros(rows))
+            column[entry_rows[selected]] = values[selected]
+        row_start += len(chunk)
+    return columns
+
+
+def read_arrow_columns(path):
+    """
+    DatasetColumns of an Arrow dataset file. The file is memory-mapped; the records are
+    sliced from the pre-serialized column and the metrics come from the map column, so
+    nothing is parsed.
+    """
+    with pa.memory_map(path, 'r') as source:
+        table = pa.ipc.open_file(source).read_all()
+        records = [value for chunk in table.column('record').chunks for value in _string_values(chunk)]
+        return DatasetColumns(
+            records,
+            table.column('platform').to_pylist(),
+            table.column('country').to_pylist(),
+            table.column('score').fill_null(0).to_numpy().tolist(),
+            _map_columns(table.column('metric_values').chunks, table.num_rows),
+        )
+
+
+def columns_from_records(records):
+    """DatasetColumns of records that were already parsed, e.g. from the NDJSON file."""
+    metrics = {}
+    for position, record in enumerate(records):
+        for name, value in numeric_metrics(record).items():
+            if name not in metrics:
+                metrics[name] = np.zeros(len(records))
+            metrics[name][position] = value
+    return DatasetColumns(
+        [record_json(record).encode('utf-8') for record in records],
+        [record.get('platform') for record in records],
+        [record.get('country') for record in records],
+        [float(record.get('score') or 0) for record in records],
+        metrics,
+    )
+
+
+def read_arrow(path):
+    """
+    Records of an Arrow dataset file, parsed from its pre-serialized column in one go.
+    The API doesn't need them; see read_arrow_columns.
+    """
+    with pa.memory_map(path, 'r') as source:
+        table = pa.ipc.open_file(source).read_all()
+        return json.loads('[' + ','.join(table.column('record').to_pylist()) + ']')
+
+
+def read_ndjson(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def read_records(path):
+    """Records of a dataset file, Arrow or NDJSON depending on its extension."""
+    if path.endswith('.arrow'):
+        if pa is None:
+            raise ValueError(f"pyarrow is required to read {path}")
+        return read_arrow(path)
+    return read_ndjson(path)
+
+
+def read_columns(path):
+    """DatasetColumns of a dataset file, Arrow or NDJSON depending on its extension."""
+    if path.endswith('.arrow'):
+        if pa is None:
+            raise ValueError(f"pyarrow is required to read {path}")
+        return read_arrow_columns(path)
+    return columns_from_records(read_ndjson(path))
@@ -0,0 +1,321 @@
+import re
+from functools import lru_cache
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import numpy as np
+
+# Query parameters that never change what a link points to, on any site (plus utm_*).
+TRACKING_PARAMS = {'fbclid', 'gclid'}
+# Share and player parameters that carry no meaning on these sites only; elsewhere `s`, `t`
+# or `list` may well be part of the address. `list` still names a YouTube /playlist.
+YOUTUBE_TRACKING_PARAMS = {'si', 'feature', 'pp', 'list', 'index', 't'}
+TWITTER_TRACKING_PARAMS = {'s', 't', 'ref', 'ref_src', 'ref_url'}
+YOUTUBE_HOSTS = {'youtube.com', 'www.youtube.com', 'm.youtube.com', 'music.youtube.com', 'youtu.be'}
+TWITTER_HOSTS = {'twitter.com', 'www.twitter.com', 'mobile.twitter.com', 'x.com', 'www.x.com'}
+GITHUB_HOSTS = {'github.com', 'www.github.com'}
+FORUM_HOST = 'community.n8n.io'
+
+# Near-duplicate titles: MinHash signatures of character shingles, bucketed with LSH.
+# 8 bands of 8 rows only make titles that are roughly 80%+ similar likely to share a
+# bucket; candidates are then confirmed against NEAR_DUPLICATE_THRESHOLD.
+NUM_PERM = 64
+LSH_BANDS = 8
+LSH_ROWS = NUM_PERM // LSH_BANDS
+SHINGLE_SIZE = 5
+NEAR_DUPLICATE_THRESHOLD = 0.85
+# Short, generic titles ("n8n tutorial") match too many unrelated items to merge on.
+MIN_TITLE_CHARS = 24
+# Comparisons per new member of an LSH bucket, so a crowded bucket stays linear.
+MAX_BUCKET_COMPARISONS = 8
+
+# Multiply-shift hash parameters, one (odd multiplier, offset) pair per permutation.
+_rng = np.random.default_rng(20240601)
+_PERM_A = _rng.integers(0, 2 ** 63, NUM_PERM, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+_PERM_B = _rng.integers(0, 2 ** 63, NUM_PERM, dtype=np.uint64)
+
+
+@lru_cache(maxsize=65536)
+def canonical_link(url):
+    """
+    A stable form of a link, so the same item found twice maps to one key:
+
+    - YouTube: youtu.be/ID, /shorts/ID, /embed/ID and watch?v=ID all become
+      https://www.youtube.com/watch?v=ID.
+    - Forum: /t/some-slug/123 and /t/some-slug/123/4 (a post in the topic) become /t/123,
+      as does /t/123. As in Discourse's own routes, the id is the segment after the slug,
+      even when the slug is a number (/t/2024/1234 is topic 1234).
+    - GitHub: any page of a repository becomes https://github.com/owner/repo, lower-cased.
+    - Twitter/X: /user/status/ID becomes https://twitter.com/i/web/status/ID.
+    - Anything else: lower-case scheme and host, no fragment, no trailing slash, no
+      utm_*, fbclid or gclid parameters (nor YouTube's and Twitter's share parameters on
+      their other pages) and the remaining query parameters in sorted order.
+    """
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.endswith(':443') or host.endswith(':80'):
+        host = host.rsplit(':', 1)[0]
+    path = re.sub(r'/{2,}', '/', parts.path).rstrip('/')
+    segments = [segment for segment in path.split('/') if segment]
+
+    if host in YOUTUBE_HOSTS:
+        video_id = None
+        if host == 'youtu.be' and segments:
+            video_id = segments[0]
+        elif segments[:1] in (['shorts'], ['embed'], ['live'], ['v']) and len(segments) > 1:
+            video_id = segments[1]
+        else:
+            video_id = dict(parse_qsl(parts.query)).get('v')
+        if video_id:
+            return f"https://www.youtube.com/watch?v={video_id}"
+
+    if host == FORUM_HOST and segments[:1] == ['t']:
+        topic_id = None
+        if len(segments) >= 3 and segments[2].isdigit():
+            topic_id = segments[2]
+        elif len(segments) == 2 and segments[1].isdigit():
+            topic_id = segments[1]
+        if topic_id:
+            return f"https://{FORUM_HOST}/t/{topic_id}"
+
+    if host in GITHUB_HOSTS and len(segments) >= 2:
+        owner, repo = segments[0].lower(), segments[1].lower()
+        if repo.endswith('.git'):
+            repo = repo[:-4]
+        return f"https://github.com/{owner}/{repo}"
+
+    if host in TWITTER_HOSTS and 'status' in segments:
+        index = segments.index('status')
+        if index + 1 < len(segments):
+            return f"https://twitter.com/i/web/status/{segments[index + 1]}"
+
+    tracking = TRACKING_PARAMS
+    if host in YOUTUBE_HOSTS:
+        tracking = tracking | (YOUTUBE_TRACKING_PARAMS - ({'list'} if segments == ['playlist'] else set()))
+    elif host in TWITTER_HOSTS:
+        tracking = tracking | TWITTER_TRACKING_PARAMS
+    query = [
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key not in tracking and not key.startswith('utm_')
+    ]
+    return urlunsplit((parts.scheme.lower() or 'https', host, path, urlencode(sorted(query)), ''))
+
+
+def normalize_title(title):
+    return re.sub(r'[\W_]+', ' ', str(title or '').lower()).strip()
+
+
+def minhash_signatures(titles):
+    """
+    MinHash signatures of normalized titles, one row of NUM_PERM values per title.
+
+    A title's shingles are its SHINGLE_SIZE-byte windows, read as integers straight from
+    one buffer holding every title, and each permutation is a multiply-shift hash over
+    all windows at once, reduced to its minimum per title.
+    """
+    encoded = [title.encode('utf-8').ljust(SHINGLE_SIZE) for title in titles]
+    if not encoded:
+        return np.empty((0, NUM_PERM), dtype=np.uint64)
+    lengths = np.fromiter((len(title) for title in encoded), np.int64, len(encoded))
+    buffer = np.frombuffer(b''.join(encoded), dtype=np.uint8).astype(np.uint64)
+    windows = np.zeros(len(buffer) - SHINGLE_SIZE + 1, dtype=np.uint64)
+    for offset in range(SHINGLE_SIZE):
+        windows |= buffer[offset:len(buffer) - SHINGLE_SIZE + 1 + offset] << np.uint64(8 * offset)
+
+    # Keep only the windows that lie inside one title.
+    counts = lengths - SHINGLE_SIZE + 1
+    title_starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    shingles = windows[np.arange(counts.sum()) + np.repeat(title_starts - offsets, counts)]
+
+    signatures = np.empty((len(encoded), NUM_PERM), dtype=np.uint64)
+    shift = np.uint64(32)
+    for perm in range(NUM_PERM):
+        hashed = (shingles * _PERM_A[perm] + _PERM_B[perm]) >> shift
+        signatures[:, perm] = np.minimum.reduceat(hashed, offsets)
+    return signatures
+
+
+def similarity(signature_a, signature_b):
+    """Estimated Jaccard similarity of two MinHash signatures."""
+    return float(np.count_nonzero(signature_a == signature_b)) / NUM_PERM
+
+
+def _merge_metrics(target, source):
+    for name, value in (source or {}).items():
+        if isinstance(value, (int, float)) and value > target.get(name, 0):
+            target[name] = value
+        elif name not in target:
+            target[name] = value
+
+
+def _find(parents, item):
+    while parents[item] != item:
+        parents[item] = parents[parents[item]]
+        item = parents[item]
+    return item
+
+
+def near_duplicate_groups(titles, platforms, threshold=NEAR_DUPLICATE_THRESHOLD):
+    """
+    Groups items whose titles are near-duplicates, without comparing every pair.
+
+    Only items from different platforms are joined (two forum topics with the same title
+    are usually two different questions), and a group never holds two items of the same
+    platform. Titles must also contain the same standalone numbers, so "Part 11" and "Part 12" of a
+    series stay apart.
+
+    Args:
+        titles (list): One title per item.
+        platforms (list): One platform per item.
+        threshold (float): Minimum estimated Jaccard similarity of the titles' shingles.
+
+    Returns:
+        list: Root item index for every item; items with the same root are duplicates.
+    """
+    parents = list(range(len(titles)))
+    group_platforms = [{platform} for platform in platforms]
+    normalized = [normalize_title(title) for title in titles]
+    eligible = np.array([item for item, title in enumerate(normalized) if len(title) >= MIN_TITLE_CHARS], dtype=np.int64)
+    signatures = minhash_signatures([normalized[item] for item in eligible])
+    numbers = {int(item): frozenset(re.findall(r'\b\d+\b', normalized[item])) for item in eligible}
+    # One 64-bit key per band: the band's rows mixed with the first row's multipliers.
+    band_keys = (signatures.reshape(len(eligible), LSH_BANDS, LSH_ROWS) * _PERM_A[:LSH_ROWS]).sum(axis=2)
+
+    for band in range(LSH_BANDS):
+        # Sort by key so each bucket is a run; only runs of 2+ items hold candidates.
+        order = np.argsort(band_keys[:, band], kind='stable')
+        run_starts = np.flatnonzero(np.diff(band_keys[order, band])) + 1
+        starts = np.concatenate(([0], run_starts))
+        ends = np.concatenate((run_starts, [len(order)]))
+        for start, end in zip(starts[ends - starts > 1].tolist(), ends[ends - starts > 1].tolist()):
+            bucket = order[start:end].tolist()
+            for position, row in enumerate(bucket[1:], 1):
+                item = int(eligible[row])
+                for other_row in bucket[max(0, position - MAX_BUCKET_COMPARISONS):position]:
+                    other = int(eligible[other_row])
+                    root, other_root = _find(parents, item), _find(parents, other)
+                    if root == other_root or group_platforms[root] & group_platforms[other_root]:
+                        continue
+                    if numbers[item] != numbers[other]:
+                        continue
+                    if similarity(signatures[row], signatures[other_row]) >= threshold:
+                        parents[other_root] = root
+                        group_platforms[root] |= group_platforms[other_root]
+
+    return [_find(parents, item) for item in range(len(titles))]
+
+
+def duplicate_links(items, threshold=NEAR_DUPLICATE_THRESHOLD):
+    """
+    Plans the near-duplicate merges of a ranked list of links.
+
+    Args:
+        items (list): (canonical link, platform, title) per distinct link, best first.
+        threshold (float): See near_duplicate_groups().
+
+    Returns:
+        dict: Kept link -> the links to fold into it. The best-ranked link of each group is
+            kept; links without duplicates are left out.
+    """
+    links = [item[0] for item in items]
+    roots = near_duplicate_groups([item[2] for item in items], [item[1] for item in items], threshold)
+    keep = {}
+    others = {}
+    for link, root in zip(links, roots):
+        keep.setdefault(root, link)
+        if keep[root] != link:
+            others.setdefault(keep[root], []).append(link)
+    return others
+
+
+def merge_duplicates(record, duplicates, score=None):
+    """
+    Folds duplicate records into `record` and lists them under `metadata["duplicates"]`.
+
+    Only duplicates from the record's own platform share its metrics (stars and views are
+    not the same thing), so `record` takes the highest value of every metric among those.
+
+    Args:
+        record (dict): The record that is kept.
+        duplicates (list): The records folded into it.
+        score (callable): Scores a record from its metrics, e.g. RecordStore.score_record.
+            When given, `record` is rescored if its metrics changed.
+
+    Returns:
+        dict: `record`.
+    """
+    metrics = record['popularity_metrics'] = dict(record.get('popularity_metrics') or {})
+    record['metadata'] = dict(record.get('metadata') or {})
+    record['metadata']['duplicates'] = [
+        {'platform': other.get('platform'), 'link': other['link'], 'country': other.get('country'),
+         'score': other.get('score')}
+        for other in duplicates
+    ]
+    before = dict(metrics)
+    for other in duplicates:
+        if other.get('platform') == record.get('platform'):
+            _merge_metrics(metrics, other.get('popularity_metrics'))
+    if score is not None and metrics != before:
+        record['score'] = score(record)
+    return record
+
+
+def deduplicate(records, threshold=NEAR_DUPLICATE_THRESHOLD, score=None):
+    """
+    Collapses duplicate records, keeping the ranking order of `records` (best first).
+
+    Exact duplicates share a canonical link (and country; a video found in two regions
+    stays one record per region). Near-duplicates are the same workflow on different
+    platforms, found by title similarity. The first record of each group is kept, with the
+    highest value of every metric found among its platform's records, and the others are
+    listed under `metadata["duplicates"]`.
+
+    Args:
+        records (list): Records ranked best first.
+        threshold (float): See near_duplicate_groups().
+        score (callable): Scores a record from its metrics. When given, records whose
+            metrics changed are rescored and the result ranked again.
+
+    Returns:
+        list: The merged records, best first.
+    """
+    exact = {}
+    changed = set()
+    for record in records:
+        link = canonical_link(record['link'])
+        key = (link, record.get('country'))
+        if key in exact:
+            if record.get('platform') == exact[key].get('platform'):
+                before = dict(exact[key]['popularity_metrics'])
+                _merge_metrics(exact[key]['popularity_metrics'], record.get('popularity_metrics'))
+                if exact[key]['popularity_metrics'] != before:
+                    changed.add(key)
+        else:
+            exact[key] = dict(record, link=link, popularity_metrics=dict(record.get('popularity_metrics') or {}))
+    if score is not None:
+        for key in changed:
+            exact[key]['score'] = score(exact[key])
+
+    # Near-duplicates are found per link, so the regional copies of a video move together.
+    first = {}
+    by_link = {}
+    for record in exact.values():
+        first.setdefault(record['link'], record)
+        by_link.setdefault(record['link'], []).append(record)
+    others = duplicate_links(
+        [(link, record.get('platform'), record.get('workflow')) for link, record in first.items()], threshold
+    )
+    folded = {link for links in others.values() for link in links}
+
+    merged = []
+    for record in exact.values():
+        if record['link'] in folded:
+            continue
+        if record['link'] in others:
+            record = merge_duplicates(
+                record, [other for link in others[record['link']] for other in by_link[link]], score
+            )
+        merged.append(record)
+    if score is not None:
+        merged.sort(key=lambda record: record.get('score') or 0, reverse=True)
+    return merged
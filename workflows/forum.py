@@ -1,69 +1,228 @@
+import math
+import os
 import requests
 import json
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 import pandas as pd
+from http_client import get_client
 
-def fetch_forum_data(search_term, limit=50):
+FORUM_URL = "https://community.n8n.io"
+# Where API requests go; links in records always point at FORUM_URL. Override to replay locally.
+FORUM_API_URL = os.getenv('FORUM_API_URL', FORUM_URL).rstrip('/')
+PAGE_CONCURRENCY = 4     # pages requested at once per search; the host limiter caps the total
+MAX_PAGES = 50
+FALLBACK_LISTINGS = [("/latest.json", {}), ("/top.json", {'period': 'all'})]
+FALLBACK_PAGES = 10
+ENRICH_BATCH_SIZE = 20
+
+
+def _get_json(path, params=None):
+    response = get_client().get(f"{FORUM_API_URL}{path}", params=params)
+    response.raise_for_status()
+    return response.json()
+
+
+def _search_page(search_term, page):
+    """One page of search results. Returns (topics, whether more pages follow)."""
+    # Sorting by views is a great way to find popular/high-quality topics.
+    data = _get_json("/search.json", {'q': search_term, 'order': 'views', 'page': page})
+    more = data.get('grouped_search_result', {}).get('more_full_page_results')
+    return data.get('topics', []), bool(more)
+
+
+@lru_cache(maxsize=None)
+def _listing_page(path, page):
+    """
+    One page of a topic listing such as /latest.json. Cached, since every search term
+    that falls back crawls the same pages.
+    """
+    params = dict(dict(FALLBACK_LISTINGS).get(path, {}), page=page)
+    topic_list = _get_json(path, params).get('topic_list', {})
+    return topic_list.get('topics', []), bool(topic_list.get('more_topics_url'))
+
+
+def _fetch_pages(fetch_page, limit, first_page=1, max_pages=MAX_PAGES):
+    """
+    Fetches pages until `limit` topics are collected or a page says it is the last one.
+    The first page is fetched alone to learn the page size; after that, as many pages
+    as are still needed (up to PAGE_CONCURRENCY) are requested at once.
+
+    Args:
+        fetch_page (callable): page number -> (topics, more pages follow).
+        limit (int): Topics wanted.
+
+    Returns:
+        list: Topics in page order.
+    """
+    topics, more = fetch_page(first_page)
+    page_size = max(1, len(topics))
+    next_page, last_page = first_page + 1, first_page + max_pages - 1
+    with ThreadPoolExecutor(max_workers=PAGE_CONCURRENCY, thread_name_prefix="forum-page") as executor:
+        while more and topics and len(topics) < limit and next_page <= last_page:
+            wanted = PAGE_CONCURRENCY if limit == math.inf else math.ceil((limit - len(topics)) / page_size)
+            wave = range(next_page, min(next_page + min(wanted, PAGE_CONCURRENCY), last_page + 1))
+            for page_topics, more in executor.map(fetch_page, wave):
+                topics.extend(page_topics)
+                if not page_topics or not more:
+                    more = False
+                    break
+            next_page = wave.stop
+    return topics
+
+
+def _crawl_listings(search_term, limit):
+    """Fallback when search is unavailable: crawls /latest and /top for topics mentioning the term."""
+    term = search_term.lower()
+    matches = {}
+    for path, _ in FALLBACK_LISTINGS:
+        try:
+            topics = _fetch_pages(lambda page: _listing_page(path, page), math.inf,
+                                  first_page=0, max_pages=FALLBACK_PAGES)
+        except requests.exceptions.RequestException as e:
+            print(f"  -> Could not crawl {path}: {e}")
+            continue
+        for topic in topics:
+            text = " ".join([topic.get('title') or ''] + [str(tag) for tag in topic.get('tags') or []])
+            if term in text.lower():
+                matches.setdefault(topic.get('id'), topic)
+    return sorted(matches.values(), key=lambda topic: topic.get('views', 0), reverse=True)[:limit]
+
+
+def _to_record(topic):
+    slug = topic.get('slug')
+    topic_id = topic.get('id')
+    return {
+        "workflow": topic.get('title'),
+        "platform": "Forum",
+        "link": f"{FORUM_URL}/t/{slug}/{topic_id}",
+        "popularity_metrics": {
+            "views": topic.get('views', 0),
+            "replies": topic.get('reply_count', 0),
+            "likes": topic.get('like_count', 0)
+        },
+        "country": "N/A" 
+    }
+
+
+def fetch_forum_data(search_term, limit=50, fallback=True, since=None):
     """
     Fetches workflow data from the n8n Discourse forum, sorted by popularity (views).
 
+    Search results are paged until `limit` topics are found or the results run out.
+    If search fails or finds nothing, the /latest and /top listings are crawled instead.
+
     Args:
         search_term (str): The keyword to search for (e.g., "workflow").
         limit (int): The number of workflows to try and fetch.
+        fallback (bool): Whether to crawl the listings when search comes back empty.
+        since (str): Only topics active after this date (YYYY-MM-DD), for incremental runs.
 
     Returns:
         list: A list of dictionaries, where each dictionary is a workflow.
+
+    Raises:
+        requests.exceptions.RequestException, KeyError: When search failed and the
+            fallback found nothing either, after logging it.
     """
     print(f"Searching n8n forum for most popular: '{search_term}'...")
-    
-    search_url = "https://community.n8n.io/search.json"
-    
-    # Sorting by views is a great way to find popular/high-quality topics.
-    params = {'q': search_term, 'order': 'views'}
-    
-    collected_workflows = []
 
+    query = f"{search_term} after:{since}" if since else search_term
+    error = None
     try:
-        response = requests.get(search_url, params=params)
-        response.raise_for_status() 
-        data = response.json()
-
-        topics = data.get('topics', [])
-        
-        if not topics:
-            print("No topics found for the search term.")
-            return []
-
-        print(f"Found {len(topics)} topics. Extracting details...")
-
-        for topic in topics:
-            if len(collected_workflows) >= limit:
-                break
-            
-            slug = topic.get('slug')
-            topic_id = topic.get('id')
-            link = f"https://community.n8n.io/t/{slug}/{topic_id}"
-
-            workflow_details = {
-                "workflow": topic.get('title'),
-                "platform": "Forum",
-                "link": link,
-                "popularity_metrics": {
-                    "views": topic.get('views', 0),
-                    "replies": topic.get('reply_count', 0),
-                    "likes": topic.get('like_count', 0)
-                },
-                "country": "N/A" 
-            }
-            collected_workflows.append(workflow_details)
-
+        topics = _fetch_pages(lambda page: _search_page(query, page), limit)
     except requests.exceptions.RequestException as e:
         print(f"An error occurred while making the request: {e}")
-        return [] 
+        topics, error = [], e
     except KeyError as e:
         print(f"Could not find key {e} in the response JSON. The API structure might have changed.")
+        topics, error = [], e
+
+    if not topics and fallback and not since:
+        print(f"  -> No search results for '{search_term}', crawling the latest and top topics instead...")
+        topics = _crawl_listings(search_term, limit)
+
+    if not topics:
+        if error is not None:
+            # Raised so the pipeline knows this term's window was not searched.
+            raise error
+        print("No topics found for the search term.")
         return []
 
-    return collected_workflows
+    print(f"Found {len(topics)} topics for '{search_term}'. Extracting details...")
+    return [_to_record(topic) for topic in topics[:limit]]
+
+
+def topic_id(record):
+    """The Discourse topic id at the end of a forum record's link."""
+    return int(record['link'].rstrip('/').rsplit('/', 1)[-1])
+
+
+def dedupe_topics(records):
+    """Keeps the first record of every topic found by several search terms."""
+    unique = {}
+    for record in records:
+        unique.setdefault(topic_id(record), record)
+    return list(unique.values())
+
+
+def _fetch_topic(topic_id):
+    try:
+        return _get_json(f"/t/{topic_id}.json")
+    except requests.exceptions.RequestException as e:
+        print(f"  -> Could not enrich forum topic {topic_id}: {e}")
+        return None
+
+
+def enrich_forum_data(records, batch_size=ENRICH_BATCH_SIZE, keep_unfetched=True):
+    """
+    Adds post counts and tags from each topic's own page (/t/{id}.json).
+
+    Records are deduplicated by topic id first, so a topic found by several search terms
+    is only requested once. Discourse has no multi-topic endpoint, so topics are fetched
+    in batches of concurrent requests, paced by the forum's host limiter.
+
+    Args:
+        records (list): Forum records from fetch_forum_data, possibly with duplicates.
+        batch_size (int): Topics requested per batch.
+        keep_unfetched (bool): Whether topics whose page could not be fetched are returned
+            as they were.
+
+    Returns:
+        list: One enriched record per topic.
+    """
+    records = dedupe_topics(records)
+    print(f"  -> Enriching {len(records)} unique forum topics...")
+    enriched = []
+    with ThreadPoolExecutor(max_workers=PAGE_CONCURRENCY, thread_name_prefix="forum-topic") as executor:
+        for start in range(0, len(records), batch_size):
+            batch = records[start:start + batch_size]
+            for record, topic in zip(batch, executor.map(_fetch_topic, [topic_id(r) for r in batch])):
+                if topic:
+                    record['popularity_metrics'].update({
+                        "views": topic.get('views', record['popularity_metrics']['views']),
+                        "replies": topic.get('reply_count', record['popularity_metrics']['replies']),
+                        "likes": topic.get('like_count', record['popularity_metrics']['likes']),
+                        "posts": topic.get('posts_count', 0)
+                    })
+                    record['metadata'] = {"tags": topic.get('tags', []), "created_at": topic.get('created_at')}
+                if topic or keep_unfetched:
+                    enriched.append(record)
+    return enriched
+
+
+def refresh_forum_records(records):
+    """
+    Re-fetches stored topics' metrics from their own pages. Topics that could not be
+    fetched are left out, so the store doesn't mark them fresh and retries them next run.
+
+    Args:
+        records (list): Stored forum records.
+
+    Returns:
+        list: Refreshed records.
+    """
+    return enrich_forum_data(records, keep_unfetched=False)
 
 # if __name__ == "__main__":
 #     search_terms = ["workflow", "automation", "google sheets", "slack integration", "api", "database", "webhook"]
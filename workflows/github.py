@@ -1,65 +1,242 @@
 import json
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, timedelta
 import requests
 import pandas as pd
 import dotenv
 import os
+from http_client import get_client
 
 dotenv.load_dotenv()
 GITHUB_TOKEN = os.getenv('GITHUB_TOKEN')
 
-def fetch_github_data(search_query="n8n workflow", limit=50):
+GITHUB_API_URL = os.getenv('GITHUB_API_URL', 'https://api.github.com').rstrip('/')
+SEARCH_URL = f"{GITHUB_API_URL}/search/repositories"
+PER_PAGE = 100            # the most GitHub returns per page
+SEARCH_RESULT_CAP = 1000  # the search API never returns more than this for one query
+PAGE_WORKERS = 4
+EARLIEST_CREATED = date(2008, 1, 1)
+
+
+class SearchBudget:
+    """
+    Tracks the search API's rate-limit window from `X-RateLimit-Remaining` and
+    `X-RateLimit-Reset`, so pages are only requested while budget is left and the
+    collector sleeps until the window resets instead of collecting 403s.
+
+    The window belongs to the token, not to a query, so one budget is shared by every
+    search running at once (see `search_budget`).
+    """
+
+    def __init__(self):
+        self.remaining = None
+        self.reset_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        # Signalled on every update, so searches waiting for the first response of an
+        # unknown window wake up as soon as it arrives.
+        self._updated = threading.Condition(self._lock)
+
+    def update(self, response):
+        remaining = response.headers.get('X-RateLimit-Remaining')
+        reset_at = response.headers.get('X-RateLimit-Reset')
+        if remaining is None or reset_at is None:
+            return
+        with self._lock:
+            self._probing = False
+            remaining, reset_at = int(remaining), float(reset_at)
+            if reset_at == self.reset_at and self.remaining is not None:
+                # Responses can arrive out of order; the lowest count is the latest one.
+                self.remaining = min(self.remaining, remaining)
+            else:
+                self.remaining, self.reset_at = remaining, reset_at
+            self._updated.notify_all()
+
+    def acquire(self, wanted):
+        """
+        Blocks until requests may be sent and returns how many of `wanted` can go now.
+        Time spent waiting is recorded as the search host's `rate_limit_wait_s`.
+        """
+        announced, waited_since = None, None
+        with self._lock:
+            while True:
+                now = time.time()
+                if self.remaining is None:
+                    # Unknown budget: send one request to find out.
+                    self.remaining = 0
+                    self.reset_at = now + 60
+                    self._probing = True
+                    granted = 1
+                    break
+                if self.remaining > 0:
+                    granted = min(wanted, self.remaining)
+                    self.remaining -= granted
+                    break
+                if now >= self.reset_at:
+                    self.remaining = None
+                    continue
+                delay = self.reset_at - now + 1
+                if not self._probing and announced != self.reset_at:
+                    announced = self.reset_at
+                    print(f"  -> GitHub search budget used up, waiting {delay:.0f}s for the rate limit to reset...")
+                waited_since = waited_since or time.perf_counter()
+                self._updated.wait(delay)
+        if waited_since is not None:
+            get_client().limiters.for_url(SEARCH_URL).record(rate_limit_wait_s=time.perf_counter() - waited_since)
+        return granted
+
+
+# Shared by every search in this process: they all draw on the same rate-limit window.
+search_budget = SearchBudget()
+
+
+def _headers():
+    headers = {'Accept': 'application/vnd.github.v3+json'}
+    if GITHUB_TOKEN and GITHUB_TOKEN != 'YOUR_GITHUB_PERSONAL_ACCESS_TOKEN_HERE':
+        headers['Authorization'] = f'token {GITHUB_TOKEN}'
+    return headers
+
+
+def _search(query, page, per_page, headers, budget):
+    """Fetches one page of search results. Returns (items, total_count)."""
+    params = {'q': query, 'sort': 'stars', 'order': 'desc', 'per_page': per_page, 'page': page}
+    response = get_client().get(SEARCH_URL, headers=headers, params=params)
+    budget.update(response)
+    response.raise_for_status()
+    data = response.json()
+    return data.get('items', []), data.get('total_count', 0)
+
+
+def _split_by_created(query, start, end, headers, budget):
+    """Splits a query on creation date until every part is under the search cap."""
+    sub_query = f"{query} created:{start.isoformat()}..{end.isoformat()}"
+    budget.acquire(1)
+    _, total = _search(sub_query, 1, 1, headers, budget)
+    if total <= SEARCH_RESULT_CAP or start == end:
+        return [(sub_query, total)] if total else []
+    middle = start + (end - start) // 2
+    return (_split_by_created(query, middle + timedelta(days=1), end, headers, budget)
+            + _split_by_created(query, start, middle, headers, budget))
+
+
+def _split_query(query, max_stars, needed, headers, budget):
+    """
+    Splits a query that matches more than 1000 repositories into star ranges (and,
+    for a single star count with too many repos, creation-date ranges) that each stay
+    under the cap. Ranges come back highest stars first, and splitting stops once they
+    cover `needed` repositories, since only the top of the ranking is kept.
+
+    Returns:
+        list: (sub_query, total_count) tuples.
+    """
+    parts, covered = [], 0
+    ranges = [(0, max_stars)]
+    while ranges and covered < needed:
+        low, high = ranges.pop()
+        sub_query = f"{query} stars:{low}..{high}"
+        budget.acquire(1)
+        _, total = _search(sub_query, 1, 1, headers, budget)
+        if total <= SEARCH_RESULT_CAP:
+            if total:
+                parts.append((sub_query, total))
+                covered += total
+        elif low == high:
+            for part in _split_by_created(sub_query, EARLIEST_CREATED, date.today(), headers, budget):
+                parts.append(part)
+                covered += part[1]
+        else:
+            middle = (low + high) // 2
+            # Popped last-in first-out, so the upper half is searched first.
+            ranges.append((low, middle))
+            ranges.append((middle + 1, high))
+    return parts
+
+
+def _iter_pages(query, total, limit, headers, budget, first_page=None):
+    """
+    Yields the items of every page needed for min(total, limit, 1000) results. Pages
+    are fetched concurrently, as many at a time as the rate-limit budget allows.
+    """
+    pages = range(1, math.ceil(min(total, limit, SEARCH_RESULT_CAP) / PER_PAGE) + 1)
+    if first_page is not None:
+        yield first_page
+        pages = pages[1:]
+    pending = list(pages)
+    with ThreadPoolExecutor(max_workers=PAGE_WORKERS, thread_name_prefix="github-page") as executor:
+        while pending:
+            granted = budget.acquire(len(pending))
+            batch, pending = pending[:granted], pending[granted:]
+            futures = [executor.submit(_search, query, page, PER_PAGE, headers, budget) for page in batch]
+            for future in as_completed(futures):
+                yield future.result()[0]
+
+
+def _to_record(repo):
+    return {
+        "workflow": repo['full_name'], 
+        "platform": "GitHub",
+        "link": repo['html_url'],
+        "popularity_metrics": {
+            "stars": repo['stargazers_count'],
+            "forks": repo['forks_count'],
+            "watchers": repo['watchers_count']
+        },
+        "country": "N/A"
+    }
+
+
+def fetch_github_data(search_query="n8n workflow", limit=50, pushed_after=None):
     """
     Searches GitHub for top repositories matching a query, sorted by stars.
 
+    Results are paged 100 at a time. When more than GitHub's 1000-result search cap is
+    asked for and available, the query is split into star (and date) ranges that are
+    each searched separately.
+
     Args:
         search_query (str): The search term.
         limit (int): The max number of repositories to return.
+        pushed_after (str): Only repositories pushed after this date (YYYY-MM-DD), for incremental runs.
 
     Returns:
         list: A list of dictionaries with repository data.
+
+    Raises:
+        requests.exceptions.RequestException: When the search fails, after logging it.
     """
-    print("Searching GitHub for top repositories...")
-    
+    if pushed_after:
+        search_query = f"{search_query} pushed:>{pushed_after}"
+    print(f"Searching GitHub for top repositories: '{search_query}' (up to {limit})...")
 
-    url = f"https://api.github.com/search/repositories"
-    
-    # Parameters for the search
-    params = {
-        'q': search_query,
-        'sort': 'stars',
-        'order': 'desc',
-        'per_page': limit
-    }
-    
-    # Headers for authentication
-    headers = {'Accept': 'application/vnd.github.v3+json'}
-    if GITHUB_TOKEN and GITHUB_TOKEN != 'YOUR_GITHUB_PERSONAL_ACCESS_TOKEN_HERE':
-        headers['Authorization'] = f'token {GITHUB_TOKEN}'
-    else:
+    headers = _headers()
+    if 'Authorization' not in headers:
         print("Warning: No GitHub token provided. Making unauthenticated request (lower rate limit).")
 
+    budget = search_budget
     try:
-        response = requests.get(url, headers=headers, params=params)
-        response.raise_for_status()
-        
-        data = response.json()
-        collected_repos = []
-        
-        for repo in data.get('items', []):
-            repo_details = {
-                "workflow": repo['full_name'], 
-                "platform": "GitHub",
-                "link": repo['html_url'],
-                "popularity_metrics": {
-                    "stars": repo['stargazers_count'],
-                    "forks": repo['forks_count'],
-                    "watchers": repo['watchers_count']
-                },
-                "country": "N/A"
-            }
-            collected_repos.append(repo_details)
-            
-        return collected_repos
+        budget.acquire(1)
+        first_items, total = _search(search_query, 1, PER_PAGE, headers, budget)
+        if total <= SEARCH_RESULT_CAP or limit <= SEARCH_RESULT_CAP or not first_items:
+            parts = [(search_query, total, first_items)]
+        else:
+            max_stars = first_items[0]['stargazers_count']
+            print(f"  -> {total} matches exceed the search cap; splitting '{search_query}' into star ranges...")
+            parts = [(q, t, None) for q, t in _split_query(search_query, max_stars, limit, headers, budget)]
+
+        repos = {}
+        for query, query_total, first_page in parts:
+            for items in _iter_pages(query, query_total, limit, headers, budget, first_page):
+                for repo in items:
+                    repos[repo['html_url']] = repo
+            if len(repos) >= limit:
+                break
+
+        ranked = sorted(repos.values(), key=lambda repo: repo['stargazers_count'], reverse=True)[:limit]
+        print(f"  -> Collected {len(ranked)} repositories for '{search_query}'")
+        return [_to_record(repo) for repo in ranked]
 
     except requests.exceptions.HTTPError as e:
         print(f"An HTTP error occurred: {e}")
@@ -67,10 +244,37 @@ def fetch_github_data(search_query="n8n workflow", limit=50):
             print("  -> This is likely due to an invalid GitHub token.")
         elif e.response.status_code == 403:
             print("  -> This is likely due to hitting the API rate limit.")
-    except Exception as e:
-        print(f"An unexpected error occurred: {e}")
-        
-    return []
+        # Raised so the pipeline knows this query's window was not searched.
+        raise
+
+def _fetch_repo(full_name, headers):
+    try:
+        response = get_client().get(f"{GITHUB_API_URL}/repos/{full_name}", headers=headers)
+        response.raise_for_status()
+        return response.json()
+    except requests.exceptions.RequestException as e:
+        print(f"  -> Could not refresh GitHub repository {full_name}: {e}")
+        return None
+
+
+def refresh_github_records(records):
+    """
+    Re-fetches the stats of already known repositories from the core API, which has a far
+    larger rate limit than search and its own limiter (see concurrency.HOST_LIMITS).
+    Unchanged repositories answer the conditional request with a 304, which GitHub doesn't
+    count against the limit.
+
+    Args:
+        records (list): Stored GitHub records.
+
+    Returns:
+        list: Refreshed records; repositories that could not be fetched are left out.
+    """
+    headers = _headers()
+    names = [record['workflow'] for record in records]
+    with ThreadPoolExecutor(max_workers=PAGE_WORKERS, thread_name_prefix="github-repo") as executor:
+        repos = executor.map(lambda name: _fetch_repo(name, headers), names)
+        return [_to_record(repo) for repo in repos if repo]
 
 # if __name__ == "__main__":
 #     github_data = fetch_github_data()
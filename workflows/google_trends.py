@@ -1,21 +1,34 @@
 import json
+import os
 import time
 import pandas as pd
 import random
 import requests
 import urllib3
+import pytrends.request
 from pytrends.request import TrendReq
 from pytrends.exceptions import ResponseError
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+# Overrides https://trends.google.com/trends, e.g. to replay Trends locally. pytrends has no
+# option for it, so its module and class URLs are pointed there instead.
+TRENDS_URL = os.getenv('GOOGLE_TRENDS_URL')
+# Scales the pauses between requests that keep Trends from blocking us; 0 against a replay.
+TRENDS_DELAY_SCALE = float(os.getenv('TRENDS_DELAY_SCALE', '1'))
+
+if TRENDS_URL:
+    pytrends.request.BASE_TRENDS_URL = TRENDS_URL.rstrip('/')
+    TrendReq.GENERAL_URL = f"{pytrends.request.BASE_TRENDS_URL}/api/explore"
+    TrendReq.INTEREST_OVER_TIME_URL = f"{pytrends.request.BASE_TRENDS_URL}/api/widgetdata/multiline"
+
 def fetch_google_trends_data(keywords, countries=['US', 'IN']):
     """
     Fetches Google Trends data for a list of keywords across specified countries.
     """
     all_trends_data = []
     print("Initializing Google Trends collector...")
-    time.sleep(5)
+    time.sleep(5 * TRENDS_DELAY_SCALE)
     for country in countries:
         print(f"  -> Processing Google Trends for Country: {country}")
         
@@ -41,7 +54,7 @@ def fetch_google_trends_data(keywords, countries=['US', 'IN']):
                             "popularity_metrics": {"average_search_interest": avg_interest},
                             "country": country
                         })
-            time.sleep(random.randint(15, 25))
+            time.sleep(random.randint(15, 25) * TRENDS_DELAY_SCALE)
 
     return all_trends_data
 
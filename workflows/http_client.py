@@ -0,0 +1,184 @@
+import os
+import random
+import sqlite3
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlencode, urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from concurrency import HostLimiters
+
+# Statuses worth retrying: rate limiting and transient server errors.
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Also retried, but only when the response says it is rate limiting (see is_rate_limited).
+RATE_LIMIT_STATUSES = {403, 429}
+CACHE_PATH = os.getenv('HTTP_CACHE_PATH', 'http_cache.sqlite')
+
+
+class ConditionalCache:
+    """
+    Remembers the ETag / Last-Modified validators and body of successful responses in
+    SQLite, so a later run can revalidate them and get a cheap 304 when nothing changed.
+    """
+
+    def __init__(self, path=CACHE_PATH):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS http_cache ("
+            "key TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, body BLOB, stored_at REAL)"
+        )
+        self._db.commit()
+
+    def get(self, key):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT etag, last_modified, body FROM http_cache WHERE key = ?", (key,)
+            ).fetchone()
+        return row
+
+    def put(self, key, etag, last_modified, body):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO http_cache (key, etag, last_modified, body, stored_at) VALUES (?, ?, ?, ?, ?)",
+                (key, etag, last_modified, body, time.time()),
+            )
+            self._db.commit()
+
+
+def retry_after_seconds(response):
+    """
+    Seconds the server asked us to wait, from `Retry-After` (seconds or an HTTP date)
+    or, when the quota is exhausted, GitHub-style `X-RateLimit-Reset`. None if it didn't say.
+    """
+    retry_after = response.headers.get('Retry-After')
+    if retry_after:
+        if retry_after.isdigit():
+            return float(retry_after)
+        try:
+            return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+        except (TypeError, ValueError):
+            pass
+    if response.headers.get('X-RateLimit-Remaining') == '0' and response.headers.get('X-RateLimit-Reset'):
+        return max(0.0, float(response.headers['X-RateLimit-Reset']) - time.time())
+    return None
+
+
+def is_rate_limited(response):
+    """
+    Whether a 403 or 429 is rate limiting rather than a refusal: it carries Retry-After
+    (e.g. GitHub's secondary limits) or reports an exhausted X-RateLimit quota.
+    """
+    return response.status_code in RATE_LIMIT_STATUSES and (
+        'Retry-After' in response.headers or response.headers.get('X-RateLimit-Remaining') == '0'
+    )
+
+
+class HttpClient:
+    """
+    Shared HTTP client for the collectors.
+
+    - One pooled `requests.Session`, so connections (and TLS sessions) are kept alive
+      across calls instead of a new handshake per request.
+    - Connect/read timeouts on every request.
+    - Retries on connection errors, 429, 5xx and rate-limiting 403s (see is_rate_limited)
+      with exponential backoff and jitter, honouring `Retry-After` when the server sends it.
+    - Conditional GETs: the ETag / Last-Modified of each response is stored, sent back
+      as If-None-Match / If-Modified-Since next time, and a 304 is answered from the
+      stored body. Callers always see a normal 200 response; `response.from_cache`
+      tells them it was revalidated.
+    - Every request is paced by its host's limiter (see concurrency.HOST_LIMITS).
+
+    Args:
+        limiters (HostLimiters): Per-host limits shared with the rest of the pipeline.
+        timeout (tuple): (connect, read) timeout in seconds.
+        max_retries (int): Retries after the first attempt.
+        backoff_base (float): First backoff delay in seconds; doubled on every retry.
+        backoff_max (float): Upper bound for a single backoff delay.
+        cache_path (str): SQLite file for conditional-request validators, or None to disable them.
+        pool_size (int): Connections kept alive per host.
+    """
+
+    def __init__(self, limiters=None, timeout=(5, 30), max_retries=4, backoff_base=1.0, backoff_max=60.0,
+                 cache_path=CACHE_PATH, pool_size=16):
+        self.limiters = limiters or HostLimiters()
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.cache = ConditionalCache(cache_path) if cache_path else None
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def _backoff(self, attempt):
+        return random.uniform(0.5, 1.0) * min(self.backoff_max, self.backoff_base * 2 ** attempt)
+
+    def get(self, url, params=None, headers=None, conditional=True):
+        """
+        Sends a GET with pooling, pacing, retries and (optionally) revalidation.
+        Raises `requests.exceptions.RequestException` once retries are exhausted
+        on a connection error; HTTP errors are returned for the caller to raise.
+        """
+        headers = dict(headers or {})
+        key = f"{url}?{urlencode(sorted((params or {}).items()), doseq=True)}"
+        cached = self.cache.get(key) if self.cache and conditional else None
+        if cached:
+            etag, last_modified, _ = cached
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+
+        limiter = self.limiters.for_url(url)
+        for attempt in range(self.max_retries + 1):
+            try:
+                with limiter.slot():
+                    response = self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+                limiter.record(retries=1, rate_limit_wait_s=delay)
+                print(f"  -> {urlparse(url).hostname}: {type(e).__name__}, retrying in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+
+            if (response.status_code in RETRY_STATUSES or is_rate_limited(response)) and attempt < self.max_retries:
+                delay = retry_after_seconds(response)
+                delay = self._backoff(attempt) if delay is None else min(delay, self.backoff_max * 5)
+                limiter.record(retries=1, rate_limit_wait_s=delay)
+                print(f"  -> {urlparse(url).hostname}: HTTP {response.status_code}, retrying in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+            break
+
+        response.from_cache = False
+        limiter.record(bytes=len(response.content))
+        if response.status_code == 304 and cached:
+            response.status_code = 200
+            response._content = cached[2]
+            response.from_cache = True
+            limiter.record(cache_hits=1)
+        elif response.status_code == 200 and self.cache and conditional:
+            etag, last_modified = response.headers.get('ETag'), response.headers.get('Last-Modified')
+            if etag or last_modified:
+                self.cache.put(key, etag, last_modified, response.content)
+        return response
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """The process-wide HttpClient shared by every collector."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient()
+        return _client
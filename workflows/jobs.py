@@ -0,0 +1,141 @@
+import collections
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from progress import parse_event
+
+LOG_TAIL_LINES = 50
+
+
+class RefreshJob:
+    """
+    Runs the data pipeline (main.py) in a child process, one run at a time.
+
+    A refresh requested while one is running joins that run instead of starting another,
+    so overlapping clicks never produce overlapping pipelines. The child reports progress
+    as events on stdout (see progress.py), which `status()` summarises per stage.
+
+    Args:
+        script (str): Path of the pipeline script.
+        cwd (str): Working directory for the run; the dataset is written there.
+        on_success (callable): Optional hook run after a successful run, before it is reported
+            as succeeded, e.g. to load the new dataset.
+        on_event (callable): Optional hook called with every progress event as it arrives,
+            e.g. to update metrics.
+    """
+
+    def __init__(self, script, cwd, on_success=None, on_event=None):
+        self.script = script
+        self.cwd = cwd
+        self.on_success = on_success
+        self.on_event = on_event
+        self._lock = threading.Lock()
+        self._thread = None
+        self._state = 'idle'
+        self._run = {}
+        # When the last successful run finished, kept across later failed runs.
+        self.last_success_at = None
+
+    def start(self):
+        """
+        Starts a run unless one is already in progress.
+
+        Returns:
+            bool: True if a new run was started, False if the request joined the current one.
+        """
+        with self._lock:
+            if self._state == 'running':
+                self._run['joined_requests'] += 1
+                return False
+            self._state = 'running'
+            self._run = {
+                'started_at': time.time(),
+                'finished_at': None,
+                'exit_code': None,
+                'error': None,
+                'joined_requests': 0,
+                'stages': collections.OrderedDict(),
+                'log_tail': collections.deque(maxlen=LOG_TAIL_LINES),
+            }
+            self._thread = threading.Thread(target=self._execute, name="refresh-job", daemon=True)
+            self._thread.start()
+            return True
+
+    def _record_event(self, event):
+        with self._lock:
+            stage = self._run['stages'].setdefault(event.get('stage', 'pipeline'), {})
+            if event.get('status') == 'started':
+                stage.clear()
+                stage['started_at'] = event.get('time')
+            elif event.get('status') in ('done', 'failed'):
+                stage['finished_at'] = event.get('time')
+            stage.update({key: value for key, value in event.items() if key not in ('stage', 'time')})
+
+    def _execute(self):
+        print("Starting data pipeline execution...")
+        env = dict(os.environ, PIPELINE_EVENTS='1', PYTHONIOENCODING='utf-8', PYTHONUNBUFFERED='1')
+        exit_code, error = None, None
+        try:
+            process = subprocess.Popen(
+                [sys.executable, self.script], cwd=self.cwd, env=env,
+                stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                text=True, encoding='utf-8', errors='replace'
+            )
+            for line in process.stdout:
+                line = line.rstrip('\n')
+                if not line:
+                    continue
+                event = parse_event(line)
+                if event is not None:
+                    self._record_event(event)
+                    if self.on_event is not None:
+                        self.on_event(event)
+                    continue
+                print(line)
+                with self._lock:
+                    self._run['log_tail'].append(line)
+            exit_code = process.wait()
+            if exit_code != 0:
+                error = f"Pipeline exited with code {exit_code}"
+        except Exception as e:
+            error = f"Could not run the pipeline: {e}"
+
+        if error:
+            print(f"--- ERROR: {error} ---")
+        else:
+            print("Pipeline script finished successfully.")
+            if self.on_success is not None:
+                self.on_success()
+        with self._lock:
+            self._run.update(finished_at=time.time(), exit_code=exit_code, error=error)
+            self._state = 'failed' if error else 'succeeded'
+            if not error:
+                self.last_success_at = self._run['finished_at']
+
+    def status(self):
+        """A JSON-serializable snapshot of the current or most recent run."""
+        with self._lock:
+            run = self._run
+            status = {'state': self._state}
+            if not run:
+                return status
+            finished_at = run['finished_at']
+            status.update(
+                started_at=run['started_at'],
+                finished_at=finished_at,
+                duration_s=round((finished_at or time.time()) - run['started_at'], 1),
+                exit_code=run['exit_code'],
+                error=run['error'],
+                joined_requests=run['joined_requests'],
+                stages={name: dict(stage) for name, stage in run['stages'].items()},
+                log_tail=list(run['log_tail'])[-10:],
+            )
+            return status
+
+    def wait(self, timeout=None):
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
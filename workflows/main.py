@@ -1,143 +1,200 @@
+import collections
 import os
-import json
-import pandas as pd
-import numpy as np  
+import time
+from datetime import datetime, timedelta, timezone
+from concurrency import CollectorTask, run_collector_tasks
+from dataset_files import CHUNK_SIZE, DatasetWriter
+from dedup import duplicate_links, merge_duplicates
+from http_client import get_client
+from progress import emit
+from store import RecordStore
 
 try:
-    from forum import fetch_forum_data
-    from youtube import fetch_youtube_data
-    from github import fetch_github_data
+    from forum import dedupe_topics, enrich_forum_data, fetch_forum_data, refresh_forum_records
+    from youtube import collect_youtube_data, refresh_youtube_records
+    from github import fetch_github_data, refresh_github_records
 except ImportError as e:
     print(f"Error: Could not import a collector function. Details: {e}")
     exit()
 
 
-def run_all_collectors():
+FORUM_SEARCH_TERMS = [
+    "workflow", "automation", "google sheets", "slack", "api", "webhook",
+    "discord", "airtable", "notion", "database", "gmail", "openai", "shopify",
+    "telegram", "typeform", "jira", "hubspot", "wordpress", "rss feed", "crm sync"
+]
+YOUTUBE_SEARCH_TERMS = [
+    "n8n workflow", "n8n automation", "n8n tutorial", 
+    "n8n google sheets", "n8n slack", "n8n airtable",
+    "n8n discord notification", "n8n shopify", "n8n vs make",
+    "n8n typeform", "n8n self host", "n8n postgres"
+]
+YOUTUBE_COUNTRIES = ['US', 'IN']
+GITHUB_SEARCH_QUERIES = ["n8n workflow", "n8n-nodes", "n8n custom", "n8n self-hosted"]
+# Fetch each forum topic's own page for post counts and tags (one extra request per unique topic).
+FORUM_ENRICH = os.getenv('FORUM_ENRICH', 'false').lower() == 'true'
+
+
+# Incremental runs: each source only searches for items newer than its cursor (minus an
+# overlap, in case an item was indexed late), and known items are re-fetched once their
+# metrics are older than STORE_STALE_HOURS, at most STORE_STALE_BATCH per platform a run.
+STORE_STALE_HOURS = float(os.getenv('STORE_STALE_HOURS', '24'))
+STORE_STALE_BATCH = int(os.getenv('STORE_STALE_BATCH', '500'))
+FULL_REFRESH = os.getenv('FULL_REFRESH', 'false').lower() == 'true'
+CURSOR_OVERLAP = timedelta(days=1)
+STALE_REFRESHERS = {'Forum': refresh_forum_records, 'YouTube': refresh_youtube_records, 'GitHub': refresh_github_records}
+
+
+def read_cursors(store):
+    """Start time of each source's last successful run, minus the overlap. Empty for a full refresh."""
+    if FULL_REFRESH:
+        return {}
+    since = {}
+    for source in ('forum', 'youtube', 'github'):
+        cursor = store.get_cursor(source)
+        if cursor:
+            since[source] = datetime.fromisoformat(cursor) - CURSOR_OVERLAP
+    return since
+
+
+def run_all_collectors(store):
     """
-    Runs all data collectors, including country-specific searches for YouTube.
+    Runs all data collectors concurrently, including country-specific searches for YouTube,
+    and upserts what they find into the store.
+
+    Every forum and GitHub search term is its own task; YouTube is one task that searches
+    every term and region and then batches the statistics lookups. Tasks for different hosts run in
+    parallel, while each host has its own concurrency cap and rate limit (see
+    concurrency.HOST_LIMITS), so a refresh takes about as long as the slowest source.
+
+    After the first run, searches only ask for items newer than each source's cursor, and
+    a second pass re-fetches the metrics of stored items that have gone stale, so the cost
+    of a refresh follows how much changed rather than the size of the dataset.
     """
     print("--- Starting Data Collection Phase ---")
-    
-    # --- 1. n8n Forum ---
-    print("\n[1/3] Collecting from n8n Forum...")
-    forum_search_terms = [
-        "workflow", "automation", "google sheets", "slack", "api", "webhook",
-        "discord", "airtable", "notion", "database", "gmail", "openai", "shopify",
-        "telegram", "typeform", "jira", "hubspot", "wordpress", "rss feed", "crm sync"
-    ]
-    forum_data = []
-    for term in forum_search_terms:
-        # Fetching a focused number of top results per term ensures quality
-        forum_data.extend(fetch_forum_data(term, limit=1150))
-    with open('forum_data.json', 'w', encoding='utf-8') as f:
-        json.dump(forum_data, f, indent=4, ensure_ascii=False)
-    print(f"  -> Saved {len(forum_data)} records to forum_data.json")
-
-    # --- 2. YouTube ---
-    print("\n[2/3] Collecting from YouTube with country segmentation...")
-    youtube_search_terms = [
-        "n8n workflow", "n8n automation", "n8n tutorial", 
-        "n8n google sheets", "n8n slack", "n8n airtable",
-        "n8n discord notification", "n8n shopify", "n8n vs make",
-        "n8n typeform", "n8n self host", "n8n postgres"
-    ]
-    youtube_data = []
-    countries = ['US', 'IN']
-    for country_code in countries:
-        print(f"  -> Searching YouTube for region: {country_code}")
-        for term in youtube_search_terms:
-            youtube_data.extend(fetch_youtube_data(term, limit=50, region_code=country_code))
-
-    with open('youtube_data.json', 'w', encoding='utf-8') as f:
-        json.dump(youtube_data, f, indent=4, ensure_ascii=False)
-    
-    print(f"  -> Saved {len(youtube_data)} total records to youtube_data.json")
-
-     # --- 3. GitHub ---
-    print("\n[3/3] Collecting from GitHub with expanded queries...")
-    github_search_queries = ["n8n workflow", "n8n-nodes", "n8n custom", "n8n self-hosted"]
-    github_data = []
-
-    for query in github_search_queries:
-        github_data.extend(fetch_github_data(search_query=query, limit=2000))
-    
-    with open('github_data.json', 'w', encoding='utf-8') as f:
-        json.dump(github_data, f, indent=4, ensure_ascii=False)
-
-    print(f"  -> Saved {len(github_data)} records to github_data.json")    
-    print("\n--- Data Collection Phase Complete ---")
-
-def calculate_popularity_score(df):
+    start = time.perf_counter()
+    started_at = datetime.now(timezone.utc)
+    since = read_cursors(store)
+    for source, cursor in since.items():
+        print(f"  -> Incremental {source} search for items since {cursor:%Y-%m-%d %H:%M}")
+
+    forum_since = since['forum'].strftime('%Y-%m-%d') if 'forum' in since else None
+    youtube_since = since['youtube'].strftime('%Y-%m-%dT%H:%M:%SZ') if 'youtube' in since else None
+    github_since = since['github'].strftime('%Y-%m-%d') if 'github' in since else None
+
+    tasks = []
+    # Fetching a focused number of top results per term ensures quality
+    for term in FORUM_SEARCH_TERMS:
+        tasks.append(CollectorTask('forum', None, fetch_forum_data, (term,), {'limit': 1150, 'since': forum_since}))
+    # YouTube searches every term in every region first, then looks up each unique video once.
+    tasks.append(CollectorTask('youtube', None, collect_youtube_data, (YOUTUBE_SEARCH_TERMS, YOUTUBE_COUNTRIES),
+                               {'limit': 50, 'published_after': youtube_since}))
+    for query in GITHUB_SEARCH_QUERIES:
+        tasks.append(CollectorTask('github', None, fetch_github_data, (),
+                                   {'search_query': query, 'limit': 2000, 'pushed_after': github_since}))
+
+    print(f"Running {len(tasks)} collection tasks across forum, YouTube and GitHub...")
+    emit('collect', 'started', total=len(tasks))
+    done = collections.Counter()
+    failed = collections.Counter()
+
+    def task_finished(task, records, error, duration_s):
+        done[task.source] += 1
+        if error is not None:
+            failed[task.source] += 1
+        # Host counters are totals so far, so the latest event always has the whole picture.
+        emit('collect', 'progress', done=sum(done.values()), total=len(tasks), source=task.source,
+             records=len(records), error=str(error) if error else None, duration_s=round(duration_s, 3),
+             hosts=get_client().limiters.stats())
+
+    # Every request is paced by its host's limiter: forum and GitHub inside the shared HTTP
+    # client, YouTube's discovery-client calls under the same limiters.
+    results = run_collector_tasks(tasks, limiters=get_client().limiters, on_result=task_finished)
+
+    # The same topic often matches several search terms; keep it once, before any enrichment.
+    results['forum'] = dedupe_topics(results.get('forum', []))
+    if FORUM_ENRICH:
+        results['forum'] = enrich_forum_data(results['forum'])
+    for source, records in results.items():
+        changed = store.upsert(records)
+        print(f"  -> {source}: {len(records)} records found, {changed} new or changed")
+        # If any of a source's tasks failed, or it found nothing, keep its cursor so the
+        # next run searches the same window again; the window of a failed query would
+        # otherwise never be searched.
+        if failed[source]:
+            print(f"  -> {source}: {failed[source]} task(s) failed, keeping its cursor")
+        elif records:
+            store.set_cursor(source, started_at.isoformat())
+    emit('collect', 'done', records={source: len(records) for source, records in results.items()},
+         hosts=get_client().limiters.stats())
+
+    # Anything a search returned was fetched just now, so only the rest can be stale.
+    refresh_tasks = []
+    for platform, refresh in STALE_REFRESHERS.items():
+        stale = store.stale_records(platform, STORE_STALE_HOURS * 3600, STORE_STALE_BATCH)
+        if stale:
+            refresh_tasks.append(CollectorTask(platform, None, refresh, (stale,), {}))
+    if refresh_tasks:
+        print(f"Refreshing stale metrics for {', '.join(task.source for task in refresh_tasks)}...")
+        emit('refresh_stale', 'started', total=len(refresh_tasks))
+        refreshed = {}
+        for platform, records in run_collector_tasks(refresh_tasks, limiters=get_client().limiters).items():
+            changed = store.upsert(records, seen=False)
+            refreshed[platform] = len(records)
+            print(f"  -> {platform}: {len(records)} stale records refreshed, {changed} changed")
+        emit('refresh_stale', 'done', records=refreshed, hosts=get_client().limiters.stats())
+
+    print(f"\n--- Data Collection Phase Complete in {time.perf_counter() - start:.1f}s ---")
+
+def combine_and_clean_data(store):
     """
-    Calculates a popularity score using logarithmic scaling to better handle outliers.
+    Rescores the records that changed since the last run, merges duplicates (see dedup.py)
+    and writes the ranked dataset (see dataset_files.py).
+
+    Records are streamed from the store to the dataset files a chunk at a time; only the
+    link, platform and title of every record are held at once, to find the duplicates.
     """
-    print("  -> Calculating popularity scores with logarithmic scaling...")
-    df['score'] = 0.0
-
-    def normalize_log_scale(series):
-        series = pd.to_numeric(series, errors='coerce').fillna(0)
-        log_scaled = np.log1p(series)
-        min_val, max_val = log_scaled.min(), log_scaled.max()
-        if max_val > min_val:
-            return ((log_scaled - min_val) / (max_val - min_val)) * 100
-        return pd.Series(0, index=series.index)
-
-    # Forum: based on views
-    forum_mask = df['platform'] == 'Forum'
-    if not df.loc[forum_mask].empty:
-        forum_views = df.loc[forum_mask, 'popularity_metrics'].apply(lambda x: x.get('views', 0))
-        df.loc[forum_mask, 'score'] = normalize_log_scale(forum_views)
-
-    # YouTube: based on views
-    youtube_mask = df['platform'] == 'YouTube'
-    if not df.loc[youtube_mask].empty:
-        youtube_views = df.loc[youtube_mask, 'popularity_metrics'].apply(lambda x: x.get('views', 0))
-        df.loc[youtube_mask, 'score'] = normalize_log_scale(youtube_views)
-        
-    # GitHub: based on stars
-    github_mask = df['platform'] == 'GitHub'
-    if not df.loc[github_mask].empty:
-        github_stars = df.loc[github_mask, 'popularity_metrics'].apply(lambda x: x.get('stars', 0))
-        df.loc[github_mask, 'score'] = normalize_log_scale(github_stars)
-    
-    return df
-
-def combine_and_clean_data():
     print("\n--- Starting Data Combination and Cleaning Phase ---")
-    data_files = ['forum_data.json', 'youtube_data.json', 'github_data.json']
-    all_data = []
-    for file_name in data_files:
-        if os.path.exists(file_name):
-            try:
-                with open(file_name, 'r', encoding='utf-8') as f:
-                    all_data.extend(json.load(f))
-                print(f"  -> Loaded {len(all_data)} total records so far from {file_name}")
-            except (json.JSONDecodeError, IOError) as e:
-                print(f"  -> WARNING: Could not read or parse {file_name}. Error: {e}")
-    
-    if not all_data:
+    if not store.count():
         print("No data was collected. Exiting.")
         return
 
-    df = pd.DataFrame(all_data)
-    df['country'] = df['country'].fillna('Global')
-    if 'metadata' not in df.columns:
-        df['metadata'] = [{} for _ in range(len(df))]
-    df['metadata'] = df['metadata'].apply(lambda x: {} if pd.isna(x) else x)
-    
-    # df.drop_duplicates(subset=['link'], inplace=True, keep='first')
-    
-    df = calculate_popularity_score(df)
-    
-    df = df.sort_values(by='score', ascending=False)
-    
-    final_dataset = df.to_dict('records')
-    with open('final_dataset.json', 'w', encoding='utf-8') as f:
-        json.dump(final_dataset, f, indent=4, ensure_ascii=False)
-        
-    print(f"\nSuccessfully combined and cleaned data. Total unique workflows: {len(final_dataset)}")
+    emit('score', 'started')
+    rescored = store.rescore()
+    print(f"  -> Rescored {rescored} records")
+    emit('score', 'done', rescored=rescored)
+
+    emit('dedupe', 'started')
+    duplicates = duplicate_links(store.ranked_titles())
+    folded = {link for links in duplicates.values() for link in links}
+    print(f"  -> Found {len(folded)} links duplicating {len(duplicates)} others")
+    emit('dedupe', 'done', kept=len(duplicates), merged=len(folded))
+
+    emit('publish', 'started')
+    with DatasetWriter() as writer:
+        for chunk in store.iter_ranked_records(CHUNK_SIZE):
+            kept = [record for record in chunk if record['link'] not in folded]
+            to_merge = [record for record in kept if record['link'] in duplicates]
+            if to_merge:
+                others = store.records_for_links(link for record in to_merge for link in duplicates[record['link']])
+                by_link = collections.defaultdict(list)
+                for other in others:
+                    by_link[other['link']].append(other)
+                for record in to_merge:
+                    merge_duplicates(
+                        record, [other for link in duplicates[record['link']] for other in by_link[link]],
+                        score=store.score_record,
+                    )
+            writer.write(kept)
+    emit('publish', 'done', records=writer.records)
+
+    print(f"\nSuccessfully combined and cleaned data. Total unique workflows: {writer.records}")
     print("--- Pipeline Finished ---")
 
 if __name__ == "__main__":
-    run_all_collectors()
-    combine_and_clean_data()
\ No newline at end of file
+    store = RecordStore()
+    try:
+        run_all_collectors(store)
+        combine_and_clean_data(store)
+    finally:
+        store.close()
@@ -0,0 +1,44 @@
+import json
+import os
+import sys
+import threading
+import time
+
+# Progress events are written to stdout as one JSON object per line after this prefix,
+# for the API's refresh job to follow. Only emitted when PIPELINE_EVENTS=1, so running
+# main.py by hand prints the usual log only.
+EVENT_PREFIX = '@@event '
+ENABLED = os.getenv('PIPELINE_EVENTS') == '1'
+
+_print_lock = threading.Lock()
+
+
+def emit(stage, status, **fields):
+    """
+    Reports progress of a pipeline stage.
+
+    Args:
+        stage (str): e.g. "collect" or "score".
+        status (str): "started", "progress", "done" or "failed".
+        **fields: Extra JSON-serializable details, e.g. done=3, total=25.
+    """
+    if not ENABLED:
+        return
+    event = dict(fields, stage=stage, status=status, time=time.time())
+    line = EVENT_PREFIX + json.dumps(event, ensure_ascii=False, default=str)
+    with _print_lock:
+        # print() writes its text and the newline separately, so another thread's log line
+        # may still be waiting for its newline; starting on a fresh line keeps the event
+        # parseable, and one write keeps it whole.
+        sys.stdout.write('\n' + line + '\n')
+        sys.stdout.flush()
+
+
+def parse_event(line):
+    """The event in a line of pipeline output, or None for an ordinary log line."""
+    if not line.startswith(EVENT_PREFIX):
+        return None
+    try:
+        return json.loads(line[len(EVENT_PREFIX):])
+    except ValueError:
+        return None
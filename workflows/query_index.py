@@ -0,0 +1,239 @@
+import base64
+import bisect
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+# Streamed records are sent in chunks of about this many bytes.
+STREAM_CHUNK_BYTES = 64 * 1024
+# Views filtered by min_score under a sort other than score, kept per index (least recently
+# used dropped first), since every distinct min_score a client sends makes another one.
+MAX_SCORE_VIEWS = 64
+
+
+def query_hash(sort, platform=None, country=None, min_score=None):
+    """A short hash of a query's parameters, carried in its cursors."""
+    params = [sort, (platform or '').lower(), (country or '').lower(), min_score]
+    return hashlib.sha1(json.dumps(params).encode('utf-8')).hexdigest()[:12]
+
+
+def encode_cursor(offset, version, query=None):
+    """
+    An opaque cursor for the page that starts at `offset` of a given dataset version, for
+    the query whose query_hash is `query`.
+    """
+    raw = json.dumps({'o': offset, 'v': version, 'q': query}, separators=(',', ':')).encode('ascii')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Returns (offset, version, query hash). Raises ValueError for a cursor we didn't hand out."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        data = json.loads(raw)
+        offset = int(data['o'])
+    except (TypeError, KeyError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    if offset < 0:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return offset, data.get('v'), data.get('q')
+
+
+class QueryIndex:
+    """
+    Indexes over one version of the dataset, built once when it is loaded, so a filtered,
+    sorted page costs about as much as the page itself.
+
+    - Records come serialized (see dataset_files.DatasetColumns); a page is its records'
+      bytes joined together.
+    - Posting lists per platform and per country.
+    - One ordering per sort key (score and every numeric metric), best first.
+    - Filtered orderings, e.g. GitHub records by stars, are derived from those on first
+      use and kept for the lifetime of this dataset version. Only platforms and countries
+      that occur in the dataset are kept, so the cache is bounded by the dataset.
+    - `min_score` is a binary search over the score ordering. Under another sort, the
+      records scoring at least `min_score` are filtered once and that view is cached too
+      (the most recent MAX_SCORE_VIEWS of them).
+
+    Args:
+        columns (DatasetColumns): The ranked dataset, as read by dataset_files.read_columns.
+        version (str): Identifies the dataset version, carried in cursors.
+    """
+
+    def __init__(self, columns, version):
+        self.version = version
+        self.record_bytes = columns.records
+        self.scores = columns.scores
+
+        self.by_platform, self.by_country = {}, {}
+        for position, (platform, country) in enumerate(zip(columns.platforms, columns.countries)):
+            self.by_platform.setdefault(str(platform or '').lower(), []).append(position)
+            self.by_country.setdefault(str(country or '').lower(), []).append(position)
+
+        # Stable sorts, best first; ties keep the dataset's order.
+        self._score_array = np.asarray(self.scores, dtype='float64')
+        self.orderings = {'score': np.argsort(-self._score_array, kind='stable').tolist()}
+        for name in sorted(columns.metrics):
+            self.orderings[name] = np.argsort(-columns.metrics[name], kind='stable').tolist()
+
+        self._views = {}
+        self._score_views = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def sort_keys(self):
+        return list(self.orderings)
+
+    def view(self, sort, platform=None, country=None):
+        """Positions of the records matching the filters, in `sort` order."""
+        ordering = self.orderings[sort]
+        if not platform and not country:
+            return ordering
+        key = (sort, (platform or '').lower(), (country or '').lower())
+        if (platform and key[1] not in self.by_platform) or (country and key[2] not in self.by_country):
+            # Nothing matches; not cached, so made-up filter values can't grow the cache.
+            return []
+        view = self._views.get(key)
+        if view is None:
+            allowed = None
+            if platform:
+                allowed = set(self.by_platform.get(key[1], ()))
+            if country:
+                in_country = set(self.by_country.get(key[2], ()))
+                allowed = in_country if allowed is None else allowed & in_country
+            view = [position for position in ordering if position in allowed]
+            with self._lock:
+                self._views[key] = view
+        return view
+
+    def count_min_score(self, min_score, platform=None, country=None):
+        """How many matching records score at least `min_score`."""
+        by_score = self.view('score', platform, country)
+        return bisect.bisect_right(by_score, -min_score, key=lambda i: -self.scores[i])
+
+    def score_view(self, sort, min_score, platform=None, country=None):
+        """
+        Positions of the matching records that score at least `min_score`, in `sort` order.
+
+        Returns:
+            tuple: (positions, how many of them from the start match). Sorted by score, that
+                is the whole view up to the cut-off; otherwise all of a filtered view.
+        """
+        view = self.view(sort, platform, country)
+        count = self.count_min_score(min_score, platform, country)
+        if sort == 'score' or count == len(view):
+            # Sorted by score, the records past the cut-off are the ones below min_score.
+            return view, count
+        # Keyed by the cut-off rather than min_score itself: scores between the same two
+        # records select the same view.
+        key = (sort, (platform or '').lower(), (country or '').lower(), count)
+        with self._lock:
+            selected = self._score_views.get(key)
+            if selected is not None:
+                self._score_views.move_to_end(key)
+                return selected, count
+        positions = np.asarray(view, dtype=np.int64)
+        selected = positions[self._score_array[positions] >= min_score].tolist()
+        with self._lock:
+            self._score_views[key] = selected
+            while len(self._score_views) > MAX_SCORE_VIEWS:
+                self._score_views.popitem(last=False)
+        return selected, count
+
+    def _select(self, sort, platform, country, min_score, cursor, limit):
+        """
+        Positions of the matching records from `cursor` on, at most `limit` of them (all
+        of them if `limit` is None).
+
+        Returns:
+            tuple: (positions, number of matching records, cursor of the next page or None).
+        Raises:
+            ValueError: For an unknown sort key, an invalid cursor, or a cursor from another
+                dataset version or another query.
+        """
+        if sort not in self.orderings:
+            raise ValueError(f"Unknown sort '{sort}'. Choose one of: {', '.join(self.orderings)}")
+        query = query_hash(sort, platform, country, min_score)
+        offset = 0
+        if cursor:
+            offset, version, cursor_query = decode_cursor(cursor)
+            if version != self.version:
+                # The ranking changed since this cursor was handed out; its offset would
+                # skip or repeat records in the new one.
+                raise ValueError(
+                    "The dataset was refreshed since this cursor was issued; start again without a cursor"
+                )
+            if cursor_query != query:
+                # The offset only means something within the query it came from.
+                raise ValueError(
+                    "This cursor was issued for different sort or filter parameters; repeat them or"
+                    " start again without a cursor"
+                )
+
+        if min_score is None:
+            view = self.view(sort, platform, country)
+            total = len(view)
+        else:
+            view, total = self.score_view(sort, min_score, platform, country)
+        selected = view[offset:total if limit is None else min(offset + limit, total)]
+        next_offset = offset + len(selected)
+        return selected, total, encode_cursor(next_offset, self.version, query) if next_offset < total else None
+
+    def page(self, sort='score', platform=None, country=None, min_score=None, cursor=None, limit=DEFAULT_PAGE_SIZE):
+        """
+        One page of matching records.
+
+        Returns:
+            bytes: JSON object with `items`, `total` and `next_cursor` (null on the last page).
+        Raises:
+            ValueError: For an unknown sort key, an invalid cursor, or a cursor from another
+                dataset version or another query.
+        """
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        selected, total, next_cursor = self._select(sort, platform, country, min_score, cursor, limit)
+        return (
+            b'{"items":[' + b','.join(self.record_bytes[position] for position in selected)
+            + b'],"total":' + str(total).encode('ascii')
+            + b',"next_cursor":' + json.dumps(next_cursor).encode('ascii') + b'}'
+        )
+
+    def stream(self, sort='score', platform=None, country=None, min_score=None, cursor=None, limit=None,
+               chunk_bytes=STREAM_CHUNK_BYTES):
+        """
+        The matching records as NDJSON (one record per line), in chunks: all of them, or one
+        page of `limit` records from `cursor` on, as with page().
+
+        Chunks are produced lazily, one per `next()`, so a slow client is never more than a
+        chunk behind, and the whole stream is read from this dataset version even if a new
+        one is loaded meanwhile.
+
+        Returns:
+            tuple: (number of matching records, cursor of the next page or None, iterator
+                of bytes chunks).
+        Raises:
+            ValueError: For an unknown sort key, an invalid cursor, or a cursor from another
+                dataset version or another query.
+        """
+        # At least one record per page, as in page(): an empty page's cursor would point at
+        # the same offset again.
+        limit = None if limit is None else max(1, limit)
+        positions, total, next_cursor = self._select(sort, platform, country, min_score, cursor, limit)
+
+        def chunks():
+            lines, size = [], 0
+            for position in positions:
+                line = self.record_bytes[position]
+                lines.append(line)
+                size += len(line) + 1
+                if size >= chunk_bytes:
+                    yield b'\n'.join(lines) + b'\n'
+                    lines, size = [], 0
+            if lines:
+                yield b'\n'.join(lines) + b'\n'
+
+        return total, next_cursor, chunks()
@@ -0,0 +1,560 @@
+"""
+Offline stand-ins for the forum (Discourse), GitHub, YouTube Data API, Twitter v2 and
+Google Trends APIs, and an end-to-end benchmark of the pipeline against them.
+
+Responses are generated from a seed, so every run sees the same data. Each API is served
+on its own local port, so the collectors' per-host limiters still apply per API.
+
+    python replay.py serve                      # print the env vars and serve until Ctrl+C
+    python replay.py benchmark --scales 1 10 100
+
+Latency, error rate and page counts are options of both commands (see --help).
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+SERVICES = ['forum', 'github', 'youtube', 'twitter', 'trends']
+# Real host each stand-in replaces, whose politeness limits apply with --limits real.
+REAL_HOSTS = {
+    'forum': 'community.n8n.io', 'github': 'api.github.com', 'youtube': 'www.googleapis.com',
+    'twitter': 'api.twitter.com', 'trends': 'trends.google.com',
+}
+RESULT_PREFIX = '@@replay '
+
+APPS = [
+    'Google Sheets', 'Slack', 'Discord', 'Airtable', 'Notion', 'Gmail', 'OpenAI', 'Shopify', 'Telegram',
+    'Typeform', 'Jira', 'HubSpot', 'WordPress', 'Postgres', 'Stripe', 'Trello', 'Asana', 'Twilio',
+    'Salesforce', 'Dropbox', 'Google Drive', 'Mailchimp', 'GitHub', 'Zendesk', 'Calendly', 'Webflow',
+]
+ACTIONS = ['Sync', 'Send', 'Automate', 'Back up', 'Connect', 'Notify', 'Summarize', 'Import', 'Track', 'Route']
+
+
+class ReplayConfig:
+    """
+    What the stand-ins serve and how.
+
+    Args:
+        scale (int): Dataset size multiplier. Item pools grow with it, and the benchmark
+            runs `scale` times as many search terms, so requests and records grow linearly.
+        latency_ms (float): Added to every response, with up to 50% jitter.
+        error_rate (float): Fraction of requests answered with a 503.
+        forum_pages (int): Result pages per forum search (50 topics each).
+        github_repos (int): Repositories matching each GitHub query; over 1000 makes the
+            collector split the query into star ranges.
+        youtube_pages (int): Result pages per YouTube search.
+        seed (int): Seed of the generated data.
+    """
+
+    def __init__(self, scale=1, latency_ms=20.0, error_rate=0.0, forum_pages=6, github_repos=2500,
+                 youtube_pages=2, seed=7):
+        self.scale = scale
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.forum_pages = forum_pages
+        self.github_repos = github_repos
+        self.youtube_pages = youtube_pages
+        self.seed = seed
+
+
+def _rng(*parts):
+    """A random generator seeded by `parts`, the same in every process."""
+    return random.Random('/'.join(str(part) for part in parts))
+
+
+def _title(rng):
+    first, second = rng.sample(APPS, 2)
+    title = f"{rng.choice(ACTIONS)} {first} to {second} with n8n"
+    return title if rng.random() < 0.5 else f"{title} ({rng.choice(['tutorial', 'template', 'guide', 'help'])})"
+
+
+def _timestamp(rng, start_year=2019):
+    day = date(start_year, 1, 1) + timedelta(days=rng.randrange((date(2025, 1, 1) - date(start_year, 1, 1)).days))
+    return datetime(day.year, day.month, day.day, tzinfo=timezone.utc).isoformat().replace('+00:00', 'Z')
+
+
+class ReplayData:
+    """Generates the items behind every stand-in API, lazily and deterministically."""
+
+    def __init__(self, config):
+        self.config = config
+        self.forum_pool = 3000 * config.scale
+        self.video_pool = 2000 * config.scale
+        self._github = {}
+        self._lock = threading.Lock()
+
+    # --- Forum ---
+
+    def topic(self, topic_id):
+        rng = _rng(self.config.seed, 'topic', topic_id)
+        title = _title(rng)
+        views = int(rng.lognormvariate(6, 1.5))
+        return {
+            'id': topic_id, 'title': title, 'slug': re.sub(r'[^a-z0-9]+', '-', title.lower()).strip('-'),
+            'views': views, 'reply_count': int(views * rng.uniform(0, 0.05)),
+            'like_count': int(views * rng.uniform(0, 0.02)), 'posts_count': int(views * rng.uniform(0, 0.05)) + 1,
+            'tags': rng.sample(['ai', 'webhook', 'api', 'database', 'crm', 'email'], 2),
+            'created_at': _timestamp(rng),
+        }
+
+    def forum_search(self, query, page, page_size=50):
+        term = re.sub(r'\s*after:\S+', '', query).strip()
+        rng = _rng(self.config.seed, 'forum-search', term)
+        matches = self.config.forum_pages * page_size
+        ids = rng.sample(range(1, self.forum_pool + 1), min(matches, self.forum_pool))
+        topics = sorted((self.topic(topic_id) for topic_id in ids), key=lambda topic: -topic['views'])
+        start = (page - 1) * page_size
+        return {
+            'topics': topics[start:start + page_size],
+            'grouped_search_result': {'more_full_page_results': start + page_size < len(topics)},
+        }
+
+    def forum_listing(self, name, page, page_size=30, pages=10):
+        ids = range(page * page_size + 1, (page + 1) * page_size + 1) if page < pages else []
+        more = f"/{name}?page={page + 1}" if page + 1 < pages else None
+        return {'topic_list': {'topics': [self.topic(topic_id) for topic_id in ids], 'more_topics_url': more}}
+
+    # --- GitHub ---
+
+    def github_pool(self, base_query):
+        """Stars, creation day and push day of every repository matching a base query."""
+        with self._lock:
+            if base_query not in self._github:
+                seed = int(hashlib.sha1(f"{self.config.seed}/{base_query}".encode()).hexdigest()[:8], 16)
+                rng = np.random.default_rng(seed)
+                count = self.config.github_repos
+                stars = np.sort(rng.lognormal(2, 2, count).astype(np.int64))[::-1]
+                created = rng.integers(date(2015, 1, 1).toordinal(), date(2025, 1, 1).toordinal(), count)
+                pushed = np.minimum(created + rng.integers(0, 2000, count), date(2025, 6, 1).toordinal())
+                self._github[base_query] = (stars, created, pushed, seed)
+            return self._github[base_query]
+
+    @staticmethod
+    def _day(value):
+        return date.fromisoformat(value).toordinal()
+
+    def github_repo(self, index, base_query, stars, created, pushed):
+        slug = re.sub(r'[^a-z0-9]+', '-', base_query.lower()).strip('-')
+        name = f"dev{index % 997}/{slug}-{index}"
+        return {
+            'full_name': name, 'html_url': f"https://github.com/{name}",
+            'stargazers_count': int(stars), 'watchers_count': int(stars), 'forks_count': int(stars) // 7,
+            'created_at': date.fromordinal(int(created)).isoformat() + 'T00:00:00Z',
+            'pushed_at': date.fromordinal(int(pushed)).isoformat() + 'T00:00:00Z',
+        }
+
+    def github_search(self, query, page, per_page):
+        """GitHub search semantics for the qualifiers the collector uses: stars, created and pushed ranges."""
+        qualifiers = dict(re.findall(r'(\w+):(\S+)', query))
+        base_query = re.sub(r'\s*\w+:\S+', '', query).strip()
+        stars, created, pushed, _ = self.github_pool(base_query)
+        mask = np.ones(len(stars), dtype=bool)
+        if 'stars' in qualifiers:
+            low, _, high = qualifiers['stars'].partition('..')
+            mask &= (stars >= int(low)) & (stars <= int(high or low))
+        if 'created' in qualifiers:
+            low, _, high = qualifiers['created'].partition('..')
+            mask &= (created >= self._day(low)) & (created <= self._day(high or low))
+        if 'pushed' in qualifiers:
+            mask &= pushed > self._day(qualifiers['pushed'].lstrip('>='))
+        matches = np.flatnonzero(mask)
+        start = (page - 1) * per_page
+        if start >= 1000:
+            return None
+        items = [
+            self.github_repo(int(index), base_query, stars[index], created[index], pushed[index])
+            for index in matches[start:min(start + per_page, 1000)]
+        ]
+        return {'total_count': int(len(matches)), 'incomplete_results': False, 'items': items}
+
+    def github_repo_by_name(self, full_name):
+        match = re.match(r'dev\d+/(.+)-(\d+)$', full_name)
+        if not match:
+            return None
+        for base_query in list(self._github):
+            if re.sub(r'[^a-z0-9]+', '-', base_query.lower()).strip('-') == match.group(1):
+                stars, created, pushed, _ = self._github[base_query]
+                index = int(match.group(2))
+                if index < len(stars):
+                    return self.github_repo(index, base_query, stars[index], created[index], pushed[index])
+        return None
+
+    # --- YouTube ---
+
+    def video(self, video_id):
+        rng = _rng(self.config.seed, 'video', video_id)
+        views = int(rng.lognormvariate(8, 2))
+        return {
+            'kind': 'youtube#video', 'id': video_id,
+            'snippet': {
+                'title': _title(rng), 'channelTitle': f"channel {rng.randrange(500)}",
+                'publishedAt': _timestamp(rng), 'description': 'Replayed video', 'tags': ['n8n'],
+            },
+            'statistics': {
+                'viewCount': str(views), 'likeCount': str(int(views * rng.uniform(0, 0.05))),
+                'commentCount': str(int(views * rng.uniform(0, 0.005))),
+            },
+            'contentDetails': {'duration': f"PT{rng.randrange(2, 60)}M{rng.randrange(60)}S"},
+        }
+
+    def youtube_search(self, term, region, max_results, page_token):
+        rng = _rng(self.config.seed, 'youtube-search', term, region)
+        found = self.config.youtube_pages * 50
+        ids = [f"v{index:09d}" for index in rng.sample(range(self.video_pool), min(found, self.video_pool))]
+        start = int(page_token or 0)
+        end = min(start + max_results, len(ids))
+        response = {
+            'kind': 'youtube#searchListResponse',
+            'items': [{'kind': 'youtube#searchResult', 'id': {'kind': 'youtube#video', 'videoId': video_id}}
+                      for video_id in ids[start:end]],
+        }
+        if end < len(ids):
+            response['nextPageToken'] = str(end)
+        return response
+
+    # --- Twitter ---
+
+    def tweets(self, query, max_results):
+        rng = _rng(self.config.seed, 'tweets', query)
+        tweets, users = [], {}
+        for _ in range(max_results):
+            tweet_id = str(rng.randrange(10 ** 17, 10 ** 18))
+            author_id = str(rng.randrange(10 ** 6))
+            users[author_id] = {'id': author_id, 'username': f"user{author_id}"}
+            tweets.append({
+                'id': tweet_id, 'text': _title(rng), 'author_id': author_id, 'created_at': _timestamp(rng, 2024),
+                'public_metrics': {'retweet_count': rng.randrange(50), 'like_count': rng.randrange(500),
+                                   'reply_count': rng.randrange(30), 'quote_count': 0},
+            })
+        return {'data': tweets, 'includes': {'users': list(users.values())}, 'meta': {'result_count': len(tweets)}}
+
+    # --- Google Trends ---
+
+    def trends_timeline(self, keywords):
+        rng = _rng(self.config.seed, 'trends', *keywords)
+        start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        timeline = []
+        for week in range(13):
+            timeline.append({
+                'time': str(int((start + timedelta(weeks=week)).timestamp())),
+                'formattedTime': '', 'value': [rng.randrange(101) for _ in keywords],
+                'hasData': [True for _ in keywords],
+            })
+        return {'default': {'timelineData': timeline}}
+
+
+class ReplayStats:
+    """Requests and response bytes per stand-in, shared by its handler threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = {service: 0 for service in SERVICES}
+            self.errors = {service: 0 for service in SERVICES}
+            self.bytes_sent = {service: 0 for service in SERVICES}
+
+    def count(self, service, size, error=False):
+        with self._lock:
+            self.requests[service] += 1
+            self.bytes_sent[service] += size
+            if error:
+                self.errors[service] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {'requests': dict(self.requests), 'errors': dict(self.errors), 'bytes': dict(self.bytes_sent)}
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    """Routes one stand-in's requests to ReplayData. Keep-alive, like the real APIs."""
+
+    protocol_version = 'HTTP/1.1'
+    service = None
+    data = None
+    stats = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body=b'', content_type='application/json', headers=None):
+        head = {'Content-Type': content_type, 'Content-Length': str(len(body))}
+        head.update(headers or {})
+        if status == 200:
+            etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+            head['ETag'] = etag
+            if self.headers.get('If-None-Match') == etag:
+                status, body = 304, b''
+                head['Content-Length'] = '0'
+        self.send_response(status)
+        for name, value in head.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+        self.stats.count(self.service, len(body), error=status >= 500)
+
+    def _json(self, data, prefix='', headers=None):
+        if data is None:
+            self._send(404, b'{"error": "not found"}')
+            return
+        self._send(200, (prefix + json.dumps(data)).encode('utf-8'), headers=headers)
+
+    def _handle(self):
+        config = self.data.config
+        if config.latency_ms:
+            time.sleep(config.latency_ms * random.uniform(1.0, 1.5) / 1000)
+        if self.headers.get('Content-Length'):
+            self.rfile.read(int(self.headers['Content-Length']))
+        if config.error_rate and random.random() < config.error_rate:
+            self._send(503, b'{"error": "replayed outage"}')
+            return
+        parts = urlsplit(self.path)
+        query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+        getattr(self, f"_{self.service}")(parts.path, query)
+
+    do_GET = _handle
+    do_POST = _handle
+
+    def _forum(self, path, query):
+        if path == '/search.json':
+            self._json(self.data.forum_search(query.get('q', ''), int(query.get('page', 1))))
+        elif path in ('/latest.json', '/top.json'):
+            self._json(self.data.forum_listing(path[1:-5], int(query.get('page', 0))))
+        elif re.match(r'/t/\d+\.json$', path):
+            self._json(self.data.topic(int(path[3:-5])))
+        else:
+            self._json(None)
+
+    def _github(self, path, query):
+        reset = str(int(time.time()) + 60)
+        headers = {'X-RateLimit-Limit': '5000', 'X-RateLimit-Remaining': '4999', 'X-RateLimit-Reset': reset}
+        if path == '/search/repositories':
+            result = self.data.github_search(query.get('q', ''), int(query.get('page', 1)), int(query.get('per_page', 30)))
+            if result is None:
+                self._send(422, b'{"message": "Only the first 1000 search results are available"}', headers=headers)
+            else:
+                self._json(result, headers=headers)
+        elif path.startswith('/repos/'):
+            self._json(self.data.github_repo_by_name(path[len('/repos/'):]), headers=headers)
+        else:
+            self._json(None)
+
+    def _youtube(self, path, query):
+        if path.endswith('/search'):
+            self._json(self.data.youtube_search(
+                query.get('q', ''), query.get('regionCode'), int(query.get('maxResults', 5)), query.get('pageToken')
+            ))
+        elif path.endswith('/videos'):
+            ids = [video_id for video_id in query.get('id', '').split(',') if video_id]
+            self._json({'kind': 'youtube#videoListResponse', 'items': [self.data.video(video_id) for video_id in ids]})
+        else:
+            self._json(None)
+
+    def _twitter(self, path, query):
+        if path == '/2/tweets/search/recent':
+            self._json(self.data.tweets(query.get('query', ''), int(query.get('max_results', 10))))
+        else:
+            self._json(None)
+
+    def _trends(self, path, query):
+        if path.rstrip('/').endswith('/explore'):
+            if path.startswith('/trends/api/'):
+                request = json.loads(query.get('req', '{}'))
+                keywords = [item.get('keyword') for item in request.get('comparisonItem', [])]
+                widget = {'id': 'TIMESERIES', 'token': 'replay', 'request': {'keywords': keywords}}
+                self._json({'widgets': [widget]}, prefix=")]}'")
+            else:
+                self._send(200, b'<html></html>', content_type='text/html', headers={'Set-Cookie': 'NID=replay'})
+        elif path.endswith('/widgetdata/multiline'):
+            keywords = json.loads(query.get('req', '{}')).get('keywords', [])
+            self._json(self.data.trends_timeline(keywords), prefix=")]}',")
+        else:
+            self._json(None)
+
+
+class ReplayServer:
+    """
+    Runs one threaded HTTP server per stand-in on 127.0.0.1.
+
+    Args:
+        config (ReplayConfig): What to serve.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.data = ReplayData(config)
+        self.stats = ReplayStats()
+        self._servers = {}
+
+    def start(self):
+        for service in SERVICES:
+            handler = type(f"{service.title()}Handler", (ReplayHandler,),
+                           {'service': service, 'data': self.data, 'stats': self.stats})
+            server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever, name=f"replay-{service}", daemon=True).start()
+            self._servers[service] = server
+        return self
+
+    def stop(self):
+        for server in self._servers.values():
+            server.shutdown()
+            server.server_close()
+
+    def url(self, service):
+        return f"http://127.0.0.1:{self._servers[service].server_address[1]}"
+
+    def env(self):
+        """Environment variables that point the collectors at the stand-ins."""
+        return {
+            'FORUM_API_URL': self.url('forum'),
+            'GITHUB_API_URL': self.url('github'),
+            'YOUTUBE_API_URL': self.url('youtube') + '/',
+            'TWITTER_API_URL': self.url('twitter'),
+            'GOOGLE_TRENDS_URL': self.url('trends') + '/trends',
+            'TRENDS_DELAY_SCALE': '0',
+            'YOUTUBE_API_KEY': 'replay-key',
+            'GITHUB_TOKEN': 'replay-token',
+            'TWITTER_BEARER_TOKEN': 'replay-token',
+        }
+
+
+def _scaled_terms(terms, scale):
+    return [term if copy == 0 else f"{term} {copy}" for copy in range(scale) for term in terms]
+
+
+def _run_pipeline(scale, limits):
+    """
+    Child process of the benchmark: runs run_all_collectors + combine_and_clean_data in a
+    fresh working directory against the stand-ins, then reports its wall time and peak RSS.
+    """
+    import concurrency
+    if limits == 'off':
+        # Measure the pipeline itself, not the politeness pauses.
+        unlimited = {'concurrency': 16, 'rate': 10000.0, 'burst': 10000}
+        concurrency.HOST_LIMITS.update({host: unlimited for host in concurrency.HOST_LIMITS})
+        concurrency.DEFAULT_HOST_LIMIT.update(unlimited)
+    else:
+        for service, host in REAL_HOSTS.items():
+            netloc = urlsplit(os.environ[f"REPLAY_{service.upper()}_NETLOC"]).netloc
+            concurrency.HOST_LIMITS[netloc] = concurrency.HOST_LIMITS.get(host, concurrency.DEFAULT_HOST_LIMIT)
+            for key, limit in list(concurrency.HOST_LIMITS.items()):
+                if key.startswith(host + '/'):
+                    concurrency.HOST_LIMITS[netloc + key[len(host):]] = limit
+
+    import main
+    from store import RecordStore
+    main.FORUM_SEARCH_TERMS = _scaled_terms(main.FORUM_SEARCH_TERMS, scale)
+    main.YOUTUBE_SEARCH_TERMS = _scaled_terms(main.YOUTUBE_SEARCH_TERMS, scale)
+    main.GITHUB_SEARCH_QUERIES = _scaled_terms(main.GITHUB_SEARCH_QUERIES, scale)
+
+    start = time.perf_counter()
+    store = RecordStore()
+    try:
+        main.run_all_collectors(store)
+        main.combine_and_clean_data(store)
+        records = store.count()
+    finally:
+        store.close()
+    wall_s = time.perf_counter() - start
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    peak_rss_mb = peak_rss / 1024 if sys.platform != 'darwin' else peak_rss / 1024 ** 2
+    print(RESULT_PREFIX + json.dumps({'wall_s': wall_s, 'records': records, 'peak_rss_mb': peak_rss_mb}), flush=True)
+
+
+def benchmark(scales, config, limits='off', verbose=False):
+    """
+    Runs the pipeline against the stand-ins once per scale, each in a fresh process and
+    working directory, and prints wall time, requests, bytes and peak RSS.
+    """
+    results = []
+    for scale in scales:
+        run_config = ReplayConfig(**dict(vars(config), scale=scale))
+        server = ReplayServer(run_config).start()
+        try:
+            with tempfile.TemporaryDirectory() as directory:
+                env = dict(os.environ, **server.env(), PYTHONIOENCODING='utf-8')
+                env.update({f"REPLAY_{service.upper()}_NETLOC": server.url(service) for service in SERVICES})
+                env.update({'STORE_PATH': os.path.join(directory, 'workflows.sqlite'),
+                            'HTTP_CACHE_PATH': os.path.join(directory, 'http_cache.sqlite')})
+                env.pop('PIPELINE_EVENTS', None)
+                script = os.path.abspath(__file__)
+                process = subprocess.run(
+                    [sys.executable, script, '_run', '--scale', str(scale), '--limits', limits],
+                    cwd=directory, env=env, capture_output=True, text=True, encoding='utf-8', errors='replace',
+                )
+                if verbose:
+                    print(process.stdout)
+                lines = [line for line in process.stdout.splitlines() if line.startswith(RESULT_PREFIX)]
+                if process.returncode != 0 or not lines:
+                    print(process.stdout[-2000:], process.stderr[-2000:])
+                    raise RuntimeError(f"Pipeline run at scale {scale} failed with exit code {process.returncode}")
+                result = json.loads(lines[-1][len(RESULT_PREFIX):])
+        finally:
+            server.stop()
+        stats = server.stats.snapshot()
+        result.update(scale=scale, requests=sum(stats['requests'].values()), errors=sum(stats['errors'].values()),
+                      bytes=sum(stats['bytes'].values()), by_service=stats)
+        results.append(result)
+        print(f"  {scale:>4}x  {result['wall_s']:7.1f}s  {result['requests']:7,} requests"
+              f" ({result['errors']:,} errors)  {result['bytes'] / 1e6:8.1f} MB  {result['records']:8,} records"
+              f"  peak RSS {result['peak_rss_mb']:7.1f} MB")
+    return results
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=['serve', 'benchmark', '_run'])
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--scale', type=int, default=1)
+    parser.add_argument('--latency-ms', type=float, default=float(os.getenv('REPLAY_LATENCY_MS', '20')))
+    parser.add_argument('--error-rate', type=float, default=float(os.getenv('REPLAY_ERROR_RATE', '0')))
+    parser.add_argument('--forum-pages', type=int, default=6)
+    parser.add_argument('--github-repos', type=int, default=2500)
+    parser.add_argument('--youtube-pages', type=int, default=2)
+    parser.add_argument('--limits', choices=['off', 'real'], default='off',
+                        help="'real' paces each stand-in like the API it replaces; 'off' measures the pipeline alone")
+    parser.add_argument('--verbose', action='store_true', help="print the pipeline's own output")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = _parse_args()
+    if args.command == '_run':
+        _run_pipeline(args.scale, args.limits)
+        sys.exit(0)
+
+    config = ReplayConfig(scale=args.scale, latency_ms=args.latency_ms, error_rate=args.error_rate,
+                          forum_pages=args.forum_pages, github_repos=args.github_repos,
+                          youtube_pages=args.youtube_pages)
+    if args.command == 'serve':
+        server = ReplayServer(config).start()
+        print("Replaying the collector APIs. Run the pipeline with:\n")
+        for name, value in server.env().items():
+            print(f"export {name}={value}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            server.stop()
+    else:
+        print(f"--- Pipeline against replayed APIs: latency {config.latency_ms:.0f} ms,"
+              f" error rate {config.error_rate:.0%}, limits {args.limits} ---")
+        benchmark(args.scales, config, limits=args.limits, verbose=args.verbose)
@@ -0,0 +1,67 @@
+import json
+import math
+import os
+import numpy as np
+
+# How much each metric counts towards a platform's score. Each metric is log-scaled and
+# min-max normalized within its platform first, and a platform's weights are scaled to
+# sum to 1, so every platform's scores run from 0 to 100.
+DEFAULT_WEIGHTS = {
+    'Forum': {'views': 0.6, 'likes': 0.25, 'replies': 0.15},
+    'YouTube': {'views': 0.6, 'likes': 0.2, 'like_to_view_ratio': 0.1, 'comment_to_view_ratio': 0.1},
+    'GitHub': {'stars': 0.7, 'forks': 0.3},
+    'Twitter': {'likes': 0.5, 'retweets': 0.3, 'replies': 0.2},
+    'Google Trends': {'average_search_interest': 1.0},
+}
+# Optional JSON file with weights per platform; platforms it lists replace the defaults.
+WEIGHTS_FILE = os.getenv('SCORE_WEIGHTS_FILE')
+
+
+def load_weights(path=WEIGHTS_FILE):
+    """The default weights, with any platforms from `path` replacing theirs."""
+    weights = {platform: dict(metrics) for platform, metrics in DEFAULT_WEIGHTS.items()}
+    if path:
+        with open(path, 'r', encoding='utf-8') as f:
+            weights.update(json.load(f))
+    return weights
+
+
+def log_value(value):
+    """A metric's log-scaled value; missing, negative or non-numeric values count as 0."""
+    try:
+        return math.log1p(max(0.0, float(value or 0)))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def pack_log_values(metrics, names):
+    """The log-scaled values of `names` from a metrics dict, packed as float64 bytes."""
+    return np.array([log_value(metrics.get(name)) for name in names], dtype='float64').tobytes()
+
+
+def unpack_log_values(packed, width):
+    """A rows x width float64 array from a list of pack_log_values() results."""
+    return np.frombuffer(b''.join(packed), dtype='float64').reshape(len(packed), width)
+
+
+def platform_scores(logged, low, high, weights):
+    """
+    Weighted popularity scores from 0 to 100 for rows of one platform.
+
+    Args:
+        logged (np.ndarray): Rows x metrics array of log-scaled values.
+        low, high (np.ndarray): The platform's min and max of each log-scaled metric.
+        weights (np.ndarray): Weight of each metric; scaled to sum to 1.
+
+    Returns:
+        np.ndarray: One score per row. Metrics whose min equals their max count as 0.
+    """
+    weights = np.asarray(weights, dtype='float64')
+    if not len(weights) or weights.sum() <= 0:
+        return np.zeros(len(logged))
+    low, high = np.asarray(low, dtype='float64'), np.asarray(high, dtype='float64')
+    span = high - low
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scale = np.where(span > 0, 1.0 / span, 0.0)
+    normalized = np.clip((logged - low) * scale, 0.0, 1.0)
+    return normalized @ (weights / weights.sum()) * 100
@@ -0,0 +1,374 @@
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+
+from dedup import canonical_link
+from scoring import load_weights, log_value, pack_log_values, platform_scores, unpack_log_values
+
+STORE_PATH = os.getenv('STORE_PATH', 'workflows.sqlite')
+# Bumped whenever dedup.canonical_link changes, so stored rows are re-keyed once.
+LINK_VERSION = 3
+
+
+class RecordStore:
+    """
+    Persistent store of every collected record, so a refresh only has to fetch what is
+    new or stale instead of re-scraping everything.
+
+    Rows are keyed by (canonical link, country); YouTube emits one record per region a
+    video was found in. Each row keeps `first_seen`, `last_seen` (last time a search
+    returned it), `fetched_at` (last time its metrics were fetched) and its score.
+    Per-source cursors record when each source last collected successfully.
+
+    The log-scaled value of every weighted metric is also kept in an indexed table, so
+    each platform's min and max per metric are index lookups and `rescore()` can tell
+    when only the changed rows need a new score. Each row also keeps the same values
+    packed as float64 bytes (`metric_logs`), flattened once when its metrics change, so
+    `rescore()` scores from arrays instead of parsing every row's metrics.
+
+    Args:
+        path (str): SQLite database file.
+        weights (dict): Scoring weights per platform; scoring.load_weights() if omitted.
+    """
+
+    def __init__(self, path=STORE_PATH, weights=None):
+        self.weights = weights or load_weights()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS records ("
+            " link TEXT NOT NULL, country TEXT NOT NULL, platform TEXT NOT NULL, workflow TEXT,"
+            " metrics TEXT, metadata TEXT, first_seen REAL, last_seen REAL, fetched_at REAL,"
+            " score REAL DEFAULT 0, dirty INTEGER DEFAULT 1, metric_logs BLOB,"
+            " PRIMARY KEY (link, country));"
+            "CREATE INDEX IF NOT EXISTS records_fetched ON records (platform, fetched_at);"
+            "CREATE INDEX IF NOT EXISTS records_dirty ON records (platform, dirty);"
+            "CREATE TABLE IF NOT EXISTS metric_values ("
+            " link TEXT NOT NULL, country TEXT NOT NULL, platform TEXT NOT NULL, metric TEXT NOT NULL, value REAL,"
+            " PRIMARY KEY (link, country, metric));"
+            "CREATE INDEX IF NOT EXISTS metric_values_range ON metric_values (platform, metric, value);"
+            "CREATE TABLE IF NOT EXISTS metric_bounds ("
+            " platform TEXT NOT NULL, metric TEXT NOT NULL, min_value REAL, max_value REAL,"
+            " PRIMARY KEY (platform, metric));"
+            "CREATE TABLE IF NOT EXISTS score_weights (platform TEXT PRIMARY KEY, weights TEXT);"
+            "CREATE TABLE IF NOT EXISTS cursors (source TEXT PRIMARY KEY, value TEXT, updated_at REAL);"
+            "CREATE TABLE IF NOT EXISTS store_meta (key TEXT PRIMARY KEY, value TEXT);"
+        )
+        self._migrate_links()
+        self._add_metric_logs()
+        self._db.commit()
+
+    def _migrate_links(self):
+        """
+        Re-keys rows stored under an older form of canonical_link. When two old links now
+        canonicalize to the same one, the most recently fetched row is kept.
+        """
+        row = self._db.execute("SELECT value FROM store_meta WHERE key = 'link_version'").fetchone()
+        if row and int(row[0]) >= LINK_VERSION:
+            return
+        rows = self._db.execute("SELECT link, country FROM records ORDER BY fetched_at DESC").fetchall()
+        for link, country in rows:
+            new_link = canonical_link(link)
+            if new_link == link:
+                continue
+            taken = self._db.execute(
+                "SELECT 1 FROM records WHERE link = ? AND country = ?", (new_link, country)
+            ).fetchone()
+            if taken:
+                self._db.execute("DELETE FROM records WHERE link = ? AND country = ?", (link, country))
+                self._db.execute("DELETE FROM metric_values WHERE link = ? AND country = ?", (link, country))
+            else:
+                self._db.execute("UPDATE records SET link = ? WHERE link = ? AND country = ?", (new_link, link, country))
+                self._db.execute(
+                    "UPDATE metric_values SET link = ? WHERE link = ? AND country = ?", (new_link, link, country)
+                )
+        self._db.execute(
+            "INSERT OR REPLACE INTO store_meta (key, value) VALUES ('link_version', ?)", (str(LINK_VERSION),)
+        )
+
+    def _add_metric_logs(self):
+        """Adds `metric_logs` to a store created without it. Marking every platform's stored
+        weights as outdated makes the next rescore() fill it in for all rows."""
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(records)")]
+        if 'metric_logs' not in columns:
+            self._db.execute("ALTER TABLE records ADD COLUMN metric_logs BLOB")
+            self._db.execute(
+                "INSERT OR REPLACE INTO score_weights (platform, weights) SELECT DISTINCT platform, '' FROM records"
+            )
+
+    def close(self):
+        self._db.close()
+
+    def count(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+
+    def upsert(self, records, fetched_at=None, seen=True):
+        """
+        Inserts or updates records. Rows whose metrics changed are marked dirty for the
+        next `rescore()`.
+
+        Args:
+            records (list): Collector records.
+            fetched_at (float): When their metrics were fetched; now if omitted.
+            seen (bool): Whether a search returned them, which bumps `last_seen`.
+
+        Returns:
+            int: Rows inserted or changed.
+        """
+        now = fetched_at or time.time()
+        changed = 0
+        with self._lock:
+            for platform in {record['platform'] for record in records}:
+                # Values written now follow the current weights; if different weights are
+                # stored for this platform, rescore() re-derives the platform anyway.
+                self._db.execute(
+                    "INSERT OR IGNORE INTO score_weights (platform, weights) VALUES (?, ?)",
+                    (platform, self._weights_key(platform)),
+                )
+            for record in records:
+                key = (canonical_link(record['link']), record.get('country') or 'Global')
+                row = self._db.execute(
+                    "SELECT metrics FROM records WHERE link = ? AND country = ?", key
+                ).fetchone()
+                metrics = json.dumps(record.get('popularity_metrics', {}), ensure_ascii=False, sort_keys=True)
+                metadata = json.dumps(record.get('metadata') or {}, ensure_ascii=False)
+                changed_metrics = row is None or row[0] != metrics
+                packed = None
+                if changed_metrics:
+                    packed = self._write_metric_values(key, record['platform'], record.get('popularity_metrics', {}))
+                    changed += 1
+                if row is None:
+                    self._db.execute(
+                        "INSERT INTO records (link, country, platform, workflow, metrics, metadata,"
+                        " first_seen, last_seen, fetched_at, dirty, metric_logs)"
+                        " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 1, ?)",
+                        key + (record['platform'], record.get('workflow'), metrics, metadata, now, now, now, packed),
+                    )
+                else:
+                    self._db.execute(
+                        "UPDATE records SET workflow = ?, metrics = ?, metadata = ?, fetched_at = ?,"
+                        " last_seen = CASE WHEN ? THEN ? ELSE last_seen END,"
+                        " metric_logs = COALESCE(?, metric_logs),"
+                        " dirty = dirty OR ? WHERE link = ? AND country = ?",
+                        (record.get('workflow'), metrics, metadata, now, seen, now, packed, changed_metrics) + key,
+                    )
+            self._db.commit()
+        return changed
+
+    def _metric_names(self, platform):
+        """The platform's weighted metrics, in the order they are packed in `metric_logs`."""
+        return sorted(self.weights.get(platform, {}))
+
+    def _weights_key(self, platform):
+        return json.dumps(self.weights.get(platform, {}), sort_keys=True)
+
+    def _write_metric_values(self, key, platform, metrics):
+        """Writes a row's log-scaled metric values; returns them packed, for `metric_logs`."""
+        names = self._metric_names(platform)
+        self._db.execute("DELETE FROM metric_values WHERE link = ? AND country = ?", key)
+        self._db.executemany(
+            "INSERT INTO metric_values (link, country, platform, metric, value) VALUES (?, ?, ?, ?, ?)",
+            [key + (platform, metric, log_value(metrics.get(metric))) for metric in names],
+        )
+        return pack_log_values(metrics, names)
+
+    def stale_records(self, platform, max_age_s, limit=None):
+        """The records of a platform whose metrics are older than `max_age_s`, oldest first."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT link, country, platform, workflow, metrics, metadata FROM records"
+                " WHERE platform = ? AND fetched_at < ? ORDER BY fetched_at LIMIT ?",
+                (platform, time.time() - max_age_s, -1 if limit is None else limit),
+            ).fetchall()
+        return [self._to_record(row) for row in rows]
+
+    def get_cursor(self, source):
+        with self._lock:
+            row = self._db.execute("SELECT value FROM cursors WHERE source = ?", (source,)).fetchone()
+        return row[0] if row else None
+
+    def set_cursor(self, source, value):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO cursors (source, value, updated_at) VALUES (?, ?, ?)",
+                (source, value, time.time()),
+            )
+            self._db.commit()
+
+    def _sync_weights(self, platforms):
+        """
+        Re-derives the metric values of platforms whose weights changed since the last
+        rescore. Returns those platforms; all of their rows need a new score.
+        """
+        stored = dict(self._db.execute("SELECT platform, weights FROM score_weights"))
+        changed = []
+        for platform in platforms:
+            weights = self._weights_key(platform)
+            if stored.get(platform) == weights:
+                continue
+            rows = self._db.execute(
+                "SELECT link, country, metrics FROM records WHERE platform = ?", (platform,)
+            ).fetchall()
+            for link, country, metrics in rows:
+                packed = self._write_metric_values((link, country), platform, json.loads(metrics or '{}'))
+                self._db.execute(
+                    "UPDATE records SET metric_logs = ? WHERE link = ? AND country = ?", (packed, link, country)
+                )
+            self._db.execute(
+                "INSERT OR REPLACE INTO score_weights (platform, weights) VALUES (?, ?)", (platform, weights)
+            )
+            changed.append(platform)
+        return changed
+
+    def _current_bounds(self, platform):
+        """Min and max of each weighted metric of a platform, two index lookups per metric."""
+        bounds = {}
+        for metric in self.weights.get(platform, {}):
+            # Separate MIN and MAX queries, so SQLite answers each from the index.
+            low = self._db.execute(
+                "SELECT MIN(value) FROM metric_values WHERE platform = ? AND metric = ?", (platform, metric)
+            ).fetchone()[0]
+            high = self._db.execute(
+                "SELECT MAX(value) FROM metric_values WHERE platform = ? AND metric = ?", (platform, metric)
+            ).fetchone()[0]
+            bounds[metric] = (low or 0.0, high or 0.0)
+        return bounds
+
+    def rescore(self):
+        """
+        Brings scores up to date with the weighted, log min-max scaled scoring of
+        scoring.py.
+
+        Only dirty rows are rescored, unless a platform's min or max of some metric (or its
+        weights) changed, which shifts the scale for every row of that platform. Rows are
+        scored from their packed `metric_logs`, so no row's metrics are parsed.
+
+        Returns:
+            int: Rows rescored.
+        """
+        rescored = 0
+        with self._lock:
+            platforms = [row[0] for row in self._db.execute("SELECT DISTINCT platform FROM records")]
+            full = set(self._sync_weights(platforms))
+
+            stored_bounds = {}
+            for platform, metric, low, high in self._db.execute("SELECT * FROM metric_bounds"):
+                stored_bounds.setdefault(platform, {})[metric] = (low, high)
+            bounds = {platform: self._current_bounds(platform) for platform in platforms}
+            full.update(platform for platform in platforms if bounds[platform] != stored_bounds.get(platform, {}))
+
+            for platform in platforms:
+                only_dirty = "" if platform in full else " AND dirty = 1"
+                rows = self._db.execute(
+                    "SELECT rowid, metric_logs FROM records WHERE platform = ?" + only_dirty, (platform,)
+                ).fetchall()
+                if not rows:
+                    continue
+                weights = self.weights.get(platform, {})
+                names = self._metric_names(platform)
+                logged = unpack_log_values([row[1] for row in rows], len(names))
+                scores = platform_scores(
+                    logged,
+                    [bounds[platform][name][0] for name in names],
+                    [bounds[platform][name][1] for name in names],
+                    [weights[name] for name in names],
+                )
+                self._db.executemany(
+                    "UPDATE records SET score = ?, dirty = 0 WHERE rowid = ?",
+                    zip(scores.tolist(), [row[0] for row in rows]),
+                )
+                rescored += len(rows)
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO metric_bounds (platform, metric, min_value, max_value) VALUES (?, ?, ?, ?)",
+                    [(platform, metric, b[0], b[1]) for metric, b in bounds[platform].items()],
+                )
+            self._db.commit()
+        return rescored
+
+    def score_record(self, record):
+        """
+        Scores a record from its metrics on its platform's scale as of the last rescore(),
+        e.g. one whose metrics were merged from its duplicates.
+
+        Returns:
+            float: The score, 0 to 100.
+        """
+        platform = record.get('platform')
+        names = self._metric_names(platform)
+        with self._lock:
+            bounds = {
+                metric: (low, high) for metric, low, high in self._db.execute(
+                    "SELECT metric, min_value, max_value FROM metric_bounds WHERE platform = ?", (platform,)
+                )
+            }
+        logged = unpack_log_values([pack_log_values(record.get('popularity_metrics') or {}, names)], len(names))
+        weights = self.weights.get(platform, {})
+        scores = platform_scores(
+            logged,
+            [bounds.get(name, (0.0, 0.0))[0] for name in names],
+            [bounds.get(name, (0.0, 0.0))[1] for name in names],
+            [weights[name] for name in names],
+        )
+        return float(scores[0])
+
+    def ranked_records(self):
+        """Every record with its score, best first, in the final dataset's format."""
+        return [record for chunk in self.iter_ranked_records() for record in chunk]
+
+    def iter_ranked_records(self, chunk_size=5000):
+        """Every record with its score, best first, as lists of at most `chunk_size` records."""
+        with self._lock:
+            cursor = self._db.execute(
+                "SELECT link, country, platform, workflow, metrics, metadata, score FROM records"
+                " ORDER BY score DESC, link, country"
+            )
+        while True:
+            with self._lock:
+                rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                return
+            yield [self._scored_record(row) for row in rows]
+
+    def ranked_titles(self):
+        """(link, platform, workflow) of every distinct link, best score first, for dedup.duplicate_links."""
+        with self._lock:
+            return self._db.execute(
+                "SELECT link, platform, workflow FROM records GROUP BY link ORDER BY MAX(score) DESC, link"
+            ).fetchall()
+
+    def records_for_links(self, links):
+        """The scored records (every country) of some links, in the final dataset's format."""
+        links = list(links)
+        records = []
+        with self._lock:
+            for start in range(0, len(links), 500):
+                batch = links[start:start + 500]
+                rows = self._db.execute(
+                    "SELECT link, country, platform, workflow, metrics, metadata, score FROM records"
+                    f" WHERE link IN ({','.join('?' * len(batch))}) ORDER BY score DESC",
+                    batch,
+                ).fetchall()
+                records.extend(self._scored_record(row) for row in rows)
+        return records
+
+    @classmethod
+    def _scored_record(cls, row):
+        record = cls._to_record(row[:6])
+        record['score'] = row[6]
+        return record
+
+    @staticmethod
+    def _to_record(row):
+        link, country, platform, workflow, metrics, metadata = row
+        return {
+            "workflow": workflow,
+            "platform": platform,
+            "link": link,
+            "popularity_metrics": json.loads(metrics or '{}'),
+            "country": country,
+            "metadata": json.loads(metadata or '{}')
+        }
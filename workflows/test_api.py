@@ -0,0 +1,91 @@
+import gzip
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import api
+from api import DatasetCache, negotiate_encoding
+from dataset_files import DatasetWriter, dataset_path
+
+
+def record(n, platform):
+    return {'workflow': f"workflow {n}", 'platform': platform, 'link': f"https://example.com/{n}",
+            'country': 'N/A', 'score': 100 - n, 'popularity_metrics': {'views': n}, 'metadata': {}}
+
+
+RECORDS = [record(n, 'GitHub' if n % 2 else 'Forum') for n in range(10)]
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    with DatasetWriter(str(tmp_path)) as writer:
+        writer.write(RECORDS)
+    monkeypatch.setattr(api, 'dataset_cache', DatasetCache(dataset_path(str(tmp_path))))
+    return TestClient(api.app)
+
+
+@pytest.mark.parametrize('accept, expected', [
+    ('', 'identity'),
+    ('gzip, deflate', 'gzip'),
+    ('gzip;q=0.5, br', 'br'),
+    ('br;q=0, gzip;q=0.1', 'gzip'),
+    ('*', 'br'),
+    ('*;q=0', 'identity'),
+    ('identity;q=1, gzip;q=0.5', 'identity'),
+])
+def test_negotiate_encoding(accept, expected):
+    assert negotiate_encoding(accept, {'identity': b'', 'gzip': b'', 'br': b''}) == expected
+
+
+def test_full_dataset_is_revalidated_with_its_etag(client):
+    first = client.get('/workflows', headers={'Accept-Encoding': 'identity'})
+    assert first.status_code == 200
+    assert [item['workflow'] for item in first.json()] == [r['workflow'] for r in RECORDS]
+    etag = first.headers['ETag']
+
+    again = client.get('/workflows', headers={'Accept-Encoding': 'identity', 'If-None-Match': etag})
+    assert again.status_code == 304
+    assert again.content == b''
+    assert again.headers['ETag'] == etag
+
+    weak = client.get('/workflows', headers={'Accept-Encoding': 'identity', 'If-None-Match': f"W/{etag}, \"x\""})
+    assert weak.status_code == 304
+
+
+def test_each_encoding_has_its_own_etag(client):
+    plain = client.get('/workflows', headers={'Accept-Encoding': 'identity'})
+    zipped = client.get('/workflows', headers={'Accept-Encoding': 'gzip'})
+    assert zipped.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in zipped.headers['Vary']
+    assert zipped.headers['ETag'] != plain.headers['ETag']
+    assert zipped.json() == plain.json()
+
+    # The identity ETag doesn't validate the gzip body.
+    stale = client.get('/workflows', headers={'Accept-Encoding': 'gzip', 'If-None-Match': plain.headers['ETag']})
+    assert stale.status_code == 200
+
+
+def test_pages_and_cursor_errors(client):
+    page = client.get('/workflows', params={'platform': 'github', 'limit': 2}).json()
+    assert [item['workflow'] for item in page['items']] == ['workflow 1', 'workflow 3']
+    assert page['total'] == 5
+
+    following = client.get('/workflows', params={'platform': 'github', 'limit': 2, 'cursor': page['next_cursor']})
+    assert [item['workflow'] for item in following.json()['items']] == ['workflow 5', 'workflow 7']
+    assert client.get('/workflows', params={'platform': 'forum', 'cursor': page['next_cursor']}).status_code == 400
+    assert client.get('/workflows', params={'sort': 'nope'}).status_code == 400
+
+
+def test_stream_is_gzipped_when_accepted(client):
+    response = client.get('/workflows/stream', params={'limit': 3}, headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.headers['X-Total-Count'] == '10'
+    lines = response.content.splitlines()
+    assert [json.loads(line)['workflow'] for line in lines] == ['workflow 0', 'workflow 1', 'workflow 2']
+    assert 'X-Next-Cursor' in response.headers
+
+
+def test_gzip_bodies_decompress_to_the_identity_body(client):
+    dataset = api.dataset_cache.get()
+    assert gzip.decompress(dataset.bodies['gzip']) == dataset.bodies['identity']
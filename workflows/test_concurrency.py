@@ -0,0 +1,47 @@
+from concurrency import CollectorTask, HostLimiters, PartialResults, run_collector_tasks
+
+LIMITS = {
+    'api.github.com/search': {'concurrency': 2, 'rate': 0.5, 'burst': 4},
+    'api.github.com': {'concurrency': 4, 'rate': 1.3, 'burst': 50},
+}
+
+
+def test_for_url_gives_a_limited_path_segment_its_own_limiter():
+    limiters = HostLimiters(LIMITS)
+    search = limiters.for_url('https://api.github.com/search/repositories?q=n8n')
+    core = limiters.for_url('https://api.github.com/repos/n8n-io/n8n')
+    assert search is not core
+    assert search is limiters.for_host('api.github.com/search')
+    assert core is limiters.for_host('api.github.com')
+    assert limiters.for_url('https://api.github.com') is core
+
+
+def test_for_url_falls_back_to_the_host_and_the_default_limit():
+    limiters = HostLimiters(LIMITS, default={'concurrency': 1, 'rate': 1.0, 'burst': 1})
+    assert limiters.for_url('http://127.0.0.1:8080/search/x') is limiters.for_host('127.0.0.1:8080')
+    assert set(limiters.stats()) == {'127.0.0.1:8080'}
+
+
+def test_run_collector_tasks_keeps_partial_records_and_reports_failures():
+    def found(*records):
+        return list(records)
+
+    def partly(*records):
+        raise PartialResults("one search failed", list(records))
+
+    def broken():
+        raise RuntimeError("down")
+
+    tasks = [
+        CollectorTask('forum', None, found, ('a', 'b'), {}),
+        CollectorTask('forum', None, broken, (), {}),
+        CollectorTask('github', None, partly, ('c',), {}),
+    ]
+    finished = {}
+    results = run_collector_tasks(
+        tasks, on_result=lambda task, records, error, duration_s: finished.setdefault(task.fn.__name__, error)
+    )
+    assert results == {'forum': ['a', 'b'], 'github': ['c']}
+    assert finished['found'] is None
+    assert isinstance(finished['broken'], RuntimeError)
+    assert isinstance(finished['partly'], PartialResults)
@@ -0,0 +1,64 @@
+import pytest
+
+from dedup import canonical_link, deduplicate, merge_duplicates
+
+TITLE = "Sync Google Sheets rows to a Postgres database every hour"
+
+
+def record(link, platform, score, country='N/A', title=TITLE, **metrics):
+    return {'workflow': title, 'platform': platform, 'link': link, 'country': country, 'score': score,
+            'popularity_metrics': metrics, 'metadata': {}}
+
+
+@pytest.mark.parametrize('link, expected', [
+    ("https://community.n8n.io/t/some-slug/123", "https://community.n8n.io/t/123"),
+    ("https://community.n8n.io/t/some-slug/123/4", "https://community.n8n.io/t/123"),
+    ("https://community.n8n.io/t/123", "https://community.n8n.io/t/123"),
+    ("https://community.n8n.io/t/2024/1234", "https://community.n8n.io/t/1234"),
+    ("https://community.n8n.io/t/2024/1234/7/", "https://community.n8n.io/t/1234"),
+    ("https://youtu.be/abc?si=share", "https://www.youtube.com/watch?v=abc"),
+    ("https://www.youtube.com/shorts/abc", "https://www.youtube.com/watch?v=abc"),
+    ("https://GitHub.com/N8N-io/n8n.git/tree/master", "https://github.com/n8n-io/n8n"),
+    ("https://x.com/someone/status/42?s=20", "https://twitter.com/i/web/status/42"),
+    ("HTTPS://Example.com:443/a/?utm_source=x&b=2&a=1#top", "https://example.com/a?a=1&b=2"),
+])
+def test_canonical_link(link, expected):
+    assert canonical_link(link) == expected
+
+
+def test_merge_duplicates_only_takes_metrics_from_the_same_platform():
+    kept = record("https://github.com/a/b", 'GitHub', 80, stars=10, forks=2)
+    merged = merge_duplicates(kept, [
+        record("https://www.youtube.com/watch?v=x", 'YouTube', 90, views=5000, likes=300),
+        record("https://github.com/c/d", 'GitHub', 40, stars=50, forks=1),
+    ])
+    assert merged['popularity_metrics'] == {'stars': 50, 'forks': 2}
+    assert [other['platform'] for other in merged['metadata']['duplicates']] == ['YouTube', 'GitHub']
+
+
+def test_merge_duplicates_rescores_only_when_metrics_changed():
+    def score(record):
+        return record['popularity_metrics']['stars'] / 10
+
+    kept = merge_duplicates(record("https://github.com/a/b", 'GitHub', 80, stars=10), [
+        record("https://forum/x", 'Forum', 90, views=5000),
+    ], score=score)
+    assert kept['score'] == 80
+    kept = merge_duplicates(kept, [record("https://github.com/c/d", 'GitHub', 40, stars=500)], score=score)
+    assert kept['score'] == 50
+
+
+def test_deduplicate_merges_exact_and_near_duplicates():
+    records = [
+        record("https://github.com/a/b", 'GitHub', 90, stars=10),
+        record("https://community.n8n.io/t/sync-sheets/7", 'Forum', 60, title=TITLE + "!", views=900),
+        record("https://github.com/A/B/issues", 'GitHub', 50, stars=30),
+        record("https://community.n8n.io/t/other/8", 'Forum', 70, title="Something else entirely, nothing alike",
+               views=5),
+    ]
+    merged = deduplicate(records, score=lambda record: record['popularity_metrics']['stars'])
+    assert [r['link'] for r in merged] == ["https://community.n8n.io/t/8", "https://github.com/a/b"]
+    github = merged[1]
+    assert github['popularity_metrics'] == {'stars': 30}
+    assert github['score'] == 30
+    assert [other['link'] for other in github['metadata']['duplicates']] == ["https://community.n8n.io/t/7"]
@@ -0,0 +1,31 @@
+import pytest
+
+import forum
+
+
+def topic_record(topic_id):
+    return {'workflow': f"topic {topic_id}", 'platform': 'Forum',
+            'link': f"https://community.n8n.io/t/some-slug/{topic_id}",
+            'popularity_metrics': {'views': 1, 'replies': 0, 'likes': 0}, 'country': 'Global', 'metadata': {}}
+
+
+@pytest.fixture
+def topic_pages(monkeypatch):
+    """Topic 2's page can't be fetched; every other topic has 99 views."""
+    def fetch_topic(topic_id):
+        if topic_id == 2:
+            return None
+        return {'views': 99, 'reply_count': 4, 'like_count': 5, 'posts_count': 6, 'tags': ['sheets']}
+    monkeypatch.setattr(forum, '_fetch_topic', fetch_topic)
+
+
+def test_enrich_forum_data_keeps_topics_it_could_not_fetch(topic_pages):
+    records = forum.enrich_forum_data([topic_record(1), topic_record(2), topic_record(1)])
+    assert [record['popularity_metrics']['views'] for record in records] == [99, 1]
+    assert records[0]['popularity_metrics']['posts'] == 6
+    assert records[0]['metadata']['tags'] == ['sheets']
+
+
+def test_refresh_forum_records_leaves_out_topics_it_could_not_fetch(topic_pages):
+    records = forum.refresh_forum_records([topic_record(1), topic_record(2), topic_record(3)])
+    assert [forum.topic_id(record) for record in records] == [1, 3]
@@ -0,0 +1,88 @@
+import pytest
+import requests
+
+import http_client
+from concurrency import HostLimiters
+from http_client import HttpClient
+
+URL = 'https://api.example.test/items'
+
+
+def response(status, body=b'{}', **headers):
+    result = requests.Response()
+    result.status_code = status
+    result._content = body
+    result.headers.update(headers)
+    result.url = URL
+    return result
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Records the delays the client sleeps for, without sleeping."""
+    delays = []
+    monkeypatch.setattr(http_client.time, 'sleep', delays.append)
+    return delays
+
+
+def client_answering(responses, tmp_path=None):
+    client = HttpClient(
+        limiters=HostLimiters({}, default={'concurrency': 4, 'rate': 1000.0, 'burst': 1000}),
+        cache_path=str(tmp_path / 'cache.sqlite') if tmp_path else None,
+    )
+    sent = []
+
+    def get(url, params=None, headers=None, timeout=None):
+        sent.append(dict(headers or {}))
+        answer = responses.pop(0)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+    client.session.get = get
+    return client, sent
+
+
+def test_retries_server_errors_and_honours_retry_after(sleeps):
+    client, sent = client_answering([response(503, **{'Retry-After': '7'}), response(500), response(200)])
+    assert client.get(URL).status_code == 200
+    assert len(sent) == 3
+    assert sleeps[0] == 7
+    assert 0 < sleeps[1] <= client.backoff_base * 2
+    assert client.limiters.for_url(URL).stats()['retries'] == 2
+
+
+@pytest.mark.parametrize('headers', [{'Retry-After': '3'}, {'X-RateLimit-Remaining': '0'}])
+def test_retries_a_rate_limiting_403(sleeps, headers):
+    client, sent = client_answering([response(403, **headers), response(200)])
+    assert client.get(URL).status_code == 200
+    assert len(sent) == 2
+
+
+def test_returns_a_plain_403_without_retrying(sleeps):
+    client, sent = client_answering([response(403)])
+    assert client.get(URL).status_code == 403
+    assert len(sent) == 1 and not sleeps
+
+
+def test_gives_up_after_max_retries(sleeps):
+    client, sent = client_answering([response(429, **{'Retry-After': '1'})] * 5)
+    assert client.get(URL).status_code == 429
+    assert len(sent) == client.max_retries + 1
+
+
+def test_retries_connection_errors_then_raises(sleeps):
+    client, sent = client_answering([requests.exceptions.ConnectionError('reset')] * 5)
+    with pytest.raises(requests.exceptions.ConnectionError):
+        client.get(URL)
+    assert len(sent) == client.max_retries + 1
+
+
+def test_revalidates_with_the_etag_and_answers_304_from_the_cache(sleeps, tmp_path):
+    client, sent = client_answering([response(200, b'[1]', ETag='"v1"'), response(304)], tmp_path)
+    first = client.get(URL)
+    second = client.get(URL)
+    assert sent[1]['If-None-Match'] == '"v1"'
+    assert (second.status_code, second.content, second.from_cache) == (200, b'[1]', True)
+    assert not first.from_cache
+    assert client.limiters.for_url(URL).stats()['cache_hits'] == 1
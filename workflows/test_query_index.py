@@ -0,0 +1,85 @@
+import json
+
+import pytest
+
+from dataset_files import columns_from_records
+from query_index import QueryIndex
+
+
+def record(name, platform, score, stars=0):
+    return {'workflow': name, 'platform': platform, 'link': f"https://example.com/{name}", 'country': 'N/A',
+            'score': score, 'popularity_metrics': {'stars': stars}}
+
+
+# Ranked by score, as the dataset file is.
+RECORDS = [record(f"w{i}", 'GitHub' if i % 2 else 'Forum', 100 - i * 5, stars=i) for i in range(20)]
+
+
+@pytest.fixture
+def index():
+    return QueryIndex(columns_from_records(RECORDS), 'v1')
+
+
+def names(body):
+    return [item['workflow'] for item in json.loads(body)['items']]
+
+
+def streamed(index, **params):
+    total, next_cursor, chunks = index.stream(**params)
+    lines = b''.join(chunks).splitlines()
+    return [json.loads(line)['workflow'] for line in lines], next_cursor
+
+
+def test_paging_with_cursors_visits_every_match_once(index):
+    seen, cursor = [], None
+    while True:
+        page = json.loads(index.page(platform='github', cursor=cursor, limit=3))
+        seen += [item['workflow'] for item in page['items']]
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+    assert seen == [r['workflow'] for r in RECORDS if r['platform'] == 'GitHub']
+    assert page['total'] == 10
+
+
+def test_stream_pages_like_page(index):
+    first, cursor = streamed(index, sort='stars', limit=4)
+    rest, last_cursor = streamed(index, sort='stars', cursor=cursor)
+    assert first + rest == [f"w{i}" for i in range(19, -1, -1)]
+    assert last_cursor is None
+
+
+def test_stream_limit_of_zero_still_moves_forward(index):
+    first, cursor = streamed(index, limit=0)
+    second, _ = streamed(index, limit=0, cursor=cursor)
+    assert first == ['w0'] and second == ['w1']
+
+
+def test_min_score_with_another_sort(index):
+    seen, cursor = [], None
+    while True:
+        page = json.loads(index.page(sort='stars', min_score=60, cursor=cursor, limit=2))
+        seen += [item['workflow'] for item in page['items']]
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+    assert seen == [f"w{i}" for i in range(8, -1, -1)]
+    assert page['total'] == 9
+
+
+def test_cursor_from_another_dataset_version_is_rejected(index):
+    cursor = json.loads(index.page(limit=5))['next_cursor']
+    refreshed = QueryIndex(columns_from_records(RECORDS), 'v2')
+    with pytest.raises(ValueError):
+        refreshed.page(cursor=cursor)
+    with pytest.raises(ValueError):
+        index.page(cursor='not a cursor')
+
+
+def test_cursor_is_rejected_with_different_parameters(index):
+    cursor = json.loads(index.page(platform='github', min_score=50, limit=2))['next_cursor']
+    assert names(index.page(platform='GitHub', min_score=50, cursor=cursor, limit=2)) == ['w5', 'w7']
+    for params in ({'platform': 'forum', 'min_score': 50}, {'platform': 'github'},
+                   {'platform': 'github', 'min_score': 50, 'sort': 'stars'}):
+        with pytest.raises(ValueError):
+            index.page(cursor=cursor, **params)
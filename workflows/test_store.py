@@ -0,0 +1,102 @@
+import pytest
+
+from store import RecordStore
+
+WEIGHTS = {'GitHub': {'stars': 0.7, 'forks': 0.3}, 'Forum': {'views': 1.0}}
+
+
+def repo(name, stars, forks=0):
+    return {'workflow': name, 'platform': 'GitHub', 'link': f"https://github.com/n8n/{name}",
+            'popularity_metrics': {'stars': stars, 'forks': forks}, 'country': 'N/A', 'metadata': {}}
+
+
+def topic(topic_id, views):
+    return {'workflow': f"topic {topic_id}", 'platform': 'Forum', 'link': f"https://community.n8n.io/t/{topic_id}",
+            'popularity_metrics': {'views': views}, 'country': 'N/A', 'metadata': {}}
+
+
+def scores(store):
+    return {record['workflow']: record['score'] for record in store.ranked_records()}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = RecordStore(str(tmp_path / 'store.sqlite'), weights=WEIGHTS)
+    yield store
+    store.close()
+
+
+def test_rescore_scales_each_platform_from_0_to_100(store):
+    store.upsert([repo('a', 1000, 100), repo('b', 10, 1), repo('c', 0), topic(1, 50), topic(2, 5000)])
+    assert store.rescore() == 5
+    result = scores(store)
+    assert result['a'] == pytest.approx(100)
+    assert result['c'] == pytest.approx(0)
+    assert 0 < result['b'] < 100
+    assert result['topic 2'] == pytest.approx(100)
+    assert result['topic 1'] == pytest.approx(0)
+
+
+def test_rescore_only_rescores_changed_rows_while_bounds_hold(store):
+    store.upsert([repo('a', 1000, 100), repo('b', 10, 1), repo('c', 0)])
+    store.rescore()
+    before = scores(store)
+
+    store.upsert([repo('b', 20, 1)])
+    assert store.rescore() == 1
+    after = scores(store)
+    assert after['b'] > before['b']
+    assert after['a'] == before['a'] and after['c'] == before['c']
+    assert store.rescore() == 0
+
+
+def test_rescore_rescores_the_whole_platform_when_its_bounds_move(store):
+    store.upsert([repo('a', 1000, 100), repo('b', 10, 1), repo('c', 0), topic(1, 50), topic(2, 5000)])
+    store.rescore()
+    before = scores(store)
+
+    store.upsert([repo('d', 100000, 1000)])
+    assert store.rescore() == 4
+    after = scores(store)
+    assert after['d'] == pytest.approx(100)
+    assert after['a'] < before['a']
+    assert after['topic 2'] == before['topic 2']
+
+
+def test_incremental_scores_match_a_full_rescore(store, tmp_path):
+    records = [repo(f"r{i}", i * 7, i % 5) for i in range(50)]
+    store.upsert(records)
+    store.rescore()
+    changed = [repo(f"r{i}", i * 3 + 1, 2) for i in range(10, 20)]
+    store.upsert(changed)
+    store.rescore()
+
+    fresh = RecordStore(str(tmp_path / 'fresh.sqlite'), weights=WEIGHTS)
+    fresh.upsert(records)
+    fresh.upsert(changed)
+    fresh.rescore()
+    assert scores(store) == pytest.approx(scores(fresh))
+    fresh.close()
+
+
+def test_changed_weights_rescore_the_platform_with_the_new_metrics(tmp_path):
+    path = str(tmp_path / 'store.sqlite')
+    store = RecordStore(path, weights=WEIGHTS)
+    store.upsert([repo('many-stars', 1000, 0), repo('many-forks', 10, 500)])
+    store.rescore()
+    assert scores(store)['many-stars'] > scores(store)['many-forks']
+    store.close()
+
+    store = RecordStore(path, weights={'GitHub': {'forks': 1.0}})
+    assert store.rescore() == 2
+    assert scores(store)['many-forks'] == pytest.approx(100)
+    assert scores(store)['many-stars'] == pytest.approx(0)
+    store.close()
+
+
+def test_score_record_matches_rescore(store):
+    store.upsert([repo('a', 1000, 100), repo('b', 10, 1), repo('c', 0)])
+    store.rescore()
+    for record in store.ranked_records():
+        assert store.score_record(record) == pytest.approx(record['score'])
+    assert store.score_record(repo('merged', 1000, 100)) == pytest.approx(100)
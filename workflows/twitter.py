@@ -2,9 +2,11 @@ import os
 import json
 import requests
 import pandas as pd
+from http_client import get_client
 
 # --- IMPORTANT: FILL THIS IN AS AN ENVIRONMENT VARIABLE ---
 # You get this from your Twitter/X Developer Portal
+TWITTER_API_URL = os.getenv('TWITTER_API_URL', 'https://api.twitter.com').rstrip('/')
 BEARER_TOKEN = os.getenv('TWITTER_BEARER_TOKEN', 'AAAAAAAAAAAAAAAAAAAAAPX03wEAAAAAc7AjrNTKGH%2FGkPD3P72Apj9zpOk%3DmEpYFGhT2LTD5RSq8Acp6UEwTQvjlMPlZa7GTGc8oRytRM7kIj')
 
 def fetch_twitter_data(search_queries, limit=50):
@@ -18,7 +20,7 @@ def fetch_twitter_data(search_queries, limit=50):
         return []
 
     headers = {"Authorization": f"Bearer {BEARER_TOKEN}"}
-    search_url = "https://api.twitter.com/2/tweets/search/recent"
+    search_url = f"{TWITTER_API_URL}/2/tweets/search/recent"
     
     collected_tweets = []
 
@@ -34,7 +36,7 @@ def fetch_twitter_data(search_queries, limit=50):
         }
         
         try:
-            response = requests.get(search_url, headers=headers, params=params)
+            response = get_client().get(search_url, headers=headers, params=params)
             response.raise_for_status()
             json_response = response.json()
             
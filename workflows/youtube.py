@@ -1,13 +1,153 @@
 import os
-import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+import httplib2
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 import dotenv
+from concurrency import PartialResults
+from http_client import get_client
 
 dotenv.load_dotenv()
 API_KEY = os.getenv('YOUTUBE_API_KEY')
 YOUTUBE_API_SERVICE_NAME = 'youtube'
 YOUTUBE_API_VERSION = 'v3'
+YOUTUBE_HOST = 'www.googleapis.com'
+# Overrides the Data API's root URL, e.g. to replay it locally.
+YOUTUBE_API_URL = os.getenv('YOUTUBE_API_URL')
+# The discovery client has its own transport; it retries 429/5xx with exponential backoff itself.
+YOUTUBE_NUM_RETRIES = 4
+# Data API quota cost per call, in units (10,000 units a day by default).
+QUOTA_COSTS = {'search': 100, 'videos': 1}
+SEARCH_WORKERS = 6
+
+_youtube = None
+_youtube_lock = threading.Lock()
+_thread_http = threading.local()
+
+
+class QuotaTracker:
+    """Counts API calls and the quota units they cost."""
+
+    def __init__(self):
+        self.calls = {name: 0 for name in QUOTA_COSTS}
+        self._lock = threading.Lock()
+
+    def spend(self, name):
+        with self._lock:
+            self.calls[name] += 1
+
+    @property
+    def units(self):
+        return sum(QUOTA_COSTS[name] * count for name, count in self.calls.items())
+
+    def summary(self):
+        calls = ", ".join(f"{count} {name}" for name, count in self.calls.items())
+        return f"{self.units} quota units ({calls})"
+
+
+def get_youtube_client():
+    """
+    The YouTube client, built once per process from the discovery document bundled with
+    google-api-python-client instead of fetching and parsing it on every search.
+    """
+    global _youtube
+    with _youtube_lock:
+        if _youtube is None:
+            client_options = {'api_endpoint': YOUTUBE_API_URL} if YOUTUBE_API_URL else None
+            _youtube = build(YOUTUBE_API_SERVICE_NAME, YOUTUBE_API_VERSION, developerKey=API_KEY,
+                             static_discovery=True, cache_discovery=False, client_options=client_options)
+        return _youtube
+
+
+def _execute(request, name, quota):
+    """
+    Runs a request under the host limiter and counts its quota. httplib2 connections
+    are not thread-safe, so the shared client sends each request on a per-thread one.
+    """
+    if not hasattr(_thread_http, 'http'):
+        _thread_http.http = httplib2.Http(timeout=30)
+    with get_client().limiters.for_host(YOUTUBE_HOST).slot():
+        response = request.execute(http=_thread_http.http, num_retries=YOUTUBE_NUM_RETRIES)
+    quota.spend(name)
+    return response
+
+
+def search_video_ids(search_term, limit=100, region_code=None, quota=None, published_after=None):
+    """
+    Returns the IDs of the most viewed videos for a search, in ranking order.
+    """
+    youtube, quota = get_youtube_client(), quota or QuotaTracker()
+    video_ids = []
+    next_page_token = None
+
+    while len(video_ids) < limit:
+        results_per_page = min(50, limit - len(video_ids))
+        search_request = youtube.search().list(
+            q=search_term,
+            part='id',
+            type='video',
+            order='viewCount',
+            maxResults=results_per_page,
+            pageToken=next_page_token,
+            regionCode=region_code,
+            publishedAfter=published_after
+        )
+        search_response = _execute(search_request, 'search', quota)
+        video_ids.extend(item['id']['videoId'] for item in search_response.get('items', []))
+
+        next_page_token = search_response.get('nextPageToken')
+        if not next_page_token:
+            break
+    return video_ids
+
+
+def fetch_video_details(video_ids, quota=None):
+    """
+    Fetches statistics, snippet and duration for each unique ID, 50 IDs per call.
+
+    Returns:
+        dict: Video ID -> videos.list item.
+    """
+    youtube, quota = get_youtube_client(), quota or QuotaTracker()
+    unique_ids = list(dict.fromkeys(video_ids))
+    details = {}
+    for i in range(0, len(unique_ids), 50):
+        batch_ids = unique_ids[i:i+50]
+        video_request = youtube.videos().list(id=','.join(batch_ids), part='statistics,snippet,contentDetails')
+        for item in _execute(video_request, 'videos', quota).get('items', []):
+            details[item['id']] = item
+    return details
+
+
+def _to_record(item, region_code):
+    snippet, stats, content = item.get('snippet', {}), item.get('statistics', {}), item.get('contentDetails', {})
+    views, likes, comments = int(stats.get('viewCount', 0)), int(stats.get('likeCount', 0)), int(stats.get('commentCount', 0))
+    return {
+        "workflow": snippet.get('title', "N/A"), "platform": "YouTube",
+        "link": f"https://www.youtube.com/watch?v={item['id']}",
+        "popularity_metrics": {
+            "views": views, "likes": likes, "comments": comments,
+            "like_to_view_ratio": round(likes / views, 5) if views > 0 else 0,
+            "comment_to_view_ratio": round(comments / views, 5) if views > 0 else 0
+        },
+
+        "country": region_code or "Global",
+        "metadata": {
+            "author": snippet.get('channelTitle', 'N/A'), "published_at": snippet.get('publishedAt'),
+            "description": snippet.get('description', ''), "duration": content.get('duration', 'N/A'),
+            "tags": snippet.get('tags', [])
+        }
+    }
+
+
+def _api_key_configured():
+    if not API_KEY or 'YOUR_YOUTUBE_API_KEY_HERE' in API_KEY:
+        print("ERROR: YouTube API key not configured.")
+        return False
+    return True
+
 
 def fetch_youtube_data(search_term, limit=100, region_code=None):
     """
@@ -15,66 +155,15 @@ def fetch_youtube_data(search_term, limit=100, region_code=None):
     """
     region_info = f" in region '{region_code}'" if region_code else ""
     print(f"Searching YouTube for '{search_term}'{region_info} (up to {limit} results)...")
-    
-    if 'YOUR_YOUTUBE_API_KEY_HERE' in API_KEY or not API_KEY:
-        print("ERROR: YouTube API key not configured.")
+
+    if not _api_key_configured():
         return []
 
     try:
-        youtube = build(YOUTUBE_API_SERVICE_NAME, YOUTUBE_API_VERSION, developerKey=API_KEY)
-        all_video_ids = []
-        next_page_token = None
-        
-        while len(all_video_ids) < limit:
-            results_per_page = min(50, limit - len(all_video_ids))
-            
-            search_request = youtube.search().list(
-                q=search_term,
-                part='snippet',
-                type='video',
-                order='viewCount',
-                maxResults=results_per_page,
-                pageToken=next_page_token,
-                regionCode=region_code 
-            )
-            search_response = search_request.execute()
-
-            page_video_ids = [item['id']['videoId'] for item in search_response.get('items', [])]
-            all_video_ids.extend(page_video_ids)
-            
-            next_page_token = search_response.get('nextPageToken')
-            if not next_page_token: break 
-            time.sleep(1)
-
-        if not all_video_ids:
-            return []
-        
-        collected_videos = []
-        for i in range(0, len(all_video_ids), 50):
-            batch_ids = all_video_ids[i:i+50]
-            video_response = youtube.videos().list(id=','.join(batch_ids), part='statistics,snippet,contentDetails').execute()
-
-            for item in video_response.get('items', []):
-                snippet, stats, content = item.get('snippet', {}), item.get('statistics', {}), item.get('contentDetails', {})
-                views, likes, comments = int(stats.get('viewCount', 0)), int(stats.get('likeCount', 0)), int(stats.get('commentCount', 0))
-                
-                collected_videos.append({
-                    "workflow": snippet.get('title', "N/A"), "platform": "YouTube",
-                    "link": f"https://www.youtube.com/watch?v={item['id']}",
-                    "popularity_metrics": {
-                        "views": views, "likes": likes, "comments": comments,
-                        "like_to_view_ratio": round(likes / views, 5) if views > 0 else 0,
-                        "comment_to_view_ratio": round(comments / views, 5) if views > 0 else 0
-                    },
-
-                    "country": region_code or "Global", 
-                    "metadata": {
-                        "author": snippet.get('channelTitle', 'N/A'), "published_at": snippet.get('publishedAt'),
-                        "description": snippet.get('description', ''), "duration": content.get('duration', 'N/A'),
-                        "tags": snippet.get('tags', [])
-                    }
-                })
-        return collected_videos
+        quota = QuotaTracker()
+        video_ids = search_video_ids(search_term, limit, region_code, quota)
+        details = fetch_video_details(video_ids, quota)
+        return [_to_record(details[video_id], region_code) for video_id in video_ids if video_id in details]
 
     except HttpError as e:
         print(f"An HTTP error occurred with YouTube: {e.content}")
@@ -82,3 +171,96 @@ def fetch_youtube_data(search_term, limit=100, region_code=None):
     except Exception as e:
         print(f"An unexpected error occurred with YouTube: {e}")
         return []
+
+
+def collect_youtube_data(search_terms, region_codes, limit=50, published_after=None):
+    """
+    Runs every search for every region, then fetches statistics once per unique video.
+
+    The searches run first and only collect video IDs. A video found by several terms or
+    regions is looked up once, in 50-ID batches, instead of once per search. One record
+    is emitted per (video, region).
+
+    Args:
+        search_terms (list): Search queries.
+        region_codes (list): Region codes to search in, e.g. ['US', 'IN'].
+        limit (int): Max videos per search.
+        published_after (str): Only videos published after this RFC 3339 time, for incremental runs.
+
+    Returns:
+        list: One record per video and region the video was found in.
+
+    Raises:
+        PartialResults: When some searches failed, with the records of the others.
+    """
+    if not _api_key_configured():
+        return []
+
+    quota = QuotaTracker()
+    searches = [(term, region) for region in region_codes for term in search_terms]
+    print(f"Searching YouTube for {len(search_terms)} terms in {len(region_codes)} regions...")
+
+    failed = []
+
+    def run_search(search):
+        term, region = search
+        try:
+            return search_video_ids(term, limit, region, quota, published_after)
+        except HttpError as e:
+            print(f"  -> WARNING: YouTube search '{term}' ({region}) failed: {e.content}")
+        except Exception as e:
+            print(f"  -> WARNING: YouTube search '{term}' ({region}) failed: {e}")
+        failed.append(search)
+        return []
+
+    # Keep ranking order, and the regions each video was found in.
+    regions_by_video = {}
+    with ThreadPoolExecutor(max_workers=SEARCH_WORKERS, thread_name_prefix="youtube-search") as executor:
+        for (term, region), video_ids in zip(searches, executor.map(run_search, searches)):
+            for video_id in video_ids:
+                regions_by_video.setdefault(video_id, {})[region] = None
+
+    found = sum(len(regions) for regions in regions_by_video.values())
+    print(f"  -> Searches found {len(regions_by_video)} unique videos ({found} video/region pairs)")
+
+    try:
+        details = fetch_video_details(list(regions_by_video), quota)
+    except HttpError as e:
+        print(f"An HTTP error occurred with YouTube: {e.content}")
+        raise
+    except Exception as e:
+        print(f"An unexpected error occurred with YouTube: {e}")
+        raise
+
+    records = [
+        _to_record(details[video_id], region)
+        for video_id, regions in regions_by_video.items() if video_id in details
+        for region in regions
+    ]
+    print(f"  -> YouTube collection used {quota.summary()}")
+    if failed:
+        raise PartialResults(f"{len(failed)} of {len(searches)} searches failed", records)
+    return records
+
+
+def refresh_youtube_records(records):
+    """
+    Re-fetches the statistics of already known videos, 50 per call, without searching again.
+
+    Args:
+        records (list): Stored YouTube records.
+
+    Returns:
+        list: Refreshed records, one per (video, region); deleted videos are left out.
+    """
+    if not records or not _api_key_configured():
+        return []
+    quota = QuotaTracker()
+    keys = [(parse_qs(urlsplit(record['link']).query).get('v', [''])[0], record['country']) for record in records]
+    try:
+        details = fetch_video_details([video_id for video_id, _ in keys], quota)
+    except HttpError as e:
+        print(f"An HTTP error occurred with YouTube: {e.content}")
+        return []
+    print(f"  -> Refreshing {len(records)} YouTube records used {quota.summary()}")
+    return [_to_record(details[video_id], country) for video_id, country in keys if video_id in details]